@@ -18,3 +18,5 @@ jq -r '.SRLegacyFoods | sort_by(.description) | .[] |
 rm -f data.csv.gz
 
 gzip data.csv
+
+python db.py
@@ -12,9 +12,11 @@ from anthropic import Anthropic
 from anthropic import beta_tool
 from autokitteh.anthropic import anthropic_client
 from autokitteh.errors import ConnectionInitError
+from cache import LRUCache
 from data import find_foods_by_name
 from data import Food
 from data import get_food_by_index
+from data import normalize_query
 from data import Portion
 
 
@@ -99,13 +101,20 @@ class _InteractionContext:
         )  # noqa: E501
 
 
+# Serialized tool results, so repeated lookups skip both search and serialization.
+tool_cache = LRUCache(maxsize=1024, ttl=3600)
+
+
 @beta_tool
 def _find_foods_by_name_tool(name: str) -> str:
-    return json.dumps(
-        [
-            {"food": asdict(food), "score": score}
-            for food, score in find_foods_by_name(name)
-        ]
+    return tool_cache.get_or_set(
+        normalize_query(name),
+        lambda: json.dumps(
+            [
+                {"food": asdict(food), "score": score}
+                for food, score in find_foods_by_name(name)
+            ]
+        ),
     )
 
 
@@ -0,0 +1,204 @@
+"""Latency and search quality benchmark for the food database search.
+
+Replays a corpus of realistic user food queries against `find_foods_by_name`
+and reports latency percentiles, throughput and peak memory, as well as
+ranking metrics against the foods a user most likely meant.
+
+Usage:
+    python bench_data.py [--repeat N] [--cache] [--json]
+
+Any change to the index or scoring should keep the ranking metrics (see also
+`test_data.test_search_quality`) while improving the latency numbers.
+"""
+
+import argparse
+from dataclasses import asdict
+from dataclasses import dataclass
+import json
+import resource
+import statistics
+import time
+import tracemalloc
+
+import data
+
+
+# Queries paired with name prefixes of the foods that count as a correct answer.
+CORPUS: list[tuple[str, tuple[str, ...]]] = [
+    ("apple", ("Apples, raw",)),
+    ("banana", ("Bananas, raw",)),
+    ("bananna", ("Bananas, raw",)),
+    ("white rice", ("Rice, white",)),
+    ("brown rice", ("Rice, brown",)),
+    ("whole wheat bread", ("Bread, whole-wheat",)),
+    ("white bread", ("Bread, white",)),
+    ("milk", ("Milk, whole", "Milk, reduced fat", "Milk, lowfat")),
+    ("whole milk", ("Milk, whole",)),
+    ("scrambled eggs", ("Egg, whole, cooked, scrambled",)),
+    ("cheddar cheese", ("Cheese, cheddar",)),
+    ("pizza", ("Pizza, cheese",)),
+    ("oats", ("Oats", "Cereals, oats")),
+    ("baked potato", ("Potatoes, baked",)),
+    ("orange juice", ("Orange juice",)),
+    ("yogurt", ("Yogurt, plain",)),
+    ("yoghurt", ("Yogurt, plain",)),
+    ("peanut butter", ("Peanut butter",)),
+    ("honey", ("Honey",)),
+    ("sugar", ("Sugars, granulated",)),
+    ("ice cream", ("Ice creams, vanilla",)),
+    ("cola", ("Beverages, carbonated, cola",)),
+    ("orange", ("Oranges, raw",)),
+    ("grapes", ("Grapes, red or green",)),
+    ("strawberries", ("Strawberries, raw",)),
+    ("watermelon", ("Watermelon, raw",)),
+    ("carrots", ("Carrots, raw",)),
+    ("broccoli", ("Broccoli, raw",)),
+    ("brocoli", ("Broccoli, raw",)),
+    ("lentils", ("Lentils, mature seeds, cooked",)),
+    ("hummus", ("Hummus, commercial",)),
+    ("avocado", ("Avocados, raw",)),
+    ("bagel", ("Bagels, plain",)),
+    ("croissant", ("Croissants, butter",)),
+    ("pancakes", ("Pancakes, plain",)),
+    ("almonds", ("Nuts, almonds",)),
+    ("cashews", ("Nuts, cashew nuts",)),
+    ("chicken breast", ("Chicken, broilers or fryers, breast",)),
+    ("mango", ("Mangos, raw",)),
+    ("sweet potato", ("Sweet potato, cooked", "Sweet potato, raw")),
+    ("donut", ("Doughnuts",)),
+    ("ketchup", ("Catsup",)),
+    ("maple syrup", ("Syrups, maple",)),
+    ("hot dog", ("Frankfurter",)),
+    ("kiwi", ("Kiwifruit",)),
+    ("potato chips", ("Snacks, potato chips",)),
+    ("chocolate chip cookies", ("Cookies, chocolate chip",)),
+    ("strawberry", ("Strawberries, raw",)),
+    ("pear", ("Pears, raw",)),
+    ("quinoa", ("Quinoa, cooked",)),
+    # Scoring is case-sensitive, and users type names in any case.
+    ("Apple", ("Apples, raw",)),
+    ("BANANA", ("Bananas, raw",)),
+    ("Honey", ("Honey",)),
+    ("Scrambled Eggs", ("Egg, whole, cooked, scrambled",)),
+    ("Orange Juice", ("Orange juice",)),
+    ("Whole Milk", ("Milk, whole",)),
+    ("Peanut Butter", ("Peanut butter",)),
+    ("Brown Rice", ("Rice, brown",)),
+]
+
+
+@dataclass(frozen=True, kw_only=True)
+class Report:
+    """Benchmark results."""
+
+    queries: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    throughput_qps: float
+    peak_traced_mb: float
+    max_rss_mb: float
+    mrr: float
+    hit_at_1: float
+    hit_at_5: float
+
+
+def _rank(q: str, expected: tuple[str, ...]) -> int | None:
+    """Return the 1-based rank of the first correct food, if returned at all."""
+    for i, (food, _) in enumerate(data.find_foods_by_name(q)):
+        if food.name.startswith(expected):
+            return i + 1
+    return None
+
+
+def ranking_metrics() -> tuple[float, float, float]:
+    """Return the MRR, hit@1 and hit@5 rates of the corpus."""
+    ranks = [_rank(q, expected) for q, expected in CORPUS]
+
+    mrr = sum(1 / r for r in ranks if r) / len(ranks)
+    hit_at_1 = sum(1 for r in ranks if r and r <= 1) / len(ranks)
+    hit_at_5 = sum(1 for r in ranks if r and r <= 5) / len(ranks)
+
+    return mrr, hit_at_1, hit_at_5
+
+
+def run(repeat: int = 5, cache: bool = False) -> Report:
+    """Run the benchmark.
+
+    Args:
+        repeat: Number of times to replay the corpus.
+        cache: Whether to keep the search cache between queries, otherwise
+            every query is a cold search.
+
+    Returns:
+        The benchmark report.
+    """
+    data.loader.get()  # Loading is not part of the measurements.
+
+    t0 = time.perf_counter()
+    latencies = _replay(repeat, cache)
+    total = time.perf_counter() - t0
+
+    # Tracing slows down allocations, so memory is measured in a separate
+    # (untimed) replay of the same queries, along with the ranking metrics.
+    tracemalloc.start()
+    _replay(1, cache)
+    data.search_cache.clear()
+    mrr, hit_at_1, hit_at_5 = ranking_metrics()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+
+    return Report(
+        queries=len(latencies),
+        p50_ms=percentiles[49] * 1000,
+        p95_ms=percentiles[94] * 1000,
+        p99_ms=percentiles[98] * 1000,
+        throughput_qps=len(latencies) / total,
+        peak_traced_mb=peak / 2**20,
+        # Linux reports this in KiB.
+        max_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10,
+        mrr=mrr,
+        hit_at_1=hit_at_1,
+        hit_at_5=hit_at_5,
+    )
+
+
+def _replay(repeat: int, cache: bool) -> list[float]:
+    """Search for every query in the corpus, and return the latency of each one."""
+    data.search_cache.clear()
+
+    latencies = []
+    for _ in range(repeat):
+        for q, _ in CORPUS:
+            if not cache:
+                data.search_cache.clear()
+
+            t = time.perf_counter()
+            data.find_foods_by_name(q)
+            latencies.append(time.perf_counter() - t)
+
+    return latencies
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cache", action="store_true", help="keep search cache")
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    report = run(repeat=args.repeat, cache=args.cache)
+
+    if args.json:
+        print(json.dumps(asdict(report)))
+        return
+
+    for k, v in asdict(report).items():
+        print(f"{k:>16}: {v:.3f}" if isinstance(v, float) else f"{k:>16}: {v}")
+
+
+if __name__ == "__main__":
+    main()
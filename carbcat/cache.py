@@ -0,0 +1,77 @@
+"""Bounded in-memory LRU cache with optional expiration for CarbCat."""
+
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Hashable
+from dataclasses import dataclass
+import threading
+import time
+from typing import Any
+
+
+@dataclass(frozen=True, kw_only=True)
+class CacheStats:
+    """Cache usage counters."""
+
+    hits: int
+    misses: int
+    size: int
+
+
+class LRUCache:
+    """Thread-safe LRU cache, whose entries optionally expire after a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            maxsize: Maximum number of entries, least recently used ones are
+                evicted first.
+            ttl: Seconds after which an entry expires, None means never.
+        """
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for a key, computing and caching it if needed.
+
+        The value is computed outside the lock, so concurrent misses on the
+        same key may each compute it.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (self._ttl is None or now - entry[0] < self._ttl):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+
+            self._misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+    def stats(self) -> CacheStats:
+        """Return the cache's hit and miss counters."""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits, misses=self._misses, size=len(self._entries)
+            )
@@ -1,17 +1,18 @@
 """Data module for CarbCat."""
 
-import csv
+from collections.abc import Sequence
 from dataclasses import dataclass
-from dataclasses import replace
-import gzip
-from io import StringIO
-from pathlib import Path
-import re
+import threading
+import time
 
-import rapidfuzz
+from cache import LRUCache
+from db import FoodDB
+from db import open_db
+from index import SearchIndex
+import numpy as np
 
 
-@dataclass(frozen=True, kw_only=True)
+@dataclass(frozen=True, kw_only=True, slots=True)
 class Portion:
     """Class representing a portion size."""
 
@@ -20,7 +21,7 @@ class Portion:
     gram_weight: float
 
 
-@dataclass(frozen=True, kw_only=True)
+@dataclass(frozen=True, kw_only=True, slots=True)
 class Food:
     """Class representing a row in the data."""
 
@@ -30,56 +31,146 @@ class Food:
     portions: list[Portion]
 
 
-_foods: list[Food] = []
+class _Foods(Sequence[Food]):
+    """Foods in the database, created on demand from the columnar storage."""
+
+    __slots__ = ("_db",)
 
+    def __init__(self, db: FoodDB) -> None:
+        self._db = db
 
-def _read() -> StringIO:
-    """Load raw compressed data."""
-    with Path("data.csv.gz").open("rb") as f:
-        compressed = f.read()
+    def __len__(self) -> int:
+        return len(self._db)
 
-    return StringIO(gzip.decompress(compressed).decode("utf-8"))
+    def __getitem__(self, idx: int) -> Food:
+        idx = int(idx)
+        if idx < 0 or idx >= len(self._db):
+            raise IndexError(f"Food index {idx} out of range")
 
+        return Food(
+            index=idx,
+            name=self._db.name(idx),
+            carbs=self._db.carbs(idx),
+            portions=[
+                Portion(amount=amount, modifier=modifier, gram_weight=gram_weight)
+                for amount, modifier, gram_weight in self._db.portions(idx)
+            ],
+        )
 
-def _load() -> list[Food]:
-    """Load food data from CSV file."""
-    global _foods
 
-    if not _foods:
-        prev: Food | None = None
+@dataclass(frozen=True, kw_only=True)
+class _Database:
+    foods: _Foods
+    index: SearchIndex
 
-        r = csv.reader(_read())
 
-        for i, row in enumerate(r):
-            curr = Food(
-                index=len(_foods),
-                name=row[0],
-                carbs=float(row[1]),
-                portions=[
-                    Portion(
-                        amount=float(row[2]),
-                        modifier=row[3],
-                        gram_weight=float(row[4]),
-                    )
-                ],
-            )
+@dataclass(frozen=True, kw_only=True)
+class LoaderStats:
+    """Readiness and timing metrics of the food database loader."""
+
+    ready: bool
+    """Whether the database is loaded and ready for queries."""
+
+    loading: bool
+    """Whether a load is currently in flight."""
+
+    load_seconds: float | None
+    """How long the load took, once it is done."""
+
+    waits: int
+    """Number of calls that had to wait for an in-flight load."""
 
-            if prev and prev.name == curr.name:
-                if prev.carbs != curr.carbs:
-                    raise ValueError(
-                        f"line #{i + 1}: duplicate food with different carbs: {prev} != {curr}"  # noqa: E501
-                    )
-
-                _foods[-1] = replace(
-                    prev,
-                    index=prev.index,
-                    portions=prev.portions + [curr.portions[0]],
-                )
+    wait_seconds: float
+    """Total time calls spent waiting for an in-flight load."""
+
+
+class Loader:
+    """Thread-safe, lazy loader of the food database.
+
+    The database is loaded at most once: either in the background by `warm`,
+    or by the first call to `get`. Concurrent callers wait for the single
+    in-flight load instead of starting their own.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an idle loader."""
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._started = False
+        self._database: _Database | None = None
+        self._error: Exception | None = None
+        self._load_seconds: float | None = None
+        self._waits = 0
+        self._wait_seconds = 0.0
+
+    def warm(self) -> None:
+        """Start loading the database in a background thread, if not started."""
+        if self._claim():
+            threading.Thread(
+                target=self._run, name="carbcat-loader", daemon=True
+            ).start()
+
+    def get(self) -> _Database:
+        """Return the loaded database, loading it or waiting for it if needed.
+
+        Raises:
+            Exception: Whatever the load raised, for this and all later calls.
+        """
+        if not self._done.is_set():
+            if self._claim():
+                self._run()
             else:
-                prev = curr
-                _foods.append(curr)
+                t0 = time.monotonic()
+                self._done.wait()
+                with self._lock:
+                    self._waits += 1
+                    self._wait_seconds += time.monotonic() - t0
+
+        if self._error:
+            raise self._error
+
+        return self._database
+
+    def stats(self) -> LoaderStats:
+        """Return the loader's readiness and timing metrics."""
+        with self._lock:
+            done = self._done.is_set()
+            return LoaderStats(
+                ready=done and self._error is None,
+                loading=self._started and not done,
+                load_seconds=self._load_seconds,
+                waits=self._waits,
+                wait_seconds=self._wait_seconds,
+            )
+
+    def _claim(self) -> bool:
+        """Return True if the caller is the one that should run the load."""
+        with self._lock:
+            if self._started:
+                return False
+            self._started = True
+            return True
+
+    def _run(self) -> None:
+        t0 = time.monotonic()
+        try:
+            db = open_db()
+            self._database = _Database(foods=_Foods(db), index=SearchIndex(db.names()))
+        except Exception as e:  # noqa: BLE001 - re-raised by get()
+            self._error = e
+        finally:
+            self._load_seconds = time.monotonic() - t0
+            self._done.set()
+
+
+loader = Loader()
 
-    return _foods
+search_cache = LRUCache(maxsize=1024, ttl=3600)
+
+
+def _load() -> Sequence[Food]:
+    """Load food data from the columnar database file."""
+    return loader.get().foods
 
 
 def get_food_by_index(idx: int) -> Food:
@@ -94,15 +185,24 @@ def get_food_by_index(idx: int) -> Food:
     Raises:
         IndexError: If the index is out of range.
     """
-    foods = _load()
-    if idx < 0 or idx >= len(foods):
-        raise IndexError(f"Food index {idx} out of range")
-    return foods[idx]
+    return _load()[idx]
+
+
+def normalize_query(q: str) -> str:
+    """Normalize a food name query, for caching its search results.
+
+    Only surrounding whitespace is removed: the case (and spacing) of the
+    query affect its matching scores.
+    """
+    return q.strip()
 
 
 def find_foods_by_name(q: str, top_n=100) -> list[tuple[Food, float]]:
     """Search for foods by name and return top N matches.
 
+    Surrounding whitespace is removed first (see `normalize_query`), and
+    results are cached per query in `search_cache`.
+
     Args:
         q: The food name to search for (str)
         top_n: Number of top matches to return (default: 5)
@@ -110,144 +210,51 @@ def find_foods_by_name(q: str, top_n=100) -> list[tuple[Food, float]]:
     Returns:
         List of foods and their associated matching scores
     """
-    foods = _load()
-    food_names = [food.name for food in foods]
-
-    results = [
-        (_calculate_food_name_score(q, name), idx)
-        for idx, name in enumerate(food_names)
-    ]
-
-    # Sort by combined score
-    results.sort(key=lambda x: x[0], reverse=True)
-
-    idxs = _smart_cutoff(results)
+    q = normalize_query(q)
+    return list(search_cache.get_or_set((q, top_n), lambda: _search(q, top_n)))
 
-    # Create a mapping from food index to score
-    idx_to_score = {idx: score for score, idx in results}
 
-    return [(foods[i], idx_to_score[i]) for i in idxs[:top_n]]
+def _search(q: str, top_n: int) -> list[tuple[Food, float]]:
+    db = loader.get()
+    foods = db.foods
 
+    scores = db.index.scores(q)
 
-def _calculate_food_name_score(query: str, food_name: str) -> float:
-    """Calculate relevance score for a food name match.
+    # Sort by combined score, ties keep food index order.
+    order = np.argsort(-scores, kind="stable")
 
-    Args:
-        query: The search query
-        food_name: The food name to score
-
-    Returns:
-        Combined relevance score
-    """
-    name_lower = food_name.lower()
-    q_lower = query.lower()
-
-    # Multiple scoring factors
-    wratio_score = rapidfuzz.fuzz.WRatio(query, food_name)
-    ratio_score = rapidfuzz.fuzz.ratio(q_lower, name_lower)
-    token_sort = rapidfuzz.fuzz.token_sort_ratio(q_lower, name_lower)
-
-    # Split by common delimiters
-    words = re.split(r"[\s,\-\(\)]+", name_lower)
-
-    # Check for exact word match and position
-    has_exact_word = False
-    is_first_word = False
-    word_position = len(words)  # Default to end
-
-    for i, word in enumerate(words):
-        if word in [q_lower, q_lower + "s", q_lower + "es", q_lower + "ies"]:
-            has_exact_word = True
-            word_position = i
-            if i == 0:
-                is_first_word = True
-            break
-
-    # Penalize longer names
-    length_penalty = 100 / (1 + len(food_name) / 20)
-
-    # Penalize names with many words
-    word_count_penalty = 100 / (1 + len(words) / 3)
-
-    # Position bonus - earlier position = higher score
-    # First word is MUCH more important (the food IS that thing)
-    # vs later words (the food CONTAINS that thing)
-    position_bonus = 0
-    if has_exact_word:
-        if is_first_word:
-            position_bonus = 60  # Huge boost for first word (e.g., "Apples, raw")
-        elif word_position == 1:
-            position_bonus = 5  # Small boost for second word (e.g., "Strudel, apple")
-        elif word_position == 2:
-            position_bonus = 2  # Tiny boost for third word
-
-    # Calculate combined score
-    if has_exact_word:
-        combined_score = (
-            wratio_score * 0.25
-            + ratio_score * 0.25
-            + token_sort * 0.15
-            + length_penalty * 0.10
-            + word_count_penalty * 0.10
-            + position_bonus  # Position is very important!
-        )
-    else:
-        combined_score = wratio_score * 0.5 + ratio_score * 0.3 + token_sort * 0.2
+    cutoff = min(_smart_cutoff(scores[order]), top_n)
 
-    # Check if it's a substring match but NOT a word match
-    is_substring_only = q_lower in name_lower and not has_exact_word
-    if is_substring_only:
-        combined_score *= 0.5  # Heavy penalty for substring-only matches
+    return [(foods[i], float(scores[i])) for i in order[:cutoff]]
 
-    return combined_score
 
-
-def _smart_cutoff(results: list[tuple[float, int]]) -> list[int]:
+def _smart_cutoff(scores: np.ndarray) -> int:
     """Intelligently determine where to cut off search results based on score drops.
 
     Args:
-        results: List of tuples (score, index) sorted by score descending
+        scores: Scores sorted descending
 
     Returns:
-        List of indexes to include in final results
+        Number of leading results to include in final results
     """
-    if not results:
-        return []
-
     # Always include at least the top result
-    if len(results) == 1:
-        return [results[0][1]]
-
-    top_score = results[0][0]
+    if len(scores) <= 1:
+        return len(scores)
 
     # Calculate score drops between consecutive results
-    score_drops = []
-    for i in range(len(results) - 1):
-        drop = results[i][0] - results[i + 1][0]
-        score_drops.append((i, drop))
+    drops = scores[:-1] - scores[1:]
 
-    # Find significant drops (> 2 points)
-    significant_drops = [(i, drop) for i, drop in score_drops if drop > 2]
+    # Find the largest drop, it is significant if it is > 2 points
+    largest_drop_idx = int(np.argmax(drops))
 
-    if significant_drops:
-        # Sort by drop size to find the largest
-        significant_drops.sort(key=lambda x: x[1], reverse=True)
-        largest_drop_idx, largest_drop_size = significant_drops[0]
-
-        # Cut at the largest significant drop if it happens reasonably early
-        # and is substantial enough
-        if largest_drop_idx < 20 and largest_drop_size > 2:
-            cutoff = largest_drop_idx + 1
-            return [idx for _, idx in results[:cutoff]]
+    # Cut at the largest significant drop if it happens reasonably early
+    if largest_drop_idx < 20 and drops[largest_drop_idx] > 2:
+        return largest_drop_idx + 1
 
     # If no significant drops, filter by relative score to top result
     # Cut off results that drop below 85% of top score
-    cutoff = len(results)
-    for i, (score, _) in enumerate(results):
-        # If score drops below 85% of top score, cut there
-        # But keep at least 5 results
-        if i >= 5 and score < (top_score * 0.85):
-            cutoff = i
-            break
-
-    return [idx for _, idx in results[:cutoff]]
+    # But keep at least 5 results
+    below = scores < (scores[0] * 0.85)
+    below[:5] = False
+
+    return int(np.argmax(below)) if below.any() else len(scores)
@@ -0,0 +1,255 @@
+"""Compact columnar food database for CarbCat.
+
+`data.csv.gz` has one row per (food, portion) pair. This module converts it
+into a binary file with one column per field, which is memory-mapped at
+runtime, so that loading it is cheap and the pages are shared between all the
+workers on a host. Layout (little-endian, sections 8-byte aligned):
+
+    header              magic, version and section sizes (see _HEADER)
+    name_offsets        uint32[foods + 1], into names
+    carbs               float64[foods], per 100g
+    portion_offsets     uint32[foods + 1], into the portion columns (CSR)
+    portion_amounts     float64[portions]
+    portion_weights     float64[portions], in grams
+    portion_modifiers   uint32[portions], into modifier_offsets
+    modifier_offsets    uint32[modifiers + 1], into modifiers (distinct)
+    names               UTF-8 blob
+    modifiers           UTF-8 blob
+
+Run `python db.py` to regenerate `data.bin` after updating `data.csv.gz`.
+"""
+
+import csv
+import gzip
+from io import StringIO
+import itertools
+import mmap
+from pathlib import Path
+import struct
+
+import numpy as np
+
+
+CSV_PATH = Path(__file__).with_name("data.csv.gz")
+
+DB_PATH = Path(__file__).with_name("data.bin")
+
+_MAGIC = b"CARBCAT\0"
+
+_VERSION = 1
+
+# magic, version, foods, portions, distinct modifiers, names blob size,
+# modifiers blob size.
+_HEADER = struct.Struct("<8sIIIIII")
+
+_OFFSET = np.dtype("<u4")
+
+_FLOAT = np.dtype("<f8")
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _pad(b: bytes) -> bytes:
+    return b + b"\0" * (_align(len(b)) - len(b))
+
+
+def build(csv_path: Path = CSV_PATH) -> bytes:
+    """Convert the food CSV file into the columnar binary format.
+
+    Rows for the same food are expected to be consecutive.
+
+    Args:
+        csv_path: Path of the gzipped CSV file.
+
+    Returns:
+        The content of the database file.
+
+    Raises:
+        ValueError: If the same food appears with different carbs.
+    """
+    with csv_path.open("rb") as f:
+        text = gzip.decompress(f.read()).decode("utf-8")
+
+    names, carbs, portion_offsets = [], [], [0]
+    amounts, weights, portion_modifiers = [], [], []
+    modifiers: dict[str, int] = {}
+
+    for i, row in enumerate(csv.reader(StringIO(text))):
+        name, carb = row[0], float(row[1])
+
+        if names and names[-1] == name:
+            if carbs[-1] != carb:
+                raise ValueError(
+                    f"line #{i + 1}: duplicate food with different carbs: {name}"
+                )
+        else:
+            names.append(name)
+            carbs.append(carb)
+            portion_offsets.append(portion_offsets[-1])
+
+        amounts.append(float(row[2]))
+        portion_modifiers.append(modifiers.setdefault(row[3], len(modifiers)))
+        weights.append(float(row[4]))
+        portion_offsets[-1] += 1
+
+    names_blob, name_offsets = _blob(names)
+    modifiers_blob, modifier_offsets = _blob(list(modifiers))
+
+    header = _HEADER.pack(
+        _MAGIC,
+        _VERSION,
+        len(names),
+        len(amounts),
+        len(modifiers),
+        len(names_blob),
+        len(modifiers_blob),
+    )
+
+    return b"".join(
+        _pad(section)
+        for section in (
+            header,
+            np.array(name_offsets, dtype=_OFFSET).tobytes(),
+            np.array(carbs, dtype=_FLOAT).tobytes(),
+            np.array(portion_offsets, dtype=_OFFSET).tobytes(),
+            np.array(amounts, dtype=_FLOAT).tobytes(),
+            np.array(weights, dtype=_FLOAT).tobytes(),
+            np.array(portion_modifiers, dtype=_OFFSET).tobytes(),
+            np.array(modifier_offsets, dtype=_OFFSET).tobytes(),
+            names_blob,
+            modifiers_blob,
+        )
+    )
+
+
+def _blob(strs: list[str]) -> tuple[bytes, list[int]]:
+    """Concatenate strings into a single blob, with their boundary offsets."""
+    encoded = [s.encode("utf-8") for s in strs]
+
+    offsets = [0]
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+
+    return b"".join(encoded), offsets
+
+
+class FoodDB:
+    """Read-only view over a columnar food database buffer."""
+
+    __slots__ = (
+        "_buf",
+        "_carbs",
+        "_modifier_offsets",
+        "_modifiers",
+        "_name_offsets",
+        "_names",
+        "_portion_amounts",
+        "_portion_modifiers",
+        "_portion_offsets",
+        "_portion_weights",
+        "size",
+    )
+
+    def __init__(self, buf) -> None:
+        """Wrap a buffer in the format produced by `build`.
+
+        Args:
+            buf: bytes-like object, usually a read-only mmap of the file.
+
+        Raises:
+            ValueError: If the buffer is not a supported database.
+        """
+        (
+            magic,
+            version,
+            foods,
+            portions,
+            modifiers,
+            names_len,
+            modifiers_len,
+        ) = _HEADER.unpack_from(buf)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("not a CarbCat food database, run `python db.py`")
+
+        self._buf = buf
+        self.size = foods
+
+        off = _align(_HEADER.size)
+
+        def take(dtype: np.dtype, count: int) -> np.ndarray:
+            nonlocal off
+            a = np.frombuffer(buf, dtype=dtype, count=count, offset=off)
+            off = _align(off + a.nbytes)
+            return a
+
+        self._name_offsets = take(_OFFSET, foods + 1)
+        self._carbs = take(_FLOAT, foods)
+        self._portion_offsets = take(_OFFSET, foods + 1)
+        self._portion_amounts = take(_FLOAT, portions)
+        self._portion_weights = take(_FLOAT, portions)
+        self._portion_modifiers = take(_OFFSET, portions)
+        self._modifier_offsets = take(_OFFSET, modifiers + 1)
+
+        self._names = memoryview(buf)[off : off + names_len]
+        off = _align(off + names_len)
+        self._modifiers = memoryview(buf)[off : off + modifiers_len]
+
+    def __len__(self) -> int:
+        """Number of foods."""
+        return self.size
+
+    def name(self, idx: int) -> str:
+        """Name of the food."""
+        return _str(self._names, self._name_offsets, idx)
+
+    def names(self) -> list[str]:
+        """Names of all the foods, in index order."""
+        blob = bytes(self._names)
+        offsets = self._name_offsets.tolist()
+        return [
+            blob[start:end].decode("utf-8")
+            for start, end in itertools.pairwise(offsets)
+        ]
+
+    def carbs(self, idx: int) -> float:
+        """Carbohydrates of the food, per 100g."""
+        return float(self._carbs[idx])
+
+    def portions(self, idx: int) -> list[tuple[float, str, float]]:
+        """Portions of the food, as (amount, modifier, gram weight) tuples."""
+        start, end = self._portion_offsets[idx : idx + 2]
+        return [
+            (
+                float(self._portion_amounts[i]),
+                _str(
+                    self._modifiers,
+                    self._modifier_offsets,
+                    self._portion_modifiers[i],
+                ),
+                float(self._portion_weights[i]),
+            )
+            for i in range(start, end)
+        ]
+
+
+def _str(blob: memoryview, offsets: np.ndarray, idx: int) -> str:
+    start, end = offsets[idx : idx + 2]
+    return str(blob[start:end], "utf-8")
+
+
+def open_db(path: Path = DB_PATH, csv_path: Path = CSV_PATH) -> FoodDB:
+    """Memory-map the food database.
+
+    If the database file does not exist, it is built in memory from the CSV.
+    """
+    if not path.exists():
+        return FoodDB(build(csv_path))
+
+    with path.open("rb") as f:
+        return FoodDB(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+if __name__ == "__main__":
+    DB_PATH.write_bytes(build())
@@ -5,12 +5,20 @@ from os import getenv
 import ai
 from autokitteh import del_value, Event, get_value, next_event, set_value, subscribe
 from autokitteh.twilio import twilio_client
+import data
 
 
 _twilio = twilio_client("twilio")
 
 _TWILIO_PHONE_NUMBER = getenv("TWILIO_PHONE_NUMBER")
 
+# Print the data loader and cache stats with every message.
+_DEBUG = getenv("CARBCAT_DEBUG", "").lower() in ("1", "true", "yes")
+
+# Load the food database while waiting for the user's first message,
+# instead of during it.
+data.loader.warm()
+
 
 def _respond(to: str, msg: str) -> None:
     resp = _twilio.messages.create(
@@ -27,6 +35,10 @@ def on_whatsapp_message(event: Event):
     body = event.data.body.form.get("Body", "").strip()
 
     print(f"@{src}: {body}")
+    if _DEBUG:
+        print(f"data loader: {data.loader.stats()}")
+        print(f"search cache: {data.search_cache.stats()}")
+        print(f"tool cache: {ai.tool_cache.stats()}")
 
     if not src:
         print("no source specified.")
@@ -0,0 +1,164 @@
+"""Search index and batch scoring for the CarbCat food database.
+
+The index maps name tokens (including the plural forms that the scorer treats
+as exact word matches) and character trigrams to food indices, and keeps the
+per-food parts of the relevance score precomputed as NumPy arrays. Scoring a
+query is then a few batched rapidfuzz calls plus array arithmetic, instead of
+a Python loop over all foods.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+import re
+
+import numpy as np
+from rapidfuzz import fuzz
+from rapidfuzz import process
+
+
+WORD_SPLIT_RE = re.compile(r"[\s,\-\(\)]+")
+"""Delimiters used to split food names into words."""
+
+_PLURAL_SUFFIXES = ("s", "es", "ies")
+"""Suffixes the scorer accepts when matching a query to a whole word."""
+
+_NGRAM = 3
+
+
+def _trigrams(s: str) -> set[str]:
+    return {s[i : i + _NGRAM] for i in range(len(s) - _NGRAM + 1)}
+
+
+def _stems(word: str) -> set[str]:
+    """Return the word and every query that would match it as a plural."""
+    stems = {word}
+    for suffix in _PLURAL_SUFFIXES:
+        if word.endswith(suffix):
+            stems.add(word[: -len(suffix)])
+    return stems
+
+
+class SearchIndex:
+    """Token and trigram inverted index over food names."""
+
+    def __init__(self, names: Iterable[str], workers: int = -1) -> None:
+        """Build the index.
+
+        Args:
+            names: Food names, in food index order.
+            workers: Number of threads used by rapidfuzz when scoring a query,
+                -1 means all available cores.
+        """
+        self._names = list(names)
+        self._lower = [name.lower() for name in self._names]
+        self._workers = workers
+
+        # Token -> food index -> position of the first word matching the token.
+        tokens: dict[str, dict[int, int]] = defaultdict(dict)
+        trigrams: dict[str, set[int]] = defaultdict(set)
+        word_counts = []
+
+        for i, name in enumerate(self._lower):
+            words = WORD_SPLIT_RE.split(name)
+            word_counts.append(len(words))
+
+            for pos, word in enumerate(words):
+                for stem in _stems(word):
+                    tokens[stem].setdefault(i, pos)
+
+            for t in _trigrams(name):
+                trigrams[t].add(i)
+
+        self._tokens = dict(tokens)
+        self._trigrams = dict(trigrams)
+
+        lengths = np.array([len(name) for name in self._names], dtype=np.float64)
+        counts = np.array(word_counts, dtype=np.float64)
+
+        # Penalize longer names
+        self._length_penalty = 100 / (1 + lengths / 20)
+
+        # Penalize names with many words
+        self._word_count_penalty = 100 / (1 + counts / 3)
+
+    def __len__(self) -> int:
+        """Number of indexed foods."""
+        return len(self._names)
+
+    def exact_word_positions(self, q: str) -> dict[int, int]:
+        """Return the foods that contain the query as a whole word.
+
+        Plural forms count as well, e.g. "apple" matches "Apples, raw".
+
+        Args:
+            q: The search query.
+
+        Returns:
+            Mapping of food index to the position of the first matching word.
+        """
+        return self._tokens.get(q.lower(), {})
+
+    def substring_matches(self, q: str) -> list[int]:
+        """Return the sorted indices of foods whose names contain the query."""
+        q = q.lower()
+
+        grams = sorted(
+            (self._trigrams.get(t, set()) for t in _trigrams(q)),
+            key=len,
+        )
+
+        if grams:
+            # A substring of the name must contain all of the query's trigrams.
+            idxs = sorted(set(grams[0]).intersection(*grams[1:]))
+        else:
+            idxs = range(len(self._lower))
+
+        return [i for i in idxs if q in self._lower[i]]
+
+    def scores(self, q: str) -> np.ndarray:
+        """Calculate the relevance score of every food for a query.
+
+        Args:
+            q: The search query.
+
+        Returns:
+            Array of combined relevance scores, in food index order.
+        """
+        q_lower = q.lower()
+
+        # Multiple scoring factors
+        wratio = self._cdist(q, self._names, fuzz.WRatio)
+        ratio = self._cdist(q_lower, self._lower, fuzz.ratio)
+        token_sort = self._cdist(q_lower, self._lower, fuzz.token_sort_ratio)
+
+        scores = wratio * 0.5 + ratio * 0.3 + token_sort * 0.2
+
+        positions = self.exact_word_positions(q)
+        if positions:
+            idxs = np.fromiter(positions.keys(), dtype=np.intp, count=len(positions))
+            pos = np.fromiter(positions.values(), dtype=np.intp, count=len(idxs))
+
+            # Position bonus - earlier position = higher score
+            # First word is MUCH more important (the food IS that thing)
+            # vs later words (the food CONTAINS that thing)
+            position_bonus = np.select([pos == 0, pos == 1, pos == 2], [60, 5, 2], 0)
+
+            scores[idxs] = (
+                wratio[idxs] * 0.25
+                + ratio[idxs] * 0.25
+                + token_sort[idxs] * 0.15
+                + self._length_penalty[idxs] * 0.10
+                + self._word_count_penalty[idxs] * 0.10
+                + position_bonus  # Position is very important!
+            )
+
+        # Heavy penalty for substring matches that are NOT word matches
+        substring_only = [i for i in self.substring_matches(q) if i not in positions]
+        scores[substring_only] *= 0.5
+
+        return scores
+
+    def _cdist(self, q: str, choices: list[str], scorer) -> np.ndarray:
+        return process.cdist(
+            [q], choices, scorer=scorer, dtype=np.float64, workers=self._workers
+        )[0]
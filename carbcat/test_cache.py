@@ -0,0 +1,29 @@
+"""Tests for the LRU cache."""
+
+from cache import LRUCache
+
+
+def test_lru_eviction():
+    c = LRUCache(maxsize=2)
+
+    assert c.get_or_set("a", lambda: 1) == 1
+    assert c.get_or_set("b", lambda: 2) == 2
+    assert c.get_or_set("a", lambda: 0) == 1  # Hit, "b" is now least recent.
+    assert c.get_or_set("c", lambda: 3) == 3  # Evicts "b".
+    assert c.get_or_set("b", lambda: 4) == 4
+
+    stats = c.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 4, 2)
+
+
+def test_ttl_expiration(mocker):
+    now = mocker.patch("cache.time.monotonic", return_value=100.0)
+    c = LRUCache(maxsize=2, ttl=10)
+
+    assert c.get_or_set("a", lambda: 1) == 1
+
+    now.return_value = 109.0
+    assert c.get_or_set("a", lambda: 2) == 1
+
+    now.return_value = 110.0
+    assert c.get_or_set("a", lambda: 3) == 3
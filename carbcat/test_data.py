@@ -1,6 +1,12 @@
 """Tests for data module food database loading and search functionality."""
 
+import threading
+
+import bench_data
 import data
+import db
+import numpy as np
+import pytest
 
 
 def test_load():
@@ -9,8 +15,121 @@ def test_load():
     assert all(foods[i].index == i for i in range(len(foods)))
 
 
+def test_db_is_up_to_date():
+    assert db.DB_PATH.read_bytes() == db.build(), "run `python db.py`"
+
+
+def test_db_portions():
+    foods = db.FoodDB(db.build())
+    idx = next(i for i in range(len(foods)) if foods.name(i).endswith("whiskey sour"))
+
+    assert foods.carbs(idx) == 13.2
+    assert foods.portions(idx) == [
+        (2.0, "fl oz", 65.0),
+        (1.0, "portion (2 oz mix + 1.5 oz whiskey)", 106.0),
+        (1.0, "fl oz", 30.4),
+    ]
+
+
 def test_find_foods_by_name():
     results = data.find_foods_by_name("apple")
     print("\n".join(str(x) for x in results))
     assert results
     assert all(f.name.startswith("Apple") for f, _ in results)
+
+
+def test_search_index():
+    foods = data._load()
+
+    apples = data.loader.get().index.exact_word_positions("Apple")
+    assert any(foods[i].name.startswith("Apples, raw") for i in apples)
+    assert all(pos == 0 for i, pos in apples.items() if foods[i].name[0] == "A")
+
+    idxs = data.loader.get().index.substring_matches("apple")
+    assert idxs
+    assert all("apple" in foods[i].name.lower() for i in idxs)
+    assert data.loader.get().index.substring_matches("pp") == [
+        i for i, f in enumerate(foods) if "pp" in f.name.lower()
+    ]
+
+
+def test_smart_cutoff():
+    assert data._smart_cutoff(np.array([])) == 0
+    assert data._smart_cutoff(np.array([50.0])) == 1
+    assert data._smart_cutoff(np.array([90.0, 89.0, 70.0, 69.0])) == 2
+    assert data._smart_cutoff(np.array([100.0 - i for i in range(30)])) == 16
+
+
+def test_loader_loads_once(monkeypatch):
+    calls = []
+    open_db = data.open_db
+
+    def counting_open_db():
+        calls.append(1)
+        return open_db()
+
+    monkeypatch.setattr(data, "open_db", counting_open_db)
+
+    loader = data.Loader()
+    assert not loader.stats().ready
+
+    loader.warm()
+    threads = [threading.Thread(target=loader.get) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(loader.get().foods) == len(data._load())
+
+    stats = loader.stats()
+    assert stats.ready
+    assert not stats.loading
+    assert stats.load_seconds > 0
+
+
+def test_loader_error(monkeypatch):
+    def failing_open_db():
+        raise FileNotFoundError("data.bin")
+
+    monkeypatch.setattr(data, "open_db", failing_open_db)
+
+    loader = data.Loader()
+    with pytest.raises(FileNotFoundError):
+        loader.get()
+    with pytest.raises(FileNotFoundError):
+        loader.get()
+
+    assert not loader.stats().ready
+
+
+def test_search_cache():
+    data.search_cache.clear()
+
+    results = data.find_foods_by_name("apple")
+    assert data.find_foods_by_name("  apple ") == results
+    assert data.find_foods_by_name("apple", top_n=3) == results[:3]
+    data.find_foods_by_name("Apple")
+
+    stats = data.search_cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 3, 3)
+
+
+def test_search_is_case_sensitive():
+    # Matching scores depend on the query's case, so it isn't normalized.
+    data.search_cache.clear()
+
+    [(food, _), *_] = data.find_foods_by_name("Orange Juice")
+    assert food.name == "Orange Pineapple Juice Blend"
+
+    [(food, _), *_] = data.find_foods_by_name(" orange juice")
+    assert food.name == "Babyfood, juice, orange"
+
+
+def test_search_quality():
+    # Baseline ranking metrics of the benchmark corpus, see bench_data.py.
+    mrr, hit_at_1, hit_at_5 = bench_data.ranking_metrics()
+    assert mrr >= 0.48
+    assert hit_at_1 >= 0.43
+    assert hit_at_5 >= 0.56
@@ -0,0 +1,361 @@
+"""Replay benchmark of recorded GitHub events against in-memory fakes.
+
+Replays a recorded stream of GitHub webhook events (`replay_events.jsonl`)
+the way AutoKitteh would deliver them: at their recorded times, each event
+starts a session of its trigger's handler, and is also delivered to the
+subscriptions of running sessions (e.g. the long-running session of a PR).
+
+Slack, GitHub, and AutoKitteh's event subscriptions are replaced by the fakes
+in `purrr_fakes`, each adding a fixed latency to every API call. The fake Slack
+API also enforces Slack's rate limits. The gaps between events, Purrr's event
+timers, and Slack's rate limit windows are all multiplied by the time scale,
+so that a stream recorded over minutes is replayed in seconds.
+
+The report includes the API calls per handled event, the end-to-end latency
+of each handled event, and the number of Slack API calls that were throttled.
+Events without a trigger in Purrr (e.g. reviews and comments) are delivered
+to subscriptions, but otherwise only counted.
+
+Usage:
+    python bench_replay.py [--events FILE] [--latency-ms MS]
+        [--rate-limit-scale X] [--time-scale X] [--json]
+
+Run it before and after changing the caching or batching in Purrr, with the
+same arguments, to compare the numbers.
+"""
+
+import argparse
+from collections import Counter
+from contextlib import ExitStack
+from contextlib import redirect_stdout
+from dataclasses import asdict
+from dataclasses import dataclass
+from datetime import datetime
+import io
+import json
+from pathlib import Path
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import autokitteh
+from autokitteh import AttrDict
+from autokitteh.store import _local_dev_store
+
+
+with (
+    patch("autokitteh.github.github_client", return_value=MagicMock()),
+    patch("autokitteh.slack.slack_client", return_value=MagicMock()),
+):
+    import channel_names
+    import data_helper
+    import debug
+    import directory
+    import github_helper
+    import github_pr
+    import pr_processor
+    import slack_api
+    import slack_channel
+    import slack_helper
+    import text_utils
+    import users
+
+    from purrr_fakes import Api
+    from purrr_fakes import EventBus
+    from purrr_fakes import FakeGitHub
+    from purrr_fakes import FakeSlack
+
+
+_EVENTS_FILE = Path(__file__).with_name("replay_events.jsonl")
+
+# GitHub event types that start a session (see the "autokitteh.yaml" file).
+_TRIGGERS = {"pull_request": github_pr.on_github_pull_request}
+
+_MODULES = (
+    channel_names,
+    data_helper,
+    debug,
+    directory,
+    github_pr,
+    slack_api,
+    slack_channel,
+    slack_helper,
+    text_utils,
+    users,
+)
+
+# Wait for sessions after the replay (in real seconds, not scaled).
+_SESSION_TIMEOUT = 30
+
+
+@dataclass(frozen=True, kw_only=True)
+class Report:
+    """Replay benchmark results."""
+
+    events: int
+    handled: int
+    latency_ms: float
+    rate_limit_scale: float
+    time_scale: float
+    replay_seconds: float
+    event_p50_ms: float
+    event_p95_ms: float
+    event_max_ms: float
+    slack_messages: int
+    throttled: int
+    paced_seconds: float
+    session_errors: int
+    debug_logs: int
+    unfinished_sessions: int
+    api_calls_per_event: float
+    calls_per_event: dict[str, float]
+
+
+class _Tracker:
+    """Delivery and completion times of events, by the sessions that handle them.
+
+    An event is complete when its session ends (or, if the session keeps
+    running for the PR, when the PR's Slack channel is initialized), and when
+    the PR's long-running session handles it too, if it does.
+    """
+
+    def __init__(self) -> None:
+        self.delivered: dict[int, float] = {}
+        self.completed: dict[int, float] = {}
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._session = threading.local()
+
+    def complete(self, i: int) -> None:
+        with self._lock:
+            self.completed[i] = max(self.completed.get(i, 0.0), time.monotonic())
+
+    def run_session(self, i: int, handler, data: AttrDict) -> None:
+        """Run a trigger's handler, like a new AutoKitteh session would."""
+        self._session.event = i
+        self._session.long_running = False
+        try:
+            handler(SimpleNamespace(data=data))
+        except Exception:  # noqa: BLE001 - reported as a session error.
+            with self._lock:
+                self.errors += 1
+        finally:
+            if not self._session.long_running:
+                self.complete(i)
+
+    def channel_initialized(self) -> None:
+        """The current session has initialized a channel, and keeps running."""
+        self._session.long_running = True
+        self.complete(self._session.event)
+
+
+def _load_events(path: Path) -> list[tuple[float, str, AttrDict]]:
+    """Return the recorded events: (offset in seconds, event type, data)."""
+    events = []
+    for line in path.read_text().splitlines():
+        if line.strip():
+            e = json.loads(line, object_hook=AttrDict)
+            delivered_at = datetime.fromisoformat(e.delivered_at).timestamp()
+            events.append((delivered_at, e.event_type, e.data))
+
+    start = min((t for t, _, _ in events), default=0.0)
+    return [(t - start, event_type, data) for t, event_type, data in events]
+
+
+def _patch_clients(stack: ExitStack, slack, gh) -> None:
+    """Replace the shared Slack and GitHub clients in all the modules."""
+    originals = [(slack_api.shared_client, slack), (github_helper.shared_client, gh)]
+    for module in _MODULES + (github_helper,):
+        for name, value in vars(module).items():
+            for original, fake in originals:
+                if value is original:
+                    stack.enter_context(patch.object(module, name, fake))
+
+
+def _patch_timers(stack: ExitStack, scale: float) -> None:
+    """Multiply Purrr's timers and Slack's rate limit windows by the time scale."""
+    # Not "data_helper._GET_TIMEOUT": waiting for a PR's Slack channel
+    # depends on the latency of API calls, which isn't scaled.
+    for module, name in (
+        (pr_processor, "_REORDER_DELAY"),
+        (pr_processor, "_DIGEST_WINDOW"),
+        (pr_processor, "_HEARTBEAT_INTERVAL"),
+        (slack_channel, "_PR_CLOSE_DELAY"),
+        (slack_api, "_BURST_MINUTES"),
+        (slack_api, "_DEFAULT_RETRY_AFTER"),
+    ):
+        stack.enter_context(patch.object(module, name, getattr(module, name) * scale))
+
+    rates = {tier: rate / scale for tier, rate in slack_api._TIER_RATES.items()}
+    stack.enter_context(patch.dict(slack_api._TIER_RATES, rates))
+    post_rate = slack_api._POST_MESSAGE_RATE / scale
+    stack.enter_context(patch.object(slack_api, "_POST_MESSAGE_RATE", post_rate))
+
+
+def run(
+    events_file: Path = _EVENTS_FILE,
+    latency_ms: float = 50.0,
+    rate_limit_scale: float = 1.0,
+    time_scale: float = 0.02,
+) -> Report:
+    """Run the replay benchmark.
+
+    Args:
+        events_file: Recorded GitHub events, one JSON object per line.
+        latency_ms: Latency of every call to a fake service.
+        rate_limit_scale: Multiplier of Slack's rate limits, or 0 for none.
+        time_scale: Multiplier of recorded gaps, timers, and rate limit windows.
+
+    Returns:
+        The benchmark report.
+    """
+    events = _load_events(events_file)
+    index = {id(data): i for i, (_, _, data) in enumerate(events)}
+
+    latency = latency_ms / 1000
+    apis = {name: Api(name, latency) for name in ("slack", "github")}
+    bus = EventBus()
+    tracker = _Tracker()
+    debug_logs = Counter()
+
+    with ExitStack() as stack:
+        stack.enter_context(redirect_stdout(io.StringIO()))
+
+        # The fake Slack API scales its own rate limit windows.
+        slack = FakeSlack(apis["slack"], rate_limit_scale, time_scale)
+        _patch_timers(stack, time_scale)
+        _patch_clients(stack, slack_api.limit(slack), FakeGitHub(apis["github"]))
+
+        for name in ("subscribe", "unsubscribe", "next_event", "get_webhook_url"):
+            stack.enter_context(patch.object(autokitteh, name, getattr(bus, name)))
+        requests = SimpleNamespace(post=bus.post, RequestException=OSError)
+        stack.enter_context(patch.object(data_helper, "requests", requests))
+        stack.enter_context(
+            patch.object(debug, "log", lambda msg: debug_logs.update([msg]))
+        )
+
+        initialize = slack_channel.initialize_for_github_pr
+        flush = pr_processor.Processor.flush
+
+        def initialize_for_github_pr(*args, **kwargs) -> str:
+            channel_id = initialize(*args, **kwargs)
+            tracker.channel_initialized()
+            return channel_id
+
+        def processor_flush(processor, *args, **kwargs) -> list:
+            events = flush(processor, *args, **kwargs)
+            for data in events:
+                tracker.complete(index[id(data)])
+            return events
+
+        stack.enter_context(
+            patch.object(
+                slack_channel, "initialize_for_github_pr", initialize_for_github_pr
+            )
+        )
+        stack.enter_context(
+            patch.object(pr_processor.Processor, "flush", processor_flush)
+        )
+
+        # Every replay starts with an empty store, and cold caches.
+        _local_dev_store.clear()
+        directory.reset()
+        users.reset_slack_users()
+
+        t0 = time.monotonic()
+        sessions = []
+        for i, (offset, event_type, data) in enumerate(events):
+            time.sleep(max(0.0, t0 + offset * time_scale - time.monotonic()))
+            tracker.delivered[i] = time.monotonic()
+            bus.publish("github_conn", event_type, data)
+
+            if handler := _TRIGGERS.get(event_type):
+                args = (i, handler, data)
+                session = threading.Thread(target=tracker.run_session, args=args)
+                session.daemon = True
+                session.start()
+                sessions.append(session)
+
+        deadline = time.monotonic() + _SESSION_TIMEOUT
+        for session in sessions:
+            session.join(timeout=max(0.0, deadline - time.monotonic()))
+        replay_seconds = time.monotonic() - t0
+
+        calls = Counter()
+        for api in apis.values():
+            calls.update(api.calls)
+        paced = sum(m.get("wait_seconds", 0) for m in slack_api.metrics().values())
+
+        _local_dev_store.clear()
+        directory.reset()
+        users.reset_slack_users()
+
+    handled = [
+        i for i, (_, event_type, _) in enumerate(events) if event_type in _TRIGGERS
+    ]
+    event_ms = [
+        (tracker.completed[i] - tracker.delivered[i]) * 1000
+        for i in handled
+        if i in tracker.completed
+    ]
+    percentiles = _percentiles(event_ms)
+
+    return Report(
+        events=len(events),
+        handled=len(handled),
+        latency_ms=latency_ms,
+        rate_limit_scale=rate_limit_scale,
+        time_scale=time_scale,
+        replay_seconds=replay_seconds,
+        event_p50_ms=percentiles[49],
+        event_p95_ms=percentiles[94],
+        event_max_ms=max(event_ms, default=0.0),
+        slack_messages=len(slack.messages),
+        throttled=slack.throttled,
+        paced_seconds=paced,
+        session_errors=tracker.errors,
+        debug_logs=debug_logs.total(),
+        unfinished_sessions=sum(session.is_alive() for session in sessions),
+        api_calls_per_event=calls.total() / max(1, len(handled)),
+        calls_per_event={k: n / max(1, len(handled)) for k, n in sorted(calls.items())},
+    )
+
+
+def _percentiles(values: list[float]) -> list[float]:
+    if len(values) < 2:
+        return [values[0] if values else 0.0] * 99
+    return statistics.quantiles(values, n=100, method="inclusive")
+
+
+def main() -> None:
+    """Run the replay benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=Path, default=_EVENTS_FILE)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="per API call")
+    parser.add_argument(
+        "--rate-limit-scale", type=float, default=1.0, help="of Slack's limits (0=none)"
+    )
+    parser.add_argument("--time-scale", type=float, default=0.02)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    report = run(args.events, args.latency_ms, args.rate_limit_scale, args.time_scale)
+
+    if args.json:
+        print(json.dumps(asdict(report)))
+        return
+
+    for k, v in asdict(report).items():
+        if isinstance(v, dict):
+            print(f"{k:>24}:")
+            for call, n in v.items():
+                print(f"{call:>40}: {n:.2f}")
+        else:
+            print(f"{k:>24}: {v:.3f}" if isinstance(v, float) else f"{k:>24}: {v}")
+
+
+if __name__ == "__main__":
+    main()
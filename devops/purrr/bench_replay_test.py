@@ -0,0 +1,45 @@
+"""Unit tests for the "bench_replay" module."""
+
+from autokitteh import github, slack
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_github_and_slack_clients(mocker):
+    mocker.patch.object(github, "github_client", autospec=True)
+    mocker.patch.object(slack, "slack_client", autospec=True)
+
+
+def test_run():
+    """Test that every recorded event is handled, without errors."""
+    import bench_replay
+
+    report = bench_replay.run(latency_ms=0, time_scale=0.01)
+
+    assert report.events == 27
+    assert report.handled == 21
+    assert report.session_errors == 0
+    assert report.debug_logs == 0
+    assert report.unfinished_sessions == 0
+
+    # A single channel is created, renamed once, and archived.
+    assert report.calls_per_event["slack.conversations.create"] == 1 / 21
+    assert report.calls_per_event["slack.conversations.rename"] == 1 / 21
+    assert report.calls_per_event["slack.conversations.archive"] == 1 / 21
+
+    # 12 pushes are reported in (at most) a few digests, not in 12 messages.
+    assert report.slack_messages < report.handled
+    assert report.api_calls_per_event == pytest.approx(
+        sum(report.calls_per_event.values())
+    )
+
+
+def test_rate_limits():
+    """Test that Slack's rate limits are honored, even when they're very low."""
+    import bench_replay
+
+    report = bench_replay.run(latency_ms=0, rate_limit_scale=0.05, time_scale=0.01)
+
+    assert report.session_errors == 0
+    assert report.unfinished_sessions == 0
+    assert report.throttled + report.paced_seconds > 0
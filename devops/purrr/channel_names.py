@@ -0,0 +1,144 @@
+"""Index of taken Slack channel names, to pick free names in one step.
+
+Slack channel names are unique in the workspace (including archived channels),
+so a PR channel name that's already taken gets a numeric suffix. Instead of
+trying suffixes one API call at a time, the AutoKitteh store holds a counter
+for each base name: the number of names allocated so far with that base, i.e.
+the base name itself, and then "<base>_2", "<base>_3", etc.
+
+The index is warmed from a paginated list of all the channels in the workspace
+the first time it's used, and kept up to date by name allocations and by the
+"channel_created", "channel_rename", "channel_archive", and "channel_unarchive"
+Slack events. Archiving a channel doesn't free its name, so archived channels
+stay indexed. Renaming a channel does free its old name, but counters only
+grow (lower ones may still be taken), so old names aren't un-indexed. The index
+may skip names that are free, but never picks names that are known to be taken.
+
+Channels that the Slack app can't see (other users' private channels) may still
+collide, so callers should reserve names that turn out to be taken, and retry.
+"""
+
+from datetime import datetime, UTC
+import re
+
+from autokitteh import add_values, check_and_set_value, get_value, set_value
+from slack_sdk.errors import SlackApiError
+
+import debug
+import slack_api
+
+
+_KEY_PREFIX = "slack_channel_name:"
+_WARMED_KEY = "slack_channel_names_warmed"
+
+slack = slack_api.shared_client
+
+
+def on_slack_channel_created(event) -> None:
+    """Slack "channel_created" event handler: index the new channel's name."""
+    reserve(event.data.channel.name)
+
+
+def on_slack_channel_rename(event) -> None:
+    """Slack "channel_rename" event handler: index the channel's new name."""
+    reserve(event.data.channel.name)
+
+
+def on_slack_channel_archive(event) -> None:
+    """Slack "channel_archive" event handler: keep the channel's name indexed."""
+    _reserve_channel(event.data.channel)
+
+
+def on_slack_channel_unarchive(event) -> None:
+    """Slack "channel_unarchive" event handler: keep the channel's name indexed."""
+    _reserve_channel(event.data.channel)
+
+
+def allocate(base: str) -> str:
+    """Return a channel name which isn't taken yet, and mark it as taken.
+
+    Args:
+        base: Desired (and valid) name of the channel.
+
+    Returns:
+        The base name, or the base name with the next free numeric suffix.
+    """
+    _warm()
+    n = add_values(_KEY_PREFIX + base, 1)
+    return base if n == 1 else f"{base}_{n}"
+
+
+def reserve(name: str) -> None:
+    """Mark a channel name as taken, e.g. when it's used by another channel."""
+    for base, n in _counters([name]).items():
+        _raise_counter(base, n)
+
+
+def _reserve_channel(channel_id: str) -> None:
+    """Mark the name of a channel as taken, given only its ID.
+
+    Archived and unarchived channels keep their names, but they may be
+    missing from the index, e.g. if they were renamed before it was warmed.
+    """
+    try:
+        resp = slack.conversations_info(channel=channel_id)
+    except SlackApiError as e:
+        error = f"Failed to get the name of Slack channel <#{channel_id}>"
+        debug.log(f"{error}: `{e.response['error']}`")
+        return
+
+    reserve(resp["channel"]["name"])
+
+
+def _counters(names: list[str]) -> dict[str, int]:
+    """Return the counter values that the given taken names require.
+
+    A name like "foo_3" may be a base name, or the 3rd name of the base "foo".
+    """
+    counters = {}
+    for name in names:
+        counters[name] = max(counters.get(name, 0), 1)
+        if m := re.fullmatch(r"(.+)_(\d+)", name):
+            counters[m[1]] = max(counters.get(m[1], 0), int(m[2]))
+
+    return counters
+
+
+def _raise_counter(base: str, n: int) -> None:
+    """Raise the counter of a base name to at least the given value, atomically."""
+    key = _KEY_PREFIX + base
+    while True:
+        current = get_value(key)
+        if (current or 0) >= n or check_and_set_value(key, current, n):
+            return
+
+
+def _warm() -> None:
+    """Index the names of all the existing channels, if not done yet."""
+    if get_value(_WARMED_KEY):
+        return
+
+    names = []
+    next_cursor = None
+    while next_cursor != "":
+        try:
+            resp = slack.conversations_list(
+                cursor=next_cursor,
+                exclude_archived=False,
+                limit=1000,
+                types="public_channel,private_channel",
+            )
+        except SlackApiError as e:
+            # Don't mark the index as warm, but allocate names anyway:
+            # collisions with unindexed channels are handled by callers.
+            debug.log(f"Failed to list Slack channels: `{e.response['error']}`")
+            return
+
+        names += [c["name"] for c in resp.get("channels", [])]
+        next_cursor = resp.get("response_metadata", {}).get("next_cursor", "")
+
+    for base, n in _counters(names).items():
+        _raise_counter(base, n)
+
+    set_value(_WARMED_KEY, datetime.now(UTC).isoformat())
+    print(f"Indexed {len(names)} Slack channel names")
@@ -0,0 +1,184 @@
+"""Unit tests for the "channel_names" module."""
+
+from autokitteh import github, slack
+from autokitteh.store import _local_dev_store
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_github_and_slack_clients(mocker):
+    mocker.patch.object(github, "github_client", autospec=True)
+    mocker.patch.object(slack, "slack_client", autospec=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_store(setup_mock_github_and_slack_clients):
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
+@pytest.fixture
+def mock_channels(mocker):
+    """Existing Slack channels, in 2 pages."""
+    import channel_names
+
+    pages = {
+        None: {
+            "channels": [{"name": "general"}, {"name": "_pr_fix-tests"}],
+            "response_metadata": {"next_cursor": "2"},
+        },
+        "2": {
+            "channels": [{"name": "_pr_fix-tests_3"}, {"name": "_pr_docs_2"}],
+            "response_metadata": {"next_cursor": ""},
+        },
+    }
+    mock = mocker.patch.object(channel_names.slack, "conversations_list")
+    mock.side_effect = lambda cursor, **kwargs: pages[cursor]
+    return mock
+
+
+class TestAllocate:
+    """Unit tests for the "allocate" function."""
+
+    def test_free_name(self, mock_channels):
+        import channel_names
+
+        assert channel_names.allocate("_pr_new") == "_pr_new"
+        assert channel_names.allocate("_pr_new") == "_pr_new_2"
+        assert channel_names.allocate("_pr_new") == "_pr_new_3"
+
+    def test_taken_names(self, mock_channels):
+        import channel_names
+
+        assert channel_names.allocate("_pr_fix-tests") == "_pr_fix-tests_4"
+        assert channel_names.allocate("_pr_docs") == "_pr_docs_3"
+        assert channel_names.allocate("_pr_fix-tests_3") == "_pr_fix-tests_3_2"
+
+    def test_warm_once(self, mock_channels):
+        import channel_names
+
+        channel_names.allocate("a")
+        channel_names.allocate("b")
+
+        assert mock_channels.call_count == 2  # 2 pages, once.
+
+    def test_warm_error(self, mock_channels):
+        import channel_names
+        from slack_sdk.errors import SlackApiError
+
+        mock_channels.side_effect = SlackApiError("", {"error": "ratelimited"})
+
+        assert channel_names.allocate("_pr_fix-tests") == "_pr_fix-tests"
+        assert not channel_names.get_value(channel_names._WARMED_KEY)
+
+
+class TestReserve:
+    """Unit tests for the "reserve" function and the event handlers."""
+
+    def test_reserve(self, mock_channels):
+        import channel_names
+
+        channel_names.reserve("_pr_new_5")
+        channel_names.reserve("_pr_new_2")  # Doesn't lower the counter.
+
+        assert channel_names.allocate("_pr_new") == "_pr_new_6"
+        assert channel_names.allocate("_pr_new_5") == "_pr_new_5_2"
+
+    def test_events(self, mock_channels):
+        import autokitteh
+        import channel_names
+
+        event = autokitteh.AttrDict({"data": {"channel": {"name": "created"}}})
+        channel_names.on_slack_channel_created(event)
+        event = autokitteh.AttrDict({"data": {"channel": {"name": "renamed"}}})
+        channel_names.on_slack_channel_rename(event)
+
+        assert channel_names.allocate("created") == "created_2"
+        assert channel_names.allocate("renamed") == "renamed_2"
+
+    def test_archive_events(self, mocker, mock_channels):
+        import autokitteh
+        import channel_names
+
+        info = mocker.patch.object(channel_names.slack, "conversations_info")
+        info.side_effect = lambda channel: {"channel": {"name": f"_pr_{channel}"}}
+
+        event = autokitteh.AttrDict({"data": {"channel": "archived"}})
+        channel_names.on_slack_channel_archive(event)
+        event = autokitteh.AttrDict({"data": {"channel": "unarchived_2"}})
+        channel_names.on_slack_channel_unarchive(event)
+
+        assert channel_names.allocate("_pr_archived") == "_pr_archived_2"
+        assert channel_names.allocate("_pr_unarchived") == "_pr_unarchived_3"
+
+    def test_archive_event_error(self, mocker, mock_channels):
+        import autokitteh
+        import channel_names
+        from slack_sdk.errors import SlackApiError
+
+        info = mocker.patch.object(channel_names.slack, "conversations_info")
+        info.side_effect = SlackApiError("", {"error": "channel_not_found"})
+        mock_log = mocker.patch.object(channel_names.debug, "log")
+
+        event = autokitteh.AttrDict({"data": {"channel": "C1"}})
+        channel_names.on_slack_channel_archive(event)
+
+        mock_log.assert_called_once()
+
+
+class TestCreateChannel:
+    """Unit tests for "slack_helper.create_channel" with the index."""
+
+    def test_single_api_call(self, mock_channels):
+        import slack_helper
+
+        create = slack_helper.shared_client.conversations_create
+        create.reset_mock(side_effect=True)
+        create.return_value = {"channel": {"id": "C1"}}
+
+        assert slack_helper.create_channel("fix-tests") == "C1"
+        create.assert_called_once_with(name="_pr_fix-tests_4", is_private=False)
+
+    def test_unindexed_collision(self, mock_channels):
+        from slack_sdk.errors import SlackApiError
+
+        import slack_helper
+
+        create = slack_helper.shared_client.conversations_create
+        create.reset_mock()
+        create.side_effect = [
+            SlackApiError("", {"error": "name_taken"}),
+            {"channel": {"id": "C1"}},
+        ]
+
+        assert slack_helper.create_channel("secret") == "C1"
+        create.assert_called_with(name="_pr_secret_2", is_private=False)
+        create.side_effect = None
+
+
+class TestRenameChannel:
+    """Unit tests for "slack_helper.rename_channel" with the index."""
+
+    @pytest.mark.parametrize("current", ["_pr_fix-tests", "_pr_fix-tests_2"])
+    def test_same_name(self, mock_channels, current):
+        import slack_helper
+
+        info = slack_helper.shared_client.conversations_info
+        info.return_value = {"channel": {"id": "C1", "name": current}}
+        rename = slack_helper.shared_client.conversations_rename
+        rename.reset_mock()
+
+        slack_helper.rename_channel("C1", "fix-tests")
+        rename.assert_not_called()
+
+    def test_new_name(self, mock_channels):
+        import slack_helper
+
+        info = slack_helper.shared_client.conversations_info
+        info.return_value = {"channel": {"id": "C1", "name": "_pr_fix-tests_2"}}
+        rename = slack_helper.shared_client.conversations_rename
+        rename.reset_mock()
+
+        slack_helper.rename_channel("C1", "fix-docs")
+        rename.assert_called_once_with(channel="C1", name="_pr_fix-docs")
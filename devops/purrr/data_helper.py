@@ -1,9 +1,26 @@
-"""Thin wrapper over the Google Sheets API for data management and caching.
+"""Thin wrapper over the AutoKitteh store for data management and caching.
 
-Redis/Valkey would be a better choice, but are not available at this time.
+The store doesn't expire values on its own, so cached and temporary values
+are stored with an expiration time, and deleted when they're read after it.
+
+GitHub links (PRs, reviews, comments) are mapped to the Slack channels and
+message threads that represent them, so that a later GitHub event is routed
+with a single key lookup. Lookups that arrive before their mapping exists wait
+for a notification through the "github_link_mapped" webhook trigger, instead
+of polling the store.
 """
 
-from datetime import datetime
+from collections.abc import Callable
+from datetime import datetime, UTC
+import json
+import os
+import re
+import time
+from typing import Any
+
+import autokitteh
+from autokitteh import check_and_set_value, del_value, get_value, set_value
+import requests
 
 
 # Some read functions wait up to 5 seconds for data to exist,
@@ -16,13 +33,65 @@ _GET_TIMEOUT = 5
 # of API calls (especially to Slack), to avoid throttling.
 _USER_CACHE_TTL = "24h"
 
+# TTL for GitHub/Slack mappings (to forget stale PRs).
+_STATE_TTL = os.getenv("STATE_TTL", "720h")
+
+# Per-PR event processors refresh their marks more often than this.
+_PR_PROCESSOR_TTL = "15m"
+
+_GITHUB_LINK_PREFIX = "github_link:"
+_GITHUB_LINK_WAITER_PREFIX = "github_link_waiter:"
+_GITHUB_REF_PREFIX = "github_ref:"
+_PR_PROCESSOR_PREFIX = "pr_processor:"
+_SLACK_USER_ID_PREFIX = "slack_user_id:"
+_OPT_OUTS_KEY = "slack_opt_outs"
+
+
+def _parse_duration(s: str) -> float:
+    """Convert a duration string like "24h" or "1h30m" to seconds."""
+    units = {"h": 3600, "m": 60, "s": 1}
+    parts = re.findall(r"(\d+(?:\.\d+)?)([hms])", s)
+    if not parts or "".join(n + u for n, u in parts) != s.strip():
+        raise ValueError(f"invalid duration: {s!r}")
+
+    return sum(float(n) * units[u] for n, u in parts)
+
+
+def _set(key: str, value: Any, ttl: str) -> None:
+    """Store a value that expires after the given duration."""
+    expires = time.time() + _parse_duration(ttl)
+    set_value(key, {"value": value, "expires": expires})
+
+
+def _get(key: str, ttl: str, extend: bool = False) -> Any:
+    """Return a stored value, or None if it doesn't exist or has expired.
+
+    Args:
+        key: Key of the value.
+        ttl: The value's TTL, to extend it with.
+        extend: Extend the value's TTL on every read (at most once per
+            half a TTL, to avoid a write on every read).
+    """
+    entry = get_value(key)
+    if not entry:
+        return None
+
+    if entry["expires"] <= time.time():
+        del_value(key)
+        return None
+
+    if extend and entry["expires"] - time.time() < _parse_duration(ttl) / 2:
+        _set(key, entry["value"], ttl)
+
+    return entry["value"]
+
 
 def cache_github_reference(slack_user_id: str, github_ref: str) -> None:
     """Map a Slack user ID to a GitHub user reference/name, for a day.
 
     This helps reduce the amount of lookup API calls, to avoid throttling.
     """
-    return  # TODO: Implement this function.
+    _set(_GITHUB_REF_PREFIX + slack_user_id, github_ref, _USER_CACHE_TTL)
 
 
 def cached_github_reference(slack_user_id: str) -> str:
@@ -30,7 +99,8 @@ def cached_github_reference(slack_user_id: str) -> str:
 
     This helps reduce the amount of lookup API calls, to avoid throttling.
     """
-    return ""  # TODO: Implement this function.
+    key = _GITHUB_REF_PREFIX + slack_user_id
+    return _get(key, _USER_CACHE_TTL, extend=True) or ""
 
 
 def cache_slack_user_id(github_username: str, slack_user_id: str) -> None:
@@ -38,7 +108,7 @@ def cache_slack_user_id(github_username: str, slack_user_id: str) -> None:
 
     This helps reduce the amount of Slack lookup API calls, to avoid throttling.
     """
-    return  # TODO: Implement this function.
+    _set(_SLACK_USER_ID_PREFIX + github_username, slack_user_id, _USER_CACHE_TTL)
 
 
 def cached_slack_user_id(github_username: str) -> str:
@@ -46,7 +116,8 @@ def cached_slack_user_id(github_username: str) -> str:
 
     This helps reduce the amount of Slack lookup API calls, to avoid throttling.
     """
-    return ""  # TODO: Implement this function.
+    key = _SLACK_USER_ID_PREFIX + github_username
+    return _get(key, _USER_CACHE_TTL, extend=True) or ""
 
 
 def lookup_github_link_details(github_link: str) -> str | None:
@@ -60,19 +131,96 @@ def lookup_github_link_details(github_link: str) -> str | None:
     if not github_link:
         return None
 
-    return None  # TODO: Implement this function (with "wait=True").
+    key = _GITHUB_LINK_PREFIX + github_link
+    details = _get(key, _STATE_TTL)
+    if details:
+        return details
+
+    # Not mapped yet: ask the mapping's writer to notify us, subscribe to
+    # the notification, and only then check again, so it can't be missed.
+    _set(_GITHUB_LINK_WAITER_PREFIX + github_link, True, f"{_GET_TIMEOUT}s")
+    filter = f"data.body.json.github_link == {json.dumps(github_link)}"
+    sub = autokitteh.subscribe("github_link_mapped", filter=filter)
+    try:
+        details = _get(key, _STATE_TTL)
+        if not details and autokitteh.next_event(sub, timeout=_GET_TIMEOUT):
+            details = _get(key, _STATE_TTL)
+    finally:
+        autokitteh.unsubscribe(sub)
+
+    return details
+
+
+def map_github_link_details(github_link: str, details: str) -> None:
+    """Map a GitHub PR link to a Slack channel ID or message thread timestamp.
+
+    The mapping expires after `STATE_TTL`, to forget stale PRs. Sessions that
+    are already waiting for it in "lookup_github_link_details" are notified.
+    """
+    _set(_GITHUB_LINK_PREFIX + github_link, details, _STATE_TTL)
+
+    waiter = _GITHUB_LINK_WAITER_PREFIX + github_link
+    if not _get(waiter, f"{_GET_TIMEOUT}s"):
+        return
+
+    del_value(waiter)
+    url = autokitteh.get_webhook_url("github_link_mapped")
+    try:
+        requests.post(url, json={"github_link": github_link}, timeout=_GET_TIMEOUT)
+    except requests.RequestException as e:
+        # The waiters will time out, but the mapping itself is fine.
+        print(f"Failed to notify waiters for {github_link}: {e}")
+
+
+def mark_pr_processor(pr_url: str) -> None:
+    """Mark a GitHub PR as having an active event processor session.
+
+    The mark expires after `_PR_PROCESSOR_TTL`, in case the session dies
+    without removing it, so the processor has to refresh it periodically.
+    """
+    _set(_PR_PROCESSOR_PREFIX + pr_url, True, _PR_PROCESSOR_TTL)
+
+
+def pr_processor_active(pr_url: str) -> bool:
+    """Return whether a GitHub PR has an active event processor session."""
+    return bool(_get(_PR_PROCESSOR_PREFIX + pr_url, _PR_PROCESSOR_TTL))
+
+
+def unmark_pr_processor(pr_url: str) -> None:
+    """Mark a GitHub PR as not having an active event processor session."""
+    del_value(_PR_PROCESSOR_PREFIX + pr_url)
 
 
 def slack_opt_in(user_id: str) -> None:
     """Delete the opt-out timestamp for a Slack user."""
-    return  # TODO: Implement this function.
+    _update_opt_outs(lambda opt_outs: opt_outs.pop(user_id, None))
 
 
 def slack_opt_out(user_id: str) -> None:
-    """Return the opt-out timestamp for a Slack user, or None if they're opted-in."""
-    return  # TODO: Implement this function.
+    """Set the opt-out timestamp for a Slack user to the current time."""
+    ts = datetime.now(UTC).isoformat()
+    _update_opt_outs(lambda opt_outs: opt_outs.setdefault(user_id, ts))
 
 
 def slack_opted_out(user_id: str) -> datetime | None:
     """Return the opt-out timestamp for a Slack user, or None if they're opted-in."""
-    return None  # TODO: Implement this function.
+    ts = (get_value(_OPT_OUTS_KEY) or {}).get(user_id)
+    return datetime.fromisoformat(ts) if ts else None
+
+
+def slack_opted_out_users() -> set[str]:
+    """Return the IDs of all the Slack users who opted out, in a single lookup."""
+    return set(get_value(_OPT_OUTS_KEY) or {})
+
+
+def _update_opt_outs(update: Callable[[dict[str, str]], Any]) -> None:
+    """Update the opt-outs of all users, which are stored as a single value.
+
+    Users opt in/out rarely, so concurrent updates are retried rather than locked.
+    """
+    while True:
+        old = get_value(_OPT_OUTS_KEY)
+        new = dict(old or {})
+        update(new)
+        if new == (old or {}) or check_and_set_value(_OPT_OUTS_KEY, old, new):
+            return
@@ -0,0 +1,226 @@
+"""Unit tests for the "data_helper" module."""
+
+from datetime import datetime, UTC
+
+from autokitteh.store import _local_dev_store
+import pytest
+
+import data_helper
+
+
+@pytest.fixture(autouse=True)
+def clear_store():
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
+@pytest.fixture
+def mock_time(mocker):
+    """Control the wall-clock time."""
+    now = [1_000_000.0]
+    mocker.patch.object(data_helper.time, "time", side_effect=lambda: now[0])
+    return now
+
+
+class TestParseDuration:
+    """Unit tests for the "_parse_duration" function."""
+
+    def test_valid(self):
+        assert data_helper._parse_duration("24h") == 24 * 3600
+        assert data_helper._parse_duration("1h30m") == 5400
+        assert data_helper._parse_duration("1.5s") == 1.5
+
+    def test_invalid(self):
+        for s in ("", "24", "1d", "h", "1h foo"):
+            with pytest.raises(ValueError, match="invalid duration"):
+                data_helper._parse_duration(s)
+
+
+class TestUserCache:
+    """Unit tests for the user lookup cache functions."""
+
+    def test_miss(self):
+        assert data_helper.cached_slack_user_id("octocat") == ""
+        assert data_helper.cached_github_reference("U123") == ""
+
+    def test_hit(self):
+        data_helper.cache_slack_user_id("octocat", "U123")
+        data_helper.cache_github_reference("U123", "@octocat")
+
+        assert data_helper.cached_slack_user_id("octocat") == "U123"
+        assert data_helper.cached_github_reference("U123") == "@octocat"
+
+    def test_negative_results(self):
+        data_helper.cache_slack_user_id("dependabot", "bot")
+        data_helper.cache_slack_user_id("stranger", "not found")
+
+        assert data_helper.cached_slack_user_id("dependabot") == "bot"
+        assert data_helper.cached_slack_user_id("stranger") == "not found"
+
+    def test_expiration(self, mock_time):
+        data_helper.cache_slack_user_id("octocat", "U123")
+
+        mock_time[0] += 24 * 3600 + 1
+
+        assert data_helper.cached_slack_user_id("octocat") == ""
+        assert not _local_dev_store  # Expired entries are deleted.
+
+    def test_hit_extends_ttl(self, mock_time):
+        data_helper.cache_slack_user_id("octocat", "U123")
+
+        # Hits in the first half of the TTL don't write anything.
+        mock_time[0] += 6 * 3600
+        assert data_helper.cached_slack_user_id("octocat") == "U123"
+        mock_time[0] += 12 * 3600
+        assert data_helper.cached_slack_user_id("octocat") == "U123"
+
+        # A day since the last hit, but not since the first write.
+        mock_time[0] += 23 * 3600
+        assert data_helper.cached_slack_user_id("octocat") == "U123"
+
+
+class TestGithubLinks:
+    """Unit tests for the GitHub link mapping functions."""
+
+    @pytest.fixture
+    def mock_ak(self, mocker):
+        mocker.patch.object(data_helper.autokitteh, "subscribe", return_value="sub")
+        mocker.patch.object(data_helper.autokitteh, "next_event", return_value=None)
+        mocker.patch.object(data_helper.autokitteh, "unsubscribe")
+        mocker.patch.object(
+            data_helper.autokitteh, "get_webhook_url", return_value="http://ak/hook"
+        )
+        return mocker.patch.object(data_helper.requests, "post")
+
+    def test_empty_link(self, mock_ak):
+        assert data_helper.lookup_github_link_details("") is None
+        data_helper.autokitteh.subscribe.assert_not_called()
+
+    def test_hit_is_single_lookup(self, mock_ak, mocker):
+        data_helper.map_github_link_details("https://github.com/o/r/pull/1", "C123")
+        spy = mocker.spy(data_helper, "get_value")
+
+        link = "https://github.com/o/r/pull/1"
+        assert data_helper.lookup_github_link_details(link) == "C123"
+        assert spy.call_count == 1
+        data_helper.autokitteh.subscribe.assert_not_called()
+        mock_ak.assert_not_called()  # No one was waiting.
+
+    def test_wait_for_notification(self, mock_ak):
+        link = "https://github.com/o/r/pull/1#discussion_r1"
+
+        def next_event(sub, timeout):
+            # The parent event's session maps the link while we wait.
+            data_helper.map_github_link_details(link, "1234.5678")
+            return {"body": {"json": {"github_link": link}}}
+
+        data_helper.autokitteh.next_event.side_effect = next_event
+
+        assert data_helper.lookup_github_link_details(link) == "1234.5678"
+
+        filter = data_helper.autokitteh.subscribe.call_args.kwargs["filter"]
+        assert link in filter
+        mock_ak.assert_called_once_with(
+            "http://ak/hook",
+            json={"github_link": link},
+            timeout=data_helper._GET_TIMEOUT,
+        )
+        data_helper.autokitteh.unsubscribe.assert_called_once_with("sub")
+
+    def test_mapped_before_subscription(self, mock_ak):
+        link = "https://github.com/o/r/pull/1#pullrequestreview-1"
+
+        def subscribe(source, filter):
+            data_helper.map_github_link_details(link, "1234.5678")
+            return "sub"
+
+        data_helper.autokitteh.subscribe.side_effect = subscribe
+
+        assert data_helper.lookup_github_link_details(link) == "1234.5678"
+        data_helper.autokitteh.next_event.assert_not_called()
+
+    def test_wait_timeout(self, mock_ak):
+        link = "https://github.com/o/r/pull/1#discussion_r1"
+
+        assert data_helper.lookup_github_link_details(link) is None
+        data_helper.autokitteh.next_event.assert_called_once_with(
+            "sub", timeout=data_helper._GET_TIMEOUT
+        )
+        data_helper.autokitteh.unsubscribe.assert_called_once_with("sub")
+
+    def test_expired_waiter_is_not_notified(self, mock_ak, mock_time):
+        link = "https://github.com/o/r/pull/1"
+        data_helper.lookup_github_link_details(link)
+
+        mock_time[0] += data_helper._GET_TIMEOUT + 1
+        data_helper.map_github_link_details(link, "C123")
+
+        mock_ak.assert_not_called()
+
+    def test_notification_failure(self, mock_ak):
+        link = "https://github.com/o/r/pull/1"
+        data_helper.lookup_github_link_details(link)
+        mock_ak.side_effect = data_helper.requests.ConnectionError("boom")
+
+        data_helper.map_github_link_details(link, "C123")
+
+        assert data_helper.lookup_github_link_details(link) == "C123"
+
+
+class TestOptOut:
+    """Unit tests for the Slack opt-out functions."""
+
+    def test_opt_out_and_in(self):
+        assert data_helper.slack_opted_out("U123") is None
+
+        before = datetime.now(UTC)
+        data_helper.slack_opt_out("U123")
+
+        assert before <= data_helper.slack_opted_out("U123") <= datetime.now(UTC)
+        assert data_helper.slack_opted_out("U456") is None
+
+        data_helper.slack_opt_in("U123")
+
+        assert data_helper.slack_opted_out("U123") is None
+
+    def test_opt_in_when_opted_in(self):
+        data_helper.slack_opt_in("U123")
+
+        assert data_helper.slack_opted_out("U123") is None
+
+    def test_opted_out_users(self):
+        assert data_helper.slack_opted_out_users() == set()
+
+        data_helper.slack_opt_out("U123")
+        data_helper.slack_opt_out("U456")
+        data_helper.slack_opt_out("U789")
+        data_helper.slack_opt_in("U456")
+
+        assert data_helper.slack_opted_out_users() == {"U123", "U789"}
+
+    def test_second_opt_out_keeps_timestamp(self):
+        data_helper.slack_opt_out("U123")
+        first = data_helper.slack_opted_out("U123")
+        data_helper.slack_opt_out("U123")
+
+        assert data_helper.slack_opted_out("U123") == first
+
+    def test_concurrent_update_is_retried(self, mocker):
+        data_helper.slack_opt_out("U123")
+
+        real_check_and_set = data_helper.check_and_set_value
+
+        def check_and_set(key, expected, new):
+            # Another session opts out between our read and our write.
+            if mock.call_count == 1:
+                data_helper.set_value(key, expected | {"U456": "2000-01-01"})
+            return real_check_and_set(key, expected, new)
+
+        mock = mocker.patch.object(
+            data_helper, "check_and_set_value", side_effect=check_and_set
+        )
+        data_helper.slack_opt_out("U789")
+
+        assert data_helper.slack_opted_out_users() == {"U123", "U456", "U789"}
+        assert mock.call_count == 2
@@ -1,19 +1,21 @@
 """Simple utility functions for debugging and reporting errors in Slack.
 
-Decoupled from the "slack_helper" module, to avoid circular imports.
+Decoupled from the "slack_helper" module, to avoid circular imports
+(so it uses the shared Slack client from the "slack_api" module directly).
 """
 
 import os
 import re
 import traceback
 
-from autokitteh.slack import slack_client
 from slack_sdk.errors import SlackApiError
 
+import slack_api
+
 
 _DEBUG_CHANNEL = os.getenv("SLACK_DEBUG_CHANNEL")
 
-slack = slack_client("slack_conn")
+slack = slack_api.shared_client
 
 
 def log(msg: str) -> None:
@@ -0,0 +1,300 @@
+"""Org-wide directory of matching GitHub and Slack user identities.
+
+The directory is built in bulk on a schedule (see the "directory_sync"
+trigger): it lists all the GitHub org members and Slack workspace users,
+matches them by email address and then by normalized full name, and saves
+the results in the AutoKitteh store. Lookups load them once per session,
+and then answer from memory, without any API calls.
+
+The directory of a large organization may exceed the size limit of a single
+value in the AutoKitteh store, so it's saved in shards, by key hash. Each
+sync writes a new version of all the shards, and only then switches to it.
+
+GitHub doesn't list the email addresses and full names of org members, so
+every sync fetches only the profiles of new members, and of a few members
+whose profiles were fetched more than `_PROFILE_TTL` ago.
+"""
+
+import json
+import math
+import time
+import unicodedata
+import zlib
+
+from autokitteh import del_value, get_value, set_value
+from github import GithubException
+from slack_sdk.errors import SlackApiError
+
+import debug
+import github_helper
+import slack_api
+
+
+# Current version of the directory, and its number of shards.
+_KEY = "directory"
+
+# Shards are kept well below the AutoKitteh store's value size limit.
+_MAX_SHARD_SIZE = 64 * 1024  # Bytes of JSON.
+
+# Refresh each GitHub profile about once a week, and spread the refreshes
+# over multiple syncs, to stay well within GitHub's API rate limits.
+_PROFILE_TTL = 7 * 24 * 3600  # Seconds.
+_MAX_PROFILE_REFRESHES = 100
+
+# Long-running sessions reload the directory after the next sync.
+_RELOAD_INTERVAL = 3600  # Seconds.
+
+gh = github_helper.shared_client
+slack = slack_api.shared_client
+
+_directory: dict = {}
+_loaded_at = 0.0
+
+
+def on_directory_sync(_) -> None:
+    """Scheduled trigger: sync the directory with GitHub and Slack."""
+    sync()
+
+
+def sync() -> None:
+    """List all the GitHub and Slack users, and save their matches in the store."""
+    old = _read()
+
+    profiles = _github_profiles(old.get("github_profiles", {}))
+    slack_users = _slack_users()
+    if profiles is None or slack_users is None:
+        return  # Keep the previous directory, errors were already reported.
+
+    github_to_slack, slack_to_github = match(profiles, slack_users)
+    _save(
+        {
+            "github_profiles": profiles,
+            "github_to_slack": github_to_slack,
+            "slack_to_github": slack_to_github,
+        }
+    )
+
+    reset()
+    msg = f"Directory sync: {len(profiles)} GitHub members, {len(slack_users)} "
+    print(msg + f"Slack users, {len(github_to_slack)} matched")
+
+
+def slack_user_id(github_username: str) -> str | None:
+    """Return the Slack user ID of a GitHub org member.
+
+    Returns:
+        Slack user ID, or "" if the GitHub user is a bot or doesn't have
+        a matching Slack user, or None if the GitHub user is unknown.
+    """
+    d = _load()
+    if github_username not in d.get("github_profiles", {}):
+        return None
+
+    return d["github_to_slack"].get(github_username, "")
+
+
+def github_reference(slack_user_id: str) -> str | None:
+    """Return the GitHub user reference/name of a Slack user.
+
+    Returns:
+        GitHub user reference, or the Slack user's full name if they
+        don't have a matching GitHub org member, or None if unknown.
+    """
+    return _load().get("slack_to_github", {}).get(slack_user_id)
+
+
+def github_logins_by_name(name: str) -> list[str] | None:
+    """Return the logins of all the GitHub org members with the given full name.
+
+    Returns:
+        GitHub logins (possibly empty), or None if the directory wasn't synced yet.
+    """
+    profiles = _load().get("github_profiles")
+    if profiles is None:
+        return None
+
+    name = normalize_name(name)
+    return [login for login, p in profiles.items() if normalize_name(p[0]) == name]
+
+
+def normalize_name(name: str | None) -> str:
+    """Normalize a full name for matching: no accents, case, or extra whitespace."""
+    name = unicodedata.normalize("NFKD", name or "")
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.casefold().split())
+
+
+def match(
+    profiles: dict[str, list], slack_users: list[dict]
+) -> tuple[dict[str, str], dict[str, str]]:
+    """Match GitHub org members and Slack users.
+
+    Args:
+        profiles: GitHub login -> [name, email, type, fetched timestamp].
+        slack_users: Slack user objects, from the "users.list" API.
+
+    Returns:
+        GitHub login -> Slack user ID (only matched users), and
+        Slack user ID -> GitHub reference, or the Slack user's full name.
+    """
+    slack_by_email: dict[str, str] = {}
+    slack_by_name: dict[str, str] = {}
+    for user in slack_users:
+        if user.get("deleted") or user.get("is_bot"):
+            continue
+        profile = user.get("profile", {})
+        if email := profile.get("email", "").lower():
+            slack_by_email.setdefault(email, user["id"])
+        for field in ("real_name", "real_name_normalized"):
+            if name := normalize_name(profile.get(field)):
+                slack_by_name.setdefault(name, user["id"])
+
+    github_by_email: dict[str, str] = {}
+    github_by_name: dict[str, list[str]] = {}
+    for login, (name, email, user_type, _) in profiles.items():
+        if user_type == "Bot":
+            continue
+        if email:
+            github_by_email.setdefault(email.lower(), login)
+        if name := normalize_name(name):
+            github_by_name.setdefault(name, []).append(login)
+
+    # Email addresses first, and then the first Slack user with the same name.
+    github_to_slack = {}
+    for login, (name, email, user_type, _) in profiles.items():
+        if user_type == "Bot":
+            continue
+        slack_id = slack_by_email.get((email or "").lower())
+        slack_id = slack_id or slack_by_name.get(normalize_name(name))
+        if slack_id:
+            github_to_slack[login] = slack_id
+
+    # Email addresses first, and then the only GitHub member with the same name.
+    slack_to_github = {}
+    for user in slack_users:
+        if user.get("deleted"):
+            continue
+        profile = user.get("profile", {})
+        real_name = profile.get("real_name", "")
+        if user.get("is_bot"):
+            slack_to_github[user["id"]] = real_name or "Some Slack app"
+            continue
+
+        login = github_by_email.get(profile.get("email", "").lower())
+        if not login:
+            logins = github_by_name.get(normalize_name(real_name), [])
+            login = logins[0] if len(logins) == 1 else ""
+
+        if login:
+            slack_to_github[user["id"]] = "@" + login
+        elif real_name:
+            slack_to_github[user["id"]] = real_name
+
+    return github_to_slack, slack_to_github
+
+
+def _load() -> dict:
+    """Return the directory, loading it from the store once per session/hour."""
+    global _directory, _loaded_at
+
+    now = time.monotonic()
+    if not _loaded_at or now - _loaded_at > _RELOAD_INTERVAL:
+        _directory = _read()
+        _loaded_at = now
+
+    return _directory
+
+
+def reset() -> None:
+    """Make the next lookup reload the directory from the store."""
+    global _loaded_at
+    _loaded_at = 0.0
+
+
+def _read() -> dict:
+    """Read the current version of the directory from the store, or {} if none."""
+    current = get_value(_KEY) or {}
+    if "version" not in current:
+        return {}
+
+    d: dict[str, dict] = {}
+    for i in range(current["shards"]):
+        shard = get_value(_shard_key(current["version"], i)) or {}
+        for section, entries in shard.items():
+            d.setdefault(section, {}).update(entries)
+
+    return d
+
+
+def _save(d: dict[str, dict]) -> None:
+    """Save a new version of the directory in the store, and delete the old one.
+
+    Entries are distributed among shards by the hash of their keys, so the
+    number of shards has a safety margin for uneven distributions.
+    """
+    n = max(1, math.ceil(2 * len(json.dumps(d)) / _MAX_SHARD_SIZE))
+    shards: list[dict[str, dict]] = [{section: {} for section in d} for _ in range(n)]
+    for section, entries in d.items():
+        for key, value in entries.items():
+            shards[zlib.crc32(key.encode()) % n][section][key] = value
+
+    old = get_value(_KEY) or {}
+    version = old.get("version", 0) + 1
+    for i, shard in enumerate(shards):
+        set_value(_shard_key(version, i), shard)
+    set_value(_KEY, {"version": version, "shards": n})
+
+    for i in range(old.get("shards", 0)):
+        del_value(_shard_key(old["version"], i))
+
+
+def _shard_key(version: int, i: int) -> str:
+    return f"{_KEY}:{version}:{i}"
+
+
+def _github_profiles(old: dict[str, list]) -> dict[str, list] | None:
+    """List all the GitHub org members, and fetch new or stale profiles.
+
+    Returns:
+        GitHub login -> [name, email, type, fetched timestamp],
+        or None if the org members can't be listed.
+    """
+    try:
+        org = gh.get_organization(github_helper.ORG_NAME)
+        logins = [user.login for user in org.get_members()]
+    except GithubException as e:
+        error = "Failed to list GitHub members in the organization"
+        debug.log(f"{error} `{github_helper.ORG_NAME}`:\n```{e}```")
+        return None
+
+    now = time.time()
+    stale = [u for u in logins if u in old and now - old[u][3] > _PROFILE_TTL]
+    stale = sorted(stale, key=lambda u: old[u][3])[:_MAX_PROFILE_REFRESHES]
+
+    # Members who left the org are dropped.
+    profiles = {login: old[login] for login in logins if login in old}
+    for login in [login for login in logins if login not in old] + stale:
+        try:
+            user = gh.get_user(login)
+            profiles[login] = [user.name or "", user.email or "", user.type, now]
+        except GithubException as e:
+            debug.log(f"Failed to get GitHub user `{login}`:\n```{e}```")
+
+    return profiles
+
+
+def _slack_users() -> list[dict] | None:
+    """Return a list of all Slack users in the workspace, or None in case of errors."""
+    users = []
+    next_cursor = None
+    while next_cursor != "":
+        try:
+            resp = slack.users_list(cursor=next_cursor, limit=200)
+        except SlackApiError as e:
+            debug.log(f"Failed to list Slack users: `{e.response['error']}`")
+            return None
+
+        users += resp.get("members", [])
+        next_cursor = resp.get("response_metadata", {}).get("next_cursor", "")
+
+    return users
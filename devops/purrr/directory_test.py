@@ -0,0 +1,211 @@
+"""Unit tests for the "directory" module."""
+
+from types import SimpleNamespace
+
+from autokitteh import github, slack
+from autokitteh.store import _local_dev_store
+from github import GithubException
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_github_and_slack_clients(mocker):
+    mocker.patch.object(github, "github_client", autospec=True)
+    mocker.patch.object(slack, "slack_client", autospec=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_store(setup_mock_github_and_slack_clients):
+    import directory
+
+    _local_dev_store.clear()
+    directory.reset()
+    yield
+    _local_dev_store.clear()
+    directory.reset()
+
+
+def slack_user(user_id, name, email="", **kwargs):
+    profile = {"real_name": name, "real_name_normalized": name, "email": email}
+    return {"id": user_id, "profile": profile, **kwargs}
+
+
+@pytest.fixture
+def mock_apis(mocker):
+    """Fake GitHub org members and Slack workspace users."""
+    import directory
+
+    directory.gh.reset_mock()
+    directory.slack.reset_mock()
+
+    members = {
+        "alice": SimpleNamespace(
+            login="alice", name="Alice A", email="alice@x.com", type="User"
+        ),
+        "bob": SimpleNamespace(login="bob", name="Bob B", email=None, type="User"),
+        "dependabot": SimpleNamespace(
+            login="dependabot", name="", email="", type="Bot"
+        ),
+    }
+    org = directory.gh.get_organization.return_value
+    org.get_members.side_effect = lambda: [SimpleNamespace(login=u) for u in members]
+    directory.gh.get_user.side_effect = lambda login: members[login]
+
+    pages = [
+        {
+            "members": [slack_user("U1", "Alice", "ALICE@x.com")],
+            "response_metadata": {"next_cursor": "2"},
+        },
+        {
+            "members": [
+                slack_user("U2", "bob  b"),
+                slack_user("U3", "Carol C", "carol@x.com"),
+                slack_user("B1", "Purrr", is_bot=True),
+                slack_user("U4", "Gone", deleted=True),
+            ],
+            "response_metadata": {"next_cursor": ""},
+        },
+    ]
+    directory.slack.users_list.side_effect = lambda cursor, limit: pages[
+        int(cursor or 1) - 1
+    ]
+
+    return members
+
+
+class TestNormalizeName:
+    """Unit tests for the "normalize_name" function."""
+
+    def test_normalize_name(self):
+        import directory
+
+        assert directory.normalize_name("  José  ÁLVAREZ ") == "jose alvarez"
+        assert directory.normalize_name(None) == ""
+
+
+class TestMatch:
+    """Unit tests for the "match" function."""
+
+    def test_email_before_name(self):
+        import directory
+
+        profiles = {"alice": ["Bob B", "alice@x.com", "User", 0]}
+        slack_users = [slack_user("U1", "Bob B"), slack_user("U2", "", "alice@x.com")]
+
+        github_to_slack, slack_to_github = directory.match(profiles, slack_users)
+
+        assert github_to_slack == {"alice": "U2"}
+        assert slack_to_github == {"U1": "@alice", "U2": "@alice"}
+
+    def test_ambiguous_github_name(self):
+        import directory
+
+        profiles = {
+            "john1": ["John Smith", "", "User", 0],
+            "john2": ["John Smith", "", "User", 0],
+        }
+        slack_users = [slack_user("U1", "John Smith")]
+
+        github_to_slack, slack_to_github = directory.match(profiles, slack_users)
+
+        assert github_to_slack == {"john1": "U1", "john2": "U1"}
+        assert slack_to_github == {"U1": "John Smith"}
+
+
+class TestSync:
+    """Unit tests for the "sync" function and the lookups."""
+
+    def test_lookups(self, mock_apis):
+        import directory
+
+        directory.sync()
+
+        assert directory.slack_user_id("alice") == "U1"
+        assert directory.slack_user_id("bob") == "U2"
+        assert directory.slack_user_id("dependabot") == ""
+        assert directory.slack_user_id("stranger") is None
+
+        assert directory.github_reference("U1") == "@alice"
+        assert directory.github_reference("U2") == "@bob"
+        assert directory.github_reference("U3") == "Carol C"
+        assert directory.github_reference("B1") == "Purrr"
+        assert directory.github_reference("U4") is None
+
+        assert directory.github_logins_by_name("ALICE a") == ["alice"]
+        assert directory.github_logins_by_name("Carol C") == []
+
+    def test_not_synced(self):
+        import directory
+
+        assert directory.slack_user_id("alice") is None
+        assert directory.github_reference("U1") is None
+        assert directory.github_logins_by_name("Alice A") is None
+
+    def test_incremental_profiles(self, mock_apis, mocker):
+        import directory
+
+        directory.sync()
+        assert directory.gh.get_user.call_count == 3
+
+        # Only new members are fetched, and members who left are dropped.
+        mock_apis["carol"] = SimpleNamespace(
+            login="carol", name="Carol C", email="", type="User"
+        )
+        del mock_apis["bob"]
+        directory.sync()
+
+        assert directory.gh.get_user.call_count == 4
+        assert directory.slack_user_id("carol") == "U3"
+        assert directory.slack_user_id("bob") is None
+
+        # Stale profiles are refreshed.
+        now = directory.time.time()
+        mocker.patch.object(
+            directory.time, "time", return_value=now + directory._PROFILE_TTL + 1
+        )
+        directory.sync()
+
+        assert directory.gh.get_user.call_count == 7
+
+    def test_lookups_load_once(self, mock_apis, mocker):
+        import directory
+
+        directory.sync()
+        spy = mocker.spy(directory, "get_value")
+
+        for _ in range(3):
+            directory.slack_user_id("alice")
+            directory.github_reference("U1")
+
+        assert spy.call_count == 2  # Version, and a single shard.
+
+    def test_shards(self, mock_apis, mocker):
+        import directory
+
+        mocker.patch.object(directory, "_MAX_SHARD_SIZE", 100)
+        directory.sync()
+        directory.sync()
+
+        current = _local_dev_store["directory"]
+        assert current["version"] == 2
+        assert current["shards"] > 1
+
+        # Only the shards of the current version are kept.
+        keys = [k for k in _local_dev_store if k.startswith("directory:")]
+        assert len(keys) == current["shards"]
+        assert all(k.startswith("directory:2:") for k in keys)
+
+        assert directory.slack_user_id("alice") == "U1"
+        assert directory.github_reference("U2") == "@bob"
+        assert directory.github_logins_by_name("Bob B") == ["bob"]
+
+    def test_errors_keep_previous_directory(self, mock_apis):
+        import directory
+
+        directory.sync()
+
+        org = directory.gh.get_organization.return_value
+        org.get_members.side_effect = GithubException(500)
+        directory.sync()
+
+        assert directory.slack_user_id("alice") == "U1"
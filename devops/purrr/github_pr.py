@@ -4,6 +4,7 @@ import autokitteh
 from autokitteh.slack import normalize_channel_name
 
 import data_helper
+import pr_processor
 import slack_channel
 import slack_helper
 import text_utils
@@ -16,7 +17,16 @@ def on_github_pull_request(event) -> None:
     Args:
         event: GitHub event data.
     """
-    _parse_github_pr_event(event.data)
+    data = event.data
+
+    # Informational events are handled by the PR's own long-running session,
+    # if it's active, to sort and batch them (see the "pr_processor" module).
+    batched = data.action in pr_processor.BATCHED_ACTIONS
+    if batched and data_helper.pr_processor_active(data.pull_request.html_url):
+        print(f"Skipping {data.action!r} event: handled by the PR's session")
+        return
+
+    _parse_github_pr_event(data)
 
 
 def _parse_github_pr_event(data) -> None:
@@ -95,7 +105,8 @@ def _on_pr_opened(action: str, pr, sender) -> None:
     channel = slack_channel.initialize_for_github_pr(action, pr, sender)
 
     # Intercept relevant GitHub and Slack events.
-    filter = f"event_type == 'pull_request' && data.number == {pr.number}"
+    filter = "event_type == 'pull_request'"
+    filter += f" && data.pull_request.html_url == '{pr.html_url}'"
     subs = [autokitteh.subscribe("github_conn", filter=filter)]
 
     filter = "(event_type == 'message' || event_type.startswith('member_'))"
@@ -106,21 +117,28 @@ def _on_pr_opened(action: str, pr, sender) -> None:
     subs.append(autokitteh.subscribe("slack_conn", filter=filter))
 
     # Keep this AutoKitteh session running to handle them until the PR is closed.
+    processor = pr_processor.Processor(pr, channel, _parse_github_pr_event)
     while True:
-        data = autokitteh.next_event(subs)
+        event = autokitteh.next_event(subs, timeout=processor.timeout(), full=True)
+        data = event.data if event else None
 
         # GitHub PR event.
         if hasattr(data, "action"):
             print("Received GitHub PR event:", data.action)
             if data.action in ("closed", "converted_to_draft"):
+                processor.stop()
                 for sub in subs:
                     autokitteh.unsubscribe(sub)
                 break
+            if data.action in pr_processor.BATCHED_ACTIONS:
+                processor.add(data, event.event_id)
 
         # Slack event.
-        else:
+        elif data:
             print("Received Slack event:", data.event.type)
 
+        processor.tick()
+
 
 def _on_pr_closed(action: str, pr, sender) -> None:
     """A pull request (possibly a draft) was closed.
@@ -210,10 +228,11 @@ def _on_pr_review_requested(data) -> None:
     if not channel:
         return
 
-    if data.requested_reviewer:
+    # GitHub sends either a reviewer or a team, without the other key.
+    if "requested_reviewer" in data:
         reviewer = data.requested_reviewer
         _on_pr_review_requested_person(reviewer, data.sender, channel, "reviewer")
-    if data.requested_team:
+    if "requested_team" in data:
         _on_pr_review_requested_team(data.requested_team, data.sender, channel)
 
 
@@ -276,10 +295,11 @@ def _on_pr_review_request_removed(data) -> None:
     if not channel:
         return
 
-    if data.requested_reviewer:
+    # GitHub sends either a reviewer or a team, without the other key.
+    if "requested_reviewer" in data:
         reviewer = data.requested_reviewer
         _on_pr_review_request_removed_person(reviewer, data.sender, channel, "reviewer")
-    if data.requested_team:
+    if "requested_team" in data:
         _on_pr_review_request_removed_team(data.requested_team, data.sender, channel)
 
 
@@ -374,7 +394,7 @@ def _on_pr_edited(action: str, pr, changes, sender) -> None:
     # PR base branch was changed.
     if "base" in changes:
         msg = "{} changed the base branch from "
-        msg += "`{changes.base.ref}` to `{pr.base.ref}`"
+        msg += f"`{changes.base.ref['from']}` to `{pr.base.ref}`"
         slack_helper.mention_in_message(channel, sender, msg)
 
     # PR description was changed.
@@ -412,7 +432,7 @@ def _on_pr_synchronized(action: str, pr, sender) -> None:
     if not channel:
         return
 
-    msg = "{} updated the head branch (see the [PR commits]({pr.url}/commits))"
+    msg = f"{{}} updated the head branch (see the <{pr.html_url}/commits|PR commits>)"
     slack_helper.mention_in_message(channel, sender, msg)
 
 
@@ -3,6 +3,7 @@
 import collections
 
 from autokitteh import github, slack
+from autokitteh.store import _local_dev_store
 import pytest
 
 
@@ -12,6 +13,13 @@ def setup_mock_github_and_slack_clients(mocker):
     mocker.patch.object(slack, "slack_client", autospec=True)
 
 
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
 class TestGithubToSlack:
     """Unit tests for the "github_to_slack" function."""
 
@@ -71,6 +79,12 @@ class TestGithubToSlack:
         actual = text_utils.github_to_slack("```\nmulti\nline\n```", "")
         assert actual == "```\nmulti\nline\n```"
 
+    def test_code_is_not_converted(self):
+        import text_utils
+
+        text = "`**a** @b #1` and\n```\n# c\n- d\n<!-- e -->\n```"
+        assert text_utils.github_to_slack(text, "") == text
+
     def test_links(self):
         import text_utils
 
@@ -84,7 +98,7 @@ class TestGithubToSlack:
         expected = "  •  111\n  •  222\n  •  333"
         assert text_utils.github_to_slack("- 111\n- 222\n- 333", "") == expected
         assert text_utils.github_to_slack("+ 111\n+ 222\n+ 333", "") == expected
-        # TODO: assert ...github_to_slack("* 111\n* 222\n* 333", "") == expected
+        assert text_utils.github_to_slack("* 111\n* 222\n* 333", "") == expected
 
     def test_nested_lists(self):
         import text_utils
@@ -92,7 +106,7 @@ class TestGithubToSlack:
         exp = "  •  111\n          ◦   222\n          ◦   333\n  •  444"
         assert text_utils.github_to_slack("- 111\n  - 222\n  - 333\n- 444", "") == exp
         assert text_utils.github_to_slack("+ 111\n  + 222\n  + 333\n+ 444", "") == exp
-        # TODO: assert ...github_to_slack("* 111\n  * 222\n  * 333\n* 444", "") == exp
+        assert text_utils.github_to_slack("* 111\n  * 222\n  * 333\n* 444", "") == exp
 
     def test_user_mentions(self, mocker):
         import text_utils
@@ -113,6 +127,32 @@ class TestGithubToSlack:
         actual = text_utils.github_to_slack("@org/team", pr)
         assert actual == "<https://github.com/org/teams/team|@org/team>"
 
+    def test_repeated_user_mentions(self, mocker):
+        import text_utils
+        import users
+
+        pr = "https://github.com/org/repo/pull/123"
+        id = mocker.patch.object(
+            users, "github_username_to_slack_user_id", autospec=True
+        )
+        id.side_effect = lambda login: {"user": "U1", "user2": "U2"}[login]
+
+        actual = text_utils.github_to_slack("@user2 @user, @user2 and @user", pr)
+        assert actual == "<@U2> <@U1>, <@U2> and <@U1>"
+        assert id.call_count == 2
+
+    def test_not_mentions(self, mocker):
+        import text_utils
+        import users
+
+        id = mocker.patch.object(
+            users, "github_username_to_slack_user_id", autospec=True
+        )
+
+        text = "me@example.com https://example.com/@user/#123"
+        assert text_utils.github_to_slack(text, "") == text
+        id.assert_not_called()
+
     def test_pr_references(self):
         import text_utils
 
@@ -126,6 +166,9 @@ class TestGithubToSlack:
         actual = text_utils.github_to_slack("Blah\n<!-- hidden -->\nBlah blah", "")
         assert actual == "Blah\n\nBlah blah"
 
+        actual = text_utils.github_to_slack("A<!--\n# hidden\n-->B", "")
+        assert actual == "AB"
+
 
 class TestSlackToGithub:
     """Unit tests for the "slack_to_github" function."""
@@ -165,6 +208,9 @@ class TestSlackToGithub:
         assert text_utils.slack_to_github("`inline`") == "`inline`"
         assert text_utils.slack_to_github("```mult\nline```") == "```\nmult\nline\n```"
 
+        actual = text_utils.slack_to_github("`*a* ~b~` ```\n*c* <@U1>\n```")
+        assert actual == "`*a* ~b~` ```\n*c* <@U1>\n```"
+
     def test_lists(self):
         import text_utils
 
@@ -196,6 +242,19 @@ class TestSlackToGithub:
         actual = text_utils.slack_to_github("<#C123|custom-name>")
         assert actual == "[#custom-name](slack://channel?team=TEAM_ID&id=C123)"
 
+    def test_repeated_channels(self, mocker):
+        import text_utils
+
+        channel = mocker.patch.object(text_utils, "_slack_channel_name", autospec=True)
+        channel.return_value = "name"
+        team = mocker.patch.object(text_utils, "_slack_team_id", autospec=True)
+        team.return_value = "T1"
+
+        actual = text_utils.slack_to_github("<#C1> <#C1> <#C1>")
+        assert actual == " ".join(["[#name](slack://channel?team=T1&id=C1)"] * 3)
+        channel.assert_called_once_with("C1")
+        team.assert_called_once()
+
 
 FakeGithubUser = collections.namedtuple("FakeGithubUser", ["name", "login"])
 
@@ -241,7 +300,7 @@ class TestSlackToGithubUserMentions:
             {"is_bot": True},
         ]
         assert text_utils.slack_to_github("<@U123>") == "Mr. Robot"
-        assert text_utils.slack_to_github("<@U123>") == "Some Slack app"
+        assert text_utils.slack_to_github("<@U456>") == "Some Slack app"
 
     def test_match_by_email(self, mock_github_user_id, mock_slack_user_info):
         import text_utils
@@ -250,6 +309,17 @@ class TestSlackToGithubUserMentions:
         mock_slack_user_info.return_value = {"profile": {"email": "me@test.com"}}
         assert text_utils.slack_to_github("<@U123>") == "@username"
 
+    def test_match_is_cached(self, mock_github_user_id, mock_slack_user_info):
+        import text_utils
+
+        mock_github_user_id.return_value = "username"
+        mock_slack_user_info.return_value = {"profile": {"email": "me@test.com"}}
+        assert text_utils.slack_to_github("<@U123>") == "@username"
+        assert text_utils.slack_to_github("<@U123>") == "@username"
+
+        mock_slack_user_info.assert_called_once()
+        mock_github_user_id.assert_called_once()
+
     def test_match_by_name(
         self, mock_github_user_id, mock_github_users, mock_slack_user_info
     ):
@@ -0,0 +1,194 @@
+"""Per-PR processor of GitHub PR events, in the PR's long-running session.
+
+Each GitHub event starts its own AutoKitteh session, which posts its Slack
+messages right away. GitHub doesn't guarantee that events are delivered in
+order, and very active PRs (e.g. with many pushes) flood their channels.
+
+Instead, while the session that opened a PR's Slack channel is running, it
+processes the PR's informational events (`BATCHED_ACTIONS`) by itself, and
+other sessions skip them (see "data_helper.pr_processor_active"). Events are
+held for a few seconds and sorted by their delivery time, bursts of pushes
+are coalesced into a single digest, and all the channel messages of a batch
+are posted together. Per-event work (user lookups, invites, DMs)
+runs with bounded concurrency.
+"""
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import math
+import time
+
+import data_helper
+import debug
+import slack_helper
+import users
+
+
+# Events that don't change the PR's lifecycle, and are safe to batch.
+BATCHED_ACTIONS = frozenset(
+    {
+        "assigned",
+        "edited",
+        "review_request_removed",
+        "review_requested",
+        "synchronize",
+        "unassigned",
+    }
+)
+
+# Hold events for a few seconds, so that out-of-order deliveries can be sorted.
+_REORDER_DELAY = 3  # Seconds.
+
+# Pushes within a minute of the first one are reported in a single digest.
+_DIGEST_WINDOW = 60  # Seconds.
+
+# A zero timeout means "no timeout" to some "next_event" implementations.
+_MIN_TIMEOUT = 0.1  # Seconds.
+
+_MAX_CONCURRENT_HANDLERS = 4
+
+# Refresh the processor's mark in the store well before it expires.
+_HEARTBEAT_INTERVAL = 300  # Seconds.
+
+
+class Processor:
+    """Buffers, sorts, and coalesces the GitHub events of a single PR."""
+
+    def __init__(self, pr, channel: str, handle: Callable) -> None:
+        """Initialize the processor, and mark it as active in the store.
+
+        Args:
+            pr: GitHub PR data.
+            channel: PR's Slack channel ID.
+            handle: Handler of a single GitHub "pull_request" event's data.
+        """
+        self._pr_url = pr.html_url
+        self._channel = channel
+        self._handle = handle
+        self._pending: list[tuple[float, str, object]] = []  # (Arrival, ID, data).
+        self._marked_at = 0.0
+        self._mark()
+
+    def add(self, data, event_id: str | None = None) -> None:
+        """Buffer a GitHub "pull_request" event, to be handled later.
+
+        Events of other PRs (e.g. with the same number in another repo)
+        are ignored.
+
+        Args:
+            data: GitHub event data.
+            event_id: AutoKitteh event ID, which orders events by their
+                delivery time (see "_sort_keys").
+        """
+        if data.pull_request.html_url != self._pr_url:
+            return
+        self._pending.append((time.monotonic(), event_id or "", data))
+
+    def timeout(self) -> float:
+        """Return the number of seconds until "tick" has something to do."""
+        deadline = min(self._marked_at + _HEARTBEAT_INTERVAL, *self._deadlines())
+        return max(_MIN_TIMEOUT, deadline - time.monotonic())
+
+    def tick(self) -> None:
+        """Handle the buffered events if they're due, and refresh the mark."""
+        now = time.monotonic()
+        others, pushes = self._deadlines()
+        if now >= pushes:
+            self.flush()
+        elif now >= others:
+            self.flush(pushes=False)
+        if now - self._marked_at >= _HEARTBEAT_INTERVAL:
+            self._mark()
+
+    def stop(self) -> None:
+        """Handle all the buffered events, and remove the mark from the store."""
+        self.flush()
+        data_helper.unmark_pr_processor(self._pr_url)
+
+    def flush(self, pushes: bool = True) -> list:
+        """Handle the buffered events now, and post their channel messages.
+
+        Args:
+            pushes: Whether to report the buffered pushes too, or to keep
+                them for their digest, until its window ends.
+
+        Returns:
+            The data of the events that were handled, in order.
+        """
+        if pushes:
+            batch, self._pending = self._pending, []
+        else:
+            batch = [p for p in self._pending if p[2].action != "synchronize"]
+            self._pending = [p for p in self._pending if p[2].action == "synchronize"]
+        if not batch:
+            return []
+
+        events = [data for _, _, data in sorted(_sort_keys(batch))]
+
+        pushed = [data for data in events if data.action == "synchronize"]
+        tasks = []
+        for data in events:
+            if data.action != "synchronize":
+                tasks.append((self._handle, data))
+            elif data is pushed[-1]:
+                tasks.append((self._digest, pushed))
+
+        workers = min(len(tasks), _MAX_CONCURRENT_HANDLERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            batches = pool.map(self._run, tasks)
+            msgs = [msg for batch in batches for msg in batch]
+
+        slack_helper.post_messages(self._channel, msgs)
+        print(f"Handled {len(events)} events of {self._pr_url} in {len(msgs)} lines")
+        return events
+
+    def _deadlines(self) -> tuple[float, float]:
+        """Return when the buffered events are due (in "time.monotonic" terms).
+
+        Returns:
+            When the first non-push event is due, and when the push digest
+            is due, or infinity for either if there are no such events.
+        """
+        others = pushes = math.inf
+        for arrival, _, data in self._pending:
+            if data.action == "synchronize":
+                pushes = min(pushes, arrival + _DIGEST_WINDOW)
+            else:
+                others = min(others, arrival + _REORDER_DELAY)
+        return others, pushes
+
+    def _run(self, task: tuple[Callable, object]) -> list[str]:
+        """Run a task, and return the channel messages that it "posted"."""
+        func, arg = task
+        with slack_helper.batch(self._channel) as msgs:
+            try:
+                func(arg)
+            except Exception as e:  # noqa: BLE001 - don't drop the whole batch.
+                debug.log(f"Failed to handle an event of {self._pr_url}: `{e}`")
+        return msgs
+
+    def _digest(self, pushes: list) -> None:
+        """Report one or more updates of the PR's head branch."""
+        pr = pushes[-1].pull_request
+        senders = users.format_github_users_for_slack([d.sender for d in pushes])
+        times = f" {len(pushes)} times" if len(pushes) > 1 else ""
+
+        msg = f"{', '.join(senders.values())} updated the head branch{times} "
+        msg += f"(see the <{pr.html_url}/commits|PR commits>)"
+        slack_helper.post_message(self._channel, msg)
+
+    def _mark(self) -> None:
+        """Mark the processor as active in the store, or extend the mark."""
+        data_helper.mark_pr_processor(self._pr_url)
+        self._marked_at = time.monotonic()
+
+
+def _sort_keys(
+    pending: list[tuple[float, str, object]],
+) -> list[tuple[str, int, object]]:
+    """Sort keys of events: their delivery time, and then arrival order.
+
+    AutoKitteh event IDs are TypeIDs (UUIDv7), which start with the time when
+    AutoKitteh received the webhook delivery, so they're sortable as strings.
+    """
+    return [(event_id, i, data) for i, (_, event_id, data) in enumerate(pending)]
@@ -0,0 +1,227 @@
+"""Unit tests for the "pr_processor" module."""
+
+import threading
+import time
+
+from autokitteh import AttrDict, github, slack
+from autokitteh.store import _local_dev_store
+import pytest
+
+
+PR_URL = "https://github.com/org/repo/pull/1"
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_github_and_slack_clients(mocker):
+    mocker.patch.object(github, "github_client", autospec=True)
+    mocker.patch.object(slack, "slack_client", autospec=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_store(setup_mock_github_and_slack_clients):
+    import slack_helper
+
+    _local_dev_store.clear()
+    slack_helper.shared_client.chat_postMessage.reset_mock()
+    yield
+    _local_dev_store.clear()
+
+
+@pytest.fixture
+def mock_slack_users(mocker):
+    import users
+
+    return mocker.patch.object(
+        users,
+        "format_github_users_for_slack",
+        side_effect=lambda gh_users: {u.login: f"<@{u.login}>" for u in gh_users},
+    )
+
+
+def event(action, sender="alice", title="", url=PR_URL):
+    pr = {"html_url": url, "title": title}
+    return AttrDict(action=action, pull_request=pr, sender={"login": sender})
+
+
+def handle(data):
+    """Fake event handler, which posts a single message to the channel."""
+    import slack_helper
+
+    slack_helper.post_message("C1", f"{data.action} {data.pull_request.title}")
+
+
+def posted_texts():
+    import slack_helper
+
+    calls = slack_helper.shared_client.chat_postMessage.call_args_list
+    return [c.kwargs["text"] for c in calls]
+
+
+class TestProcessor:
+    """Unit tests for the "Processor" class."""
+
+    def test_mark(self):
+        import data_helper
+        import pr_processor
+
+        p = pr_processor.Processor(AttrDict(html_url=PR_URL), "C1", handle)
+        assert data_helper.pr_processor_active(PR_URL)
+
+        p.stop()
+        assert not data_helper.pr_processor_active(PR_URL)
+
+    def test_reorder_and_batch(self):
+        import pr_processor
+
+        p = pr_processor.Processor(AttrDict(html_url=PR_URL), "C1", handle)
+        p.add(event("edited", title="2"), "evt_02")
+        p.add(event("assigned", title="1"), "evt_01")
+        p.add(event("unassigned", title="3"), "evt_03")
+        p.flush()
+
+        assert posted_texts() == ["assigned 1\nedited 2\nunassigned 3"]
+
+    def test_push_digest(self, mock_slack_users):
+        import pr_processor
+
+        p = pr_processor.Processor(AttrDict(html_url=PR_URL), "C1", handle)
+        for i in range(10):
+            sender = "bob" if i == 5 else "alice"
+            p.add(event("synchronize", sender), f"evt_{i:02}")
+        p.add(event("edited", title="T"), "evt_05")
+        p.flush()
+
+        digest = "<@alice>, <@bob> updated the head branch 10 times "
+        digest += f"(see the <{PR_URL}/commits|PR commits>)"
+        assert posted_texts() == ["edited T\n" + digest]
+
+    def test_single_push(self, mock_slack_users):
+        import pr_processor
+
+        p = pr_processor.Processor(AttrDict(html_url=PR_URL), "C1", handle)
+        p.add(event("synchronize"), "evt_00")
+        p.flush()
+
+        assert posted_texts() == [
+            f"<@alice> updated the head branch (see the <{PR_URL}/commits|PR commits>)"
+        ]
+
+    def test_deadlines(self, mocker, mock_slack_users):
+        import pr_processor
+
+        now = time.monotonic()
+        mock_time = mocker.patch.object(pr_processor.time, "monotonic")
+        mock_time.return_value = now
+
+        p = pr_processor.Processor(AttrDict(html_url=PR_URL), "C1", handle)
+        assert p.timeout() == pr_processor._HEARTBEAT_INTERVAL
+
+        p.add(event("synchronize"), "evt_00")
+        assert p.timeout() == pr_processor._DIGEST_WINDOW
+
+        mock_time.return_value = now + 10
+        p.add(event("edited", title="T"), "evt_10")
+        assert p.timeout() == pr_processor._REORDER_DELAY
+
+        p.tick()
+        assert posted_texts() == []
+
+        # Other events don't flush the push digest before its window ends.
+        mock_time.return_value = now + 10 + pr_processor._REORDER_DELAY
+        assert p.timeout() == pr_processor._MIN_TIMEOUT
+        p.tick()
+        assert posted_texts() == ["edited T"]
+        assert p.timeout() == pr_processor._DIGEST_WINDOW - 13
+
+        mock_time.return_value = now + pr_processor._DIGEST_WINDOW
+        p.tick()
+        assert len(posted_texts()) == 2
+        assert "updated the head branch" in posted_texts()[1]
+        assert p.timeout() == pr_processor._HEARTBEAT_INTERVAL - 60
+
+    def test_other_pr(self):
+        import pr_processor
+
+        p = pr_processor.Processor(AttrDict(html_url=PR_URL), "C1", handle)
+        other_url = "https://github.com/org/other/pull/1"
+        p.add(event("edited", title="other", url=other_url), "evt_01")
+        p.add(event("edited", title="this"), "evt_02")
+        p.flush()
+
+        assert posted_texts() == ["edited this"]
+
+    def test_handler_error(self, mocker):
+        import pr_processor
+
+        def flaky_handle(data):
+            handle(data)
+            if data.action == "assigned":
+                raise ValueError("oops")
+
+        mock_log = mocker.patch.object(pr_processor.debug, "log")
+        p = pr_processor.Processor(AttrDict(html_url=PR_URL), "C1", flaky_handle)
+        p.add(event("assigned", title="1"), "evt_01")
+        p.add(event("edited", title="2"), "evt_02")
+        p.flush()
+
+        assert posted_texts() == ["assigned 1\nedited 2"]
+        mock_log.assert_called_once()
+
+    def test_bounded_concurrency(self):
+        import pr_processor
+
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def slow_handle(data):
+            with lock:
+                running.append(data)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(data)
+
+        p = pr_processor.Processor(AttrDict(html_url=PR_URL), "C1", slow_handle)
+        for i in range(10):
+            p.add(event("edited"), f"evt_{i:02}")
+        p.flush()
+
+        assert 1 < max(peak) <= pr_processor._MAX_CONCURRENT_HANDLERS
+
+
+class TestOnGithubPullRequest:
+    """Unit tests for skipping events that the PR's processor handles."""
+
+    def test_skip_batched_actions(self, mocker):
+        import data_helper
+        import github_pr
+
+        mock_parse = mocker.patch.object(github_pr, "_parse_github_pr_event")
+        data_helper.mark_pr_processor(PR_URL)
+
+        github_pr.on_github_pull_request(AttrDict(data=event("edited")))
+        mock_parse.assert_not_called()
+
+        github_pr.on_github_pull_request(AttrDict(data=event("closed")))
+        mock_parse.assert_called_once()
+
+    def test_no_processor(self, mocker):
+        import github_pr
+
+        mock_parse = mocker.patch.object(github_pr, "_parse_github_pr_event")
+
+        github_pr.on_github_pull_request(AttrDict(data=event("edited")))
+        mock_parse.assert_called_once()
+
+
+class TestPostMessages:
+    """Unit tests for the "slack_helper.post_messages" function."""
+
+    def test_split_long_batches(self, mocker):
+        import slack_helper
+
+        mocker.patch.object(slack_helper, "_MAX_MESSAGE_LENGTH", 10)
+        slack_helper.post_messages("C1", ["aaa", "bbb", "cccccccccccc", "d"])
+
+        assert posted_texts() == ["aaa\nbbb", "cccccccccccc", "d"]
@@ -0,0 +1,304 @@
+"""In-memory fakes of the services used by Purrr, for the replay benchmark.
+
+These stand in for the Slack and GitHub clients, and for AutoKitteh's event
+subscriptions, in `bench_replay.py`. Every fake API counts the calls made to
+it, and can add a fixed latency to each one to simulate network round-trips.
+The fake Slack client also enforces Slack's rate limits, like the real API.
+They are thread-safe, to be used by concurrent sessions.
+"""
+
+from collections import Counter
+from collections import deque
+import hashlib
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from autokitteh import AttrDict, Event
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web import SlackResponse
+
+import slack_api
+
+
+class Api:
+    """API calls to a fake service, with simulated latency."""
+
+    def __init__(self, name: str, latency: float = 0) -> None:
+        """Initialize the API.
+
+        Args:
+            name: Prefix of the call names, e.g. "slack".
+            latency: Seconds each call takes.
+        """
+        self.name = name
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def call(self, method: str) -> None:
+        """Count a call to a method, and wait for its latency."""
+        with self._lock:
+            self.calls[f"{self.name}.{method}"] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def slack_user_id(email: str) -> str:
+    """Return the Slack user ID of a fake user, based on their email address."""
+    return "U" + hashlib.sha1(email.encode()).hexdigest()[:8].upper()  # noqa: S324
+
+
+class FakeSlack(WebClient):
+    """In-memory stand-in for the Slack WebClient, with rate limits.
+
+    All the Web API methods of the real client call its "api_call" method,
+    so this class fakes only that. Users exist for every email address
+    in the "example.com" domain.
+
+    Rate limits are enforced in fixed windows of a minute, by the tier of each
+    method, and by channel for "chat.postMessage", like Slack does. Exceeding
+    them fails with an HTTP 429 "ratelimited" error and a "Retry-After" header.
+    """
+
+    def __init__(
+        self, api: Api | None = None, rate_limit_scale: float = 1, time_scale: float = 1
+    ) -> None:
+        """Initialize the fake client.
+
+        Args:
+            api: API calls counter, with simulated latency.
+            rate_limit_scale: Multiplier of Slack's rate limits, or 0 for none.
+            time_scale: Multiplier of the rate limit windows (and "Retry-After").
+        """
+        super().__init__(token="xoxb-fake")  # noqa: S106
+        self.api = api or Api("slack")
+        self.messages: list[tuple[float, str, str]] = []
+        """(time.monotonic(), channel, text) for every posted message."""
+
+        self.throttled = 0
+        self._rate_limit_scale = rate_limit_scale
+        self._tier_rates = dict(slack_api._TIER_RATES)  # Requests per minute.
+        self._post_message_rate = 60 * slack_api._POST_MESSAGE_RATE
+        self._window = 60 * time_scale
+        self._windows: dict[str, tuple[float, int]] = {}
+        self._channels: dict[str, str] = {}  # Name -> ID.
+        self._lock = threading.Lock()
+
+    def api_call(self, api_method: str, **kwargs) -> SlackResponse:
+        """Handle a call to any Slack API method."""
+        self.api.call(api_method)
+
+        args = {}
+        for key in ("params", "json", "data"):
+            args.update(kwargs.get(key) or {})
+
+        self._check_rate_limit(api_method, args)
+        handler = getattr(self, "_" + api_method.replace(".", "_"), None)
+        data = handler(args) if handler else {}
+        return self._response(api_method, {"ok": True, **data})
+
+    def _check_rate_limit(self, api_method: str, args: dict) -> None:
+        if not self._rate_limit_scale:
+            return
+
+        key = api_method
+        if api_method == "chat.postMessage":
+            key += ":" + str(args.get("channel", ""))
+            limit = self._post_message_rate
+        else:
+            tier = slack_api._METHOD_TIERS.get(api_method, slack_api._DEFAULT_TIER)
+            limit = self._tier_rates[tier]
+
+        now = time.monotonic()
+        with self._lock:
+            start, count = self._windows.get(key, (now, 0))
+            if now - start >= self._window:
+                start, count = now, 0
+            if count < max(1, limit * self._rate_limit_scale):
+                self._windows[key] = (start, count + 1)
+                return
+
+            self.throttled += 1
+            retry_after = start + self._window - now
+
+        data = {"ok": False, "error": "ratelimited"}
+        headers = {"Retry-After": f"{retry_after:.3f}"}
+        raise SlackApiError("ratelimited", self._response(api_method, data, headers))
+
+    def _response(
+        self, api_method: str, data: dict, headers: dict | None = None
+    ) -> SlackResponse:
+        return SlackResponse(
+            client=self,
+            http_verb="POST",
+            api_url=self.base_url + api_method,
+            req_args={},
+            data=data,
+            headers=headers or {},
+            status_code=429 if headers else 200,
+        )
+
+    def _error(self, api_method: str, error: str) -> None:
+        resp = self._response(api_method, {"ok": False, "error": error})
+        raise SlackApiError(error, resp)
+
+    def _chat_postMessage(self, args: dict) -> dict:  # noqa: N802 - Slack's name.
+        with self._lock:
+            self.messages.append((time.monotonic(), args["channel"], args["text"]))
+            return {"ts": f"{len(self.messages)}.000000", "channel": args["channel"]}
+
+    def _conversations_create(self, args: dict) -> dict:
+        with self._lock:
+            if args["name"] in self._channels:
+                self._error("conversations.create", "name_taken")
+            channel_id = f"C{len(self._channels) + 1:08}"
+            self._channels[args["name"]] = channel_id
+        return {"channel": {"id": channel_id, "name": args["name"]}}
+
+    def _conversations_info(self, args: dict) -> dict:
+        with self._lock:
+            names = [n for n, i in self._channels.items() if i == args["channel"]]
+        if not names:
+            self._error("conversations.info", "channel_not_found")
+        return {"channel": {"id": args["channel"], "name": names[-1]}}
+
+    def _conversations_list(self, args: dict) -> dict:
+        with self._lock:
+            channels = [{"id": i, "name": n} for n, i in self._channels.items()]
+        return {"channels": channels, "response_metadata": {"next_cursor": ""}}
+
+    def _conversations_rename(self, args: dict) -> dict:
+        with self._lock:
+            if args["name"] in self._channels:
+                self._error("conversations.rename", "name_taken")
+            self._channels[args["name"]] = args["channel"]
+        return {}
+
+    def _users_info(self, args: dict) -> dict:
+        return {"user": {"id": args["user"], "profile": {}}}
+
+    def _users_list(self, args: dict) -> dict:
+        return {"members": [], "response_metadata": {"next_cursor": ""}}
+
+    def _users_lookupByEmail(self, args: dict) -> dict:  # noqa: N802 - Slack's name.
+        email = args["email"]
+        if not email.endswith("@example.com"):
+            self._error("users.lookupByEmail", "users_not_found")
+        return {"user": {"id": slack_user_id(email)}}
+
+
+class FakeGitHub:
+    """In-memory stand-in for the parts of the PyGithub client used by Purrr.
+
+    Every user has an "example.com" email address, except bots.
+    """
+
+    def __init__(self, api: Api | None = None) -> None:
+        self.api = api or Api("github")
+
+    def get_user(self, login: str) -> SimpleNamespace:
+        self.api.call("get_user")
+        is_bot = login.endswith("[bot]")
+        return SimpleNamespace(
+            login=login,
+            name="" if is_bot else login.replace("-", " ").title(),
+            email=None if is_bot else f"{login}@example.com",
+            type="Bot" if is_bot else "User",
+            html_url=f"https://github.com/{login}",
+        )
+
+    def search_users(self, query: str) -> list:
+        self.api.call("search_users")
+        return _PaginatedList([])
+
+    def get_organization(self, login: str) -> SimpleNamespace:
+        self.api.call("get_organization")
+        return SimpleNamespace(get_members=lambda: _PaginatedList([]))
+
+
+class _PaginatedList(list):
+    @property
+    def totalCount(self) -> int:  # noqa: N802 - PyGithub's name.
+        return len(self)
+
+
+class EventBus:
+    """In-memory stand-in for AutoKitteh's event subscriptions.
+
+    Sessions subscribe to events with "subscribe", and wait for them with
+    "next_event", like they would in AutoKitteh. Event filters support only
+    the conditions that Purrr uses with GitHub events and webhooks: equality
+    of the event type, the PR's URL, and the JSON body's "github_link".
+    """
+
+    def __init__(self) -> None:
+        self._subs: dict[str, tuple[str, dict, deque]] = {}
+        self._published = 0
+        self._cond = threading.Condition()
+
+    def subscribe(self, source: str, filter: str = "") -> str:
+        conditions = {}
+        if m := re.search(r"event_type == '(\w+)'", filter):
+            conditions["event_type"] = m[1]
+        if m := re.search(r"data\.pull_request\.html_url == '([^']*)'", filter):
+            conditions["html_url"] = m[1]
+        if m := re.search(r'data\.body\.json\.github_link == ("[^"]*")', filter):
+            conditions["github_link"] = json.loads(m[1])
+
+        with self._cond:
+            sub_id = f"sub_{len(self._subs) + 1}"
+            self._subs[sub_id] = (source, conditions, deque())
+        return sub_id
+
+    def unsubscribe(self, subscription_id: str) -> None:
+        with self._cond:
+            self._subs.pop(subscription_id, None)
+
+    def next_event(self, subscription_id: str | list[str], *, timeout=None, full=False):
+        ids = [subscription_id] if isinstance(subscription_id, str) else subscription_id
+        if hasattr(timeout, "total_seconds"):
+            timeout = timeout.total_seconds()
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                for sub_id in ids:
+                    if sub_id in self._subs and self._subs[sub_id][2]:
+                        event = self._subs[sub_id][2].popleft()
+                        return event if full else event.data
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def publish(self, source: str, event_type: str, data: AttrDict) -> None:
+        """Deliver an event to all the matching subscriptions."""
+        values = {
+            "event_type": event_type,
+            "html_url": data.get("pull_request", {}).get("html_url"),
+            "github_link": data.get("body", {}).get("json", {}).get("github_link"),
+        }
+        with self._cond:
+            # Like AutoKitteh's event IDs, these are sorted by delivery time.
+            self._published += 1
+            event = Event(data, f"evt_{self._published:026}", event_type)
+            for sub_source, conditions, events in self._subs.values():
+                if sub_source != source:
+                    continue
+                if all(values[k] == v for k, v in conditions.items()):
+                    events.append(event)
+            self._cond.notify_all()
+
+    def get_webhook_url(self, trigger: str) -> str:
+        return f"http://localhost/webhooks/{trigger}"
+
+    def post(self, url: str, json: dict, **kwargs) -> None:
+        """Deliver an HTTP POST request to a webhook trigger, as an event."""
+        trigger = url.rsplit("/", 1)[-1]
+        self.publish(trigger, "post", AttrDict({"body": {"json": json}}))
@@ -0,0 +1,226 @@
+"""Rate-limit-aware Slack API client, shared by all the modules.
+
+Slack rate-limits each API method per workspace, according to its tier
+(https://api.slack.com/apis/rate-limits), and "chat.postMessage" per channel.
+The shared client paces the calls of each method with a token bucket of its
+tier, so that bursts (e.g. a review with 40 inline comments) are spread out
+instead of failing with "ratelimited" errors.
+
+Other sessions may use up the same limits, so rate-limited calls are retried
+after the "Retry-After" period that Slack specifies. Identical concurrent read
+requests are coalesced into a single API call.
+
+All the Web API methods of the Slack client call its "api_call" method,
+so this module wraps it instead of each method.
+
+All the modules use "shared_client", either from here or from "slack_helper",
+which re-exports it. Modules that "slack_helper" depends on (e.g. "users")
+import it from here, to avoid circular imports.
+"""
+
+from collections import Counter
+from collections import defaultdict
+from concurrent.futures import Future
+import itertools
+import json
+import threading
+import time
+
+from autokitteh.slack import slack_client
+from slack_sdk.errors import SlackApiError
+
+
+# Requests per minute in each tier.
+_TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# Tiers of the methods that Purrr uses, all others are assumed to be in tier 3.
+_METHOD_TIERS = {
+    "auth.test": 4,
+    "bookmarks.add": 2,
+    "chat.postEphemeral": 4,
+    "chat.update": 3,
+    "conversations.archive": 2,
+    "conversations.create": 2,
+    "conversations.info": 3,
+    "conversations.invite": 3,
+    "conversations.list": 2,
+    "conversations.rename": 2,
+    "conversations.setPurpose": 2,
+    "conversations.setTopic": 2,
+    "users.info": 4,
+    "users.list": 2,
+    "users.lookupByEmail": 3,
+}
+_DEFAULT_TIER = 3
+
+# Slack allows short bursts above the average rate.
+_BURST_MINUTES = 0.25
+
+# "chat.postMessage": 1 message per second per channel, with short bursts.
+_POST_MESSAGE_RATE = 1.0
+_POST_MESSAGE_BURST = 5
+
+# Read-only methods, whose identical concurrent requests are coalesced.
+_READ_METHODS = frozenset(
+    {
+        "auth.test",
+        "conversations.info",
+        "conversations.list",
+        "users.info",
+        "users.list",
+        "users.lookupByEmail",
+    }
+)
+
+_MAX_RETRIES = 3
+_DEFAULT_RETRY_AFTER = 1  # Seconds.
+
+
+class _TokenBucket:
+    """Paces calls to a fixed average rate, with bursts up to a capacity."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate = rate  # Tokens per second.
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, waiting for it if necessary, and return the wait time."""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            wait = max(0.0, -self._tokens / self._rate)
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Don't hand out any tokens for the given number of seconds."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0) - seconds * self._rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+        self._updated = now
+
+
+class _RateLimitedApiCall:
+    """Wrapper of "WebClient.api_call" that honors Slack's rate limits."""
+
+    def __init__(self, api_call) -> None:
+        self._api_call = api_call
+        self._buckets: dict[str, _TokenBucket] = {}
+        self._in_flight: dict[tuple[str, str], Future] = {}
+        self._metrics: defaultdict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def __call__(self, api_method: str, **kwargs):
+        if api_method not in _READ_METHODS:
+            return self._call(api_method, kwargs)
+
+        key = (api_method, json.dumps(kwargs, sort_keys=True, default=str))
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future:
+                self._metrics[api_method]["coalesced"] += 1
+                pending = future
+            else:
+                future = self._in_flight[key] = Future()
+                pending = None
+
+        if pending:
+            return pending.result()
+
+        try:
+            resp = self._call(api_method, kwargs)
+            future.set_result(resp)
+            return resp
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _call(self, api_method: str, kwargs: dict):
+        bucket = self._bucket(api_method, kwargs)
+        for attempt in itertools.count():
+            wait = bucket.acquire()
+            self._count(api_method, calls=1, wait_seconds=wait)
+            try:
+                return self._api_call(api_method, **kwargs)
+            except SlackApiError as e:
+                if not _is_rate_limited(e) or attempt >= _MAX_RETRIES:
+                    raise
+
+                retry_after = _retry_after(e)
+                self._count(api_method, throttled=1)
+                print(f"Slack {api_method} rate-limited, retrying in {retry_after}s")
+                bucket.pause(retry_after)
+
+    def _bucket(self, api_method: str, kwargs: dict) -> _TokenBucket:
+        key = api_method
+        if api_method == "chat.postMessage":
+            args = kwargs.get("json") or kwargs.get("params") or {}
+            key += ":" + str(args.get("channel", ""))
+
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = _new_bucket(api_method)
+            return self._buckets[key]
+
+    def _count(self, api_method: str, **counts: float) -> None:
+        with self._lock:
+            self._metrics[api_method].update(counts)
+
+    def metrics(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {method: dict(c) for method, c in sorted(self._metrics.items())}
+
+
+def _new_bucket(api_method: str) -> _TokenBucket:
+    if api_method == "chat.postMessage":
+        return _TokenBucket(_POST_MESSAGE_RATE, _POST_MESSAGE_BURST)
+
+    per_minute = _TIER_RATES[_METHOD_TIERS.get(api_method, _DEFAULT_TIER)]
+    return _TokenBucket(per_minute / 60, max(1, per_minute * _BURST_MINUTES))
+
+
+def _is_rate_limited(e: SlackApiError) -> bool:
+    if getattr(e.response, "status_code", None) == 429:
+        return True
+    return e.response.get("error") == "ratelimited"
+
+
+def _retry_after(e: SlackApiError) -> float:
+    headers = getattr(e.response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return _DEFAULT_RETRY_AFTER
+
+
+def limit(client):
+    """Make a Slack client honor Slack's rate limits, and return it."""
+    client.api_call = _RateLimitedApiCall(client.api_call)
+    return client
+
+
+def metrics() -> dict[str, dict[str, float]]:
+    """Return the API call metrics of the shared client, per Slack API method.
+
+    Metrics: "calls" (including retries), "throttled" (rate-limited calls),
+    "coalesced" (requests that didn't call the API), and "wait_seconds"
+    (total time spent pacing calls, and waiting to retry them).
+    """
+    return shared_client.api_call.metrics()
+
+
+shared_client = limit(slack_client("slack_conn"))
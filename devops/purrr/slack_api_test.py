@@ -0,0 +1,190 @@
+"""Unit tests for the "slack_api" module."""
+
+import threading
+
+from autokitteh import github, slack
+import pytest
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.slack_response import SlackResponse
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_github_and_slack_clients(mocker):
+    mocker.patch.object(github, "github_client", autospec=True)
+    mocker.patch.object(slack, "slack_client", autospec=True)
+
+
+@pytest.fixture
+def mock_time(mocker):
+    """Control the monotonic time, and don't really sleep."""
+    import slack_api
+
+    now = [1000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    mocker.patch.object(slack_api.time, "monotonic", side_effect=lambda: now[0])
+    mocker.patch.object(slack_api.time, "sleep", side_effect=sleep)
+    return now
+
+
+def response(status_code=200, error="", headers=None):
+    return SlackResponse(
+        client=None,
+        http_verb="POST",
+        api_url="https://slack.com/api/test",
+        req_args={},
+        data={"ok": not error, "error": error} if error else {"ok": True},
+        headers=headers or {},
+        status_code=status_code,
+    )
+
+
+def rate_limited(retry_after="2"):
+    resp = response(429, "ratelimited", {"Retry-After": retry_after})
+    return SlackApiError("ratelimited", resp)
+
+
+class TestTokenBucket:
+    """Unit tests for the "_TokenBucket" class."""
+
+    def test_burst_then_pace(self, mock_time):
+        import slack_api
+
+        bucket = slack_api._TokenBucket(rate=1, capacity=3)
+
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+        assert bucket.acquire() == 1
+        assert bucket.acquire() == 1
+
+    def test_refill(self, mock_time):
+        import slack_api
+
+        bucket = slack_api._TokenBucket(rate=2, capacity=2)
+        bucket.acquire()
+        bucket.acquire()
+
+        mock_time[0] += 10  # Refills up to the capacity, not more.
+
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 0.5]
+
+    def test_pause(self, mock_time):
+        import slack_api
+
+        bucket = slack_api._TokenBucket(rate=1, capacity=5)
+        bucket.pause(30)
+
+        assert bucket.acquire() == 31
+
+
+class TestRateLimitedApiCall:
+    """Unit tests for the "_RateLimitedApiCall" class."""
+
+    def test_methods_and_channels_have_separate_buckets(self, mock_time, mocker):
+        import slack_api
+
+        api_call = slack_api._RateLimitedApiCall(mocker.Mock(return_value="ok"))
+
+        for _ in range(slack_api._POST_MESSAGE_BURST):
+            api_call("chat.postMessage", json={"channel": "C1", "text": "hi"})
+        assert mock_time[0] == 1000
+
+        api_call("chat.postMessage", json={"channel": "C2", "text": "hi"})
+        api_call("conversations.setTopic", params={"channel": "C1"})
+        assert mock_time[0] == 1000
+
+        api_call("chat.postMessage", json={"channel": "C1", "text": "hi"})
+        assert mock_time[0] == 1001
+
+    def test_retry_after_rate_limit(self, mock_time, mocker):
+        import slack_api
+
+        mock = mocker.Mock(side_effect=[rate_limited("7"), "ok"])
+        api_call = slack_api._RateLimitedApiCall(mock)
+
+        assert api_call("conversations.invite", json={"channel": "C1"}) == "ok"
+        assert mock.call_count == 2
+        assert mock_time[0] >= 1007
+
+        metrics = api_call.metrics()["conversations.invite"]
+        assert metrics["calls"] == 2
+        assert metrics["throttled"] == 1
+        assert metrics["wait_seconds"] >= 7
+
+    def test_give_up_after_max_retries(self, mock_time, mocker):
+        import slack_api
+
+        mock = mocker.Mock(side_effect=rate_limited())
+        api_call = slack_api._RateLimitedApiCall(mock)
+
+        with pytest.raises(SlackApiError):
+            api_call("users.info", params={"user": "U1"})
+
+        assert mock.call_count == slack_api._MAX_RETRIES + 1
+
+    def test_other_errors_are_not_retried(self, mocker):
+        import slack_api
+
+        error = SlackApiError("error", response(200, "channel_not_found"))
+        mock = mocker.Mock(side_effect=error)
+        api_call = slack_api._RateLimitedApiCall(mock)
+
+        with pytest.raises(SlackApiError):
+            api_call("conversations.archive", json={"channel": "C1"})
+
+        mock.assert_called_once()
+
+    def test_identical_reads_are_coalesced(self, mocker):
+        import slack_api
+
+        started, release = threading.Event(), threading.Event()
+
+        def users_info(api_method, **kwargs):
+            started.set()
+            release.wait(5)
+            return "U1"
+
+        mock = mocker.Mock(side_effect=users_info)
+        api_call = slack_api._RateLimitedApiCall(mock)
+
+        results = []
+        first = threading.Thread(
+            target=lambda: results.append(api_call("users.info", params={"user": "U1"}))
+        )
+        first.start()
+        started.wait(5)
+
+        others = [
+            threading.Thread(
+                target=lambda: results.append(
+                    api_call("users.info", params={"user": "U1"})
+                )
+            )
+            for _ in range(3)
+        ]
+        for t in others:
+            t.start()
+        while api_call.metrics()["users.info"].get("coalesced", 0) < 3:
+            pass
+
+        release.set()
+        for t in [first, *others]:
+            t.join(5)
+
+        assert results == ["U1"] * 4
+        mock.assert_called_once()
+
+        # Not in flight anymore, and writes are never coalesced.
+        assert api_call("users.info", params={"user": "U1"}) == "U1"
+        api_call("chat.postMessage", json={"channel": "C1", "text": "hi"})
+        api_call("chat.postMessage", json={"channel": "C1", "text": "hi"})
+        assert mock.call_count == 4
+
+
+def test_shared_client_is_limited():
+    import slack_api
+    import slack_helper
+
+    assert slack_helper.shared_client is slack_api.shared_client
+    assert isinstance(slack_api.shared_client.api_call, slack_api._RateLimitedApiCall)
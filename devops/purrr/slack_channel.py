@@ -1,6 +1,10 @@
 """Create and manage Slack channels."""
 
-import json
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 import time
 
 from autokitteh.slack import normalize_channel_name
@@ -16,6 +20,9 @@ import users
 # Character limit for topics and descriptions of Slack channels.
 _MAX_METADATA_LENGTH = 250
 
+# Bookmark title --> path of a GitHub PR's page.
+_BOOKMARKS = {"Commits": "/commits", "Checks": "/checks", "Files changed": "/files"}
+
 # Wait for a few seconds to handle other asynchronous events
 # (e.g. a PR closure comment) before archiving the channel.
 _PR_CLOSE_DELAY = 5
@@ -36,24 +43,84 @@ def initialize_for_github_pr(action: str, pr, sender) -> str:
         ID of the created Slack channel.
     """
     print(f"Creating Slack channel for {pr.html_url} (PR event action: {action})")
-    print(json.dumps(pr, indent=4, sort_keys=True))
 
     name = f"{pr.number}_{normalize_channel_name(pr.title)}"
     channel_id = slack_helper.create_channel(name)
     if not channel_id:
         _report_creation_error(pr, sender.login)
 
-    _set_topic(pr, channel_id)
-    _set_description(pr, channel_id)
-    _set_bookmarks(pr, channel_id)
-    _post_messages(action, pr, sender, channel_id)
-
-    # TODO: Map between the GitHub PR and the Slack channel ID, for 2-way event syncs.
+    # All the other steps depend only on the channel, so they run concurrently.
+    def map_link() -> None:
+        data_helper.map_github_link_details(pr.html_url, channel_id)
+
+    steps = {
+        "topic": lambda: _set_topic(pr, channel_id),
+        "purpose": lambda: _set_description(pr, channel_id),
+        "bookmarks": lambda: _set_bookmarks(pr, channel_id),
+        "message": lambda: _post_messages(action, pr, sender, channel_id),
+        # Map between the GitHub PR and the Slack channel ID, for 2-way event syncs.
+        "mapping": map_link,
+        "invite": lambda: add_users(channel_id, users.github_pr_participants(pr)),
+    }
+
+    # Map only after the initial message (even if it failed to be posted),
+    # so that other events are posted after it.
+    errors = _run_pipeline(steps, after={"mapping": ["message"]})
+    if errors:
+        error = f"Errors in the setup of <#{channel_id}> for {pr.html_url}:"
+        debug.log(error + "".join(f"\n- {k}: {v}" for k, v in errors.items()))
 
-    add_users(channel_id, users.github_pr_participants(pr))
     return channel_id
 
 
+def _run_pipeline(
+    steps: dict[str, Callable[[], None]],
+    after: dict[str, list[str]] | None = None,
+) -> dict[str, str]:
+    """Run steps concurrently, each one as soon as the steps it follows are done.
+
+    Args:
+        steps: Step name --> function.
+        after: Step name --> names of steps that it runs after, whether they
+            succeed or fail.
+
+    Returns:
+        Step name --> error description, for each step that failed, or that
+        never ran. Empty if all succeeded.
+    """
+    pending = dict(steps)
+    running: dict[Future, str] = {}
+    done: set[str] = set()
+    errors: dict[str, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, len(steps))) as pool:
+        while pending or running:
+            for name, func in list(pending.items()):
+                if all(p in done for p in (after or {}).get(name, [])):
+                    running[pool.submit(func)] = name
+                    del pending[name]
+
+            if not running:  # Unknown or circular dependencies.
+                errors.update(dict.fromkeys(pending, "unmet dependencies"))
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                done.add(name)
+                if e := future.exception():
+                    errors[name] = _error_description(e)
+
+    return {name: errors[name] for name in steps if name in errors}
+
+
+def _error_description(e: BaseException) -> str:
+    """Return a short Markdown description of a step's exception."""
+    if isinstance(e, SlackApiError):
+        return f"`{e.response['error']}`"
+    return f"`{type(e).__name__}: {e}`"
+
+
 def _report_creation_error(pr, github_username) -> None:
     """Report to the PR sender that a Slack channel wasn't created for it, and abort."""
     error = "Failed to create Slack channel for " + pr.html_url
@@ -67,35 +134,40 @@ def _report_creation_error(pr, github_username) -> None:
 
 
 def _set_topic(pr, channel_id: str) -> None:
-    """Set the topic of a Slack channel to a GitHub PR URL."""
+    """Set the topic of a Slack channel to a GitHub PR URL.
+
+    Raises:
+        SlackApiError: If the topic wasn't set.
+    """
     topic = pr.html_url
     if len(topic) > _MAX_METADATA_LENGTH:
         topic = topic[: _MAX_METADATA_LENGTH - 4] + " ..."
-    try:
-        slack.conversations_setTopic(channel=channel_id, topic=topic)
-    except SlackApiError as e:
-        error = f"Failed to set the topic of <#{channel_id}> to `{topic}`"
-        debug.log(f"{error}: `{e.response['error']}`")
+    slack.conversations_setTopic(channel=channel_id, topic=topic)
 
 
 def _set_description(pr, channel_id: str) -> None:
-    """Set the description of a Slack channel to a GitHub PR title."""
+    """Set the description of a Slack channel to a GitHub PR title.
+
+    Raises:
+        SlackApiError: If the description wasn't set.
+    """
     title = f"`{pr.title}`"
     if len(title) > _MAX_METADATA_LENGTH:
         title = title[: _MAX_METADATA_LENGTH - 4] + "`..."
-    try:
-        slack.conversations_setPurpose(channel=channel_id, purpose=title)
-    except SlackApiError as e:
-        error = f"Failed to set the purpose of <#{channel_id}> to `{title}`"
-        debug.log(f"{error}: `{e.response['error']}`")
+    slack.conversations_setPurpose(channel=channel_id, purpose=title)
 
 
 def _set_bookmarks(pr, channel_id: str) -> None:
     """Set the bookmarks of a Slack channel to important GitHub PR links.
 
-    Bookmark titles are also updated later based on relevant GitHub events.
+    The PR itself is already linked in the channel's topic.
+
+    Raises:
+        SlackApiError: If a bookmark wasn't added.
     """
-    pass  # TODO: Implement this function.
+    for title, path in _BOOKMARKS.items():
+        link = pr.html_url + path
+        slack.bookmarks_add(channel_id=channel_id, title=title, type="link", link=link)
 
 
 def _post_messages(action: str, pr, sender, channel_id: str) -> None:
@@ -116,12 +188,13 @@ def _post_messages(action: str, pr, sender, channel_id: str) -> None:
 
 def add_users(channel_id: str, github_users: list[str]) -> None:
     """Invite all the participants in a GitHub PR to a Slack channel."""
-    slack_users = [users.github_username_to_slack_user_id(u) for u in github_users]
+    slack_users = users.github_usernames_to_slack_user_ids(github_users).values()
     slack_users = [user for user in slack_users if user]  # Ignore unrecognized users.
 
     # Also ignore users who opted out of Purrr. They will still be mentioned
     # in the channel, but as non-members they won't be notified about it.
-    slack_users = [u for u in slack_users if not data_helper.slack_opted_out(u)]
+    opted_out = data_helper.slack_opted_out_users()
+    slack_users = list(dict.fromkeys(u for u in slack_users if u not in opted_out))
     if not slack_users:
         return
 
@@ -163,9 +236,8 @@ def archive(action: str, pr, sender) -> None:
     # (e.g. a PR closure comment) before archiving the channel.
     time.sleep(_PR_CLOSE_DELAY)
 
-    if action == "closed this PR":
-        if pr.merged:
-            action = "merged this PR"
+    if action == "closed":
+        action = "merged this PR" if pr.merged else "closed this PR"
     else:
         action = "converted this PR to a draft"
 
@@ -0,0 +1,147 @@
+"""Unit tests for the "slack_channel" module."""
+
+import threading
+
+from autokitteh import AttrDict, github, slack
+from autokitteh.store import _local_dev_store
+import pytest
+from slack_sdk.errors import SlackApiError
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_github_and_slack_clients(mocker):
+    mocker.patch.object(github, "github_client", autospec=True)
+    mocker.patch.object(slack, "slack_client", autospec=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_store(setup_mock_github_and_slack_clients):
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
+class TestRunPipeline:
+    """Unit tests for the "_run_pipeline" function."""
+
+    def test_dependency_order(self):
+        import slack_channel
+
+        order = []
+        first_started = threading.Event()
+
+        def step(name, wait_for=None):
+            def run():
+                if name == "a":
+                    first_started.set()
+                if wait_for:  # Proves that "a" and "b" run concurrently.
+                    assert wait_for.wait(timeout=5)
+                order.append(name)
+
+            return run
+
+        errors = slack_channel._run_pipeline(
+            {"a": step("a"), "b": step("b", first_started), "c": step("c")},
+            after={"c": ["a", "b"]},
+        )
+
+        assert errors == {}
+        assert sorted(order[:2]) == ["a", "b"]
+        assert order[2] == "c"
+
+    def test_aggregated_errors(self):
+        import slack_channel
+
+        def fail():
+            raise SlackApiError("error", {"ok": False, "error": "not_in_channel"})
+
+        def crash():
+            raise ValueError("oops")
+
+        ran = []
+        errors = slack_channel._run_pipeline(
+            {
+                "a": fail,
+                "b": crash,
+                "c": lambda: ran.append("c"),
+                "d": lambda: ran.append("d"),
+            },
+            after={"c": ["a", "b"], "d": ["unknown"]},
+        )
+
+        # Steps run after the ones they follow, even if those failed.
+        assert errors == {
+            "a": "`not_in_channel`",
+            "b": "`ValueError: oops`",
+            "d": "unmet dependencies",
+        }
+        assert ran == ["c"]
+
+
+class TestInitializeForGithubPr:
+    """Unit tests for the "initialize_for_github_pr" function."""
+
+    @pytest.fixture
+    def pr(self):
+        return AttrDict(
+            number=1,
+            title="Title",
+            body="",
+            html_url="https://github.com/org/repo/pull/1",
+            user={"login": "alice", "type": "User"},
+            requested_reviewers=[],
+            assignees=[],
+        )
+
+    def test_setup(self, mocker, pr):
+        import data_helper
+        import slack_channel
+        import slack_helper
+
+        mocker.patch.object(slack_helper, "create_channel", return_value="C1")
+        mocker.patch.object(slack_helper, "mention_in_message")
+        mock_add_users = mocker.patch.object(slack_channel, "add_users")
+        mock_log = mocker.patch.object(slack_channel.debug, "log")
+        slack_channel.slack.reset_mock()
+
+        sender = AttrDict(login="alice")
+        assert slack_channel.initialize_for_github_pr("opened", pr, sender) == "C1"
+
+        slack_channel.slack.conversations_setTopic.assert_called_once_with(
+            channel="C1", topic=pr.html_url
+        )
+        slack_channel.slack.conversations_setPurpose.assert_called_once_with(
+            channel="C1", purpose="`Title`"
+        )
+        links = [
+            c.kwargs["link"] for c in slack_channel.slack.bookmarks_add.call_args_list
+        ]
+        assert links == [pr.html_url + p for p in ("/commits", "/checks", "/files")]
+        slack_helper.mention_in_message.assert_called_once()
+        mock_add_users.assert_called_once_with("C1", ["alice"])
+        assert data_helper.lookup_github_link_details(pr.html_url) == "C1"
+        mock_log.assert_not_called()
+
+    def test_errors(self, mocker, pr):
+        import data_helper
+        import slack_channel
+        import slack_helper
+
+        mocker.patch.object(slack_helper, "create_channel", return_value="C1")
+        mocker.patch.object(slack_helper, "mention_in_message", side_effect=OSError)
+        mocker.patch.object(slack_channel, "add_users")
+        mock_log = mocker.patch.object(slack_channel.debug, "log")
+        slack_channel.slack.reset_mock()
+        slack_channel.slack.conversations_setTopic.side_effect = SlackApiError(
+            "error", {"ok": False, "error": "too_long"}
+        )
+
+        sender = AttrDict(login="alice")
+        slack_channel.initialize_for_github_pr("opened", pr, sender)
+
+        error = f"Errors in the setup of <#C1> for {pr.html_url}:"
+        error += "\n- topic: `too_long`\n- message: `OSError: `"
+        mock_log.assert_called_once_with(error)
+
+        # The mapping doesn't depend on the message's success, only its order.
+        assert data_helper.lookup_github_link_details(pr.html_url) == "C1"
@@ -1,12 +1,17 @@
 """Thin layer of logic on top of the Slack API."""
 
+from collections.abc import Iterator
+import contextlib
+from contextvars import ContextVar
 import os
+import re
 
-from autokitteh.slack import slack_client
 from slack_sdk.errors import SlackApiError
 
+import channel_names
 import data_helper
 import debug
+import slack_api
 import users
 
 
@@ -16,13 +21,53 @@ _CHANNEL_PREFIX = os.getenv("SLACK_CHANNEL_PREFIX", "_pr")
 # Visibility of PR channels in Slack: "public" (default) or "private".
 _IS_PRIVATE = os.getenv("SLACK_CHANNEL_VISIBILITY", "")
 
-shared_client = slack_client("slack_conn")
+# Slack truncates very long messages, so batches are split above this length.
+_MAX_MESSAGE_LENGTH = 4000
+
+# Rate-limit-aware Slack client, to be used by all modules (see "slack_api").
+shared_client = slack_api.shared_client
+
+# Channel ID and messages that are collected instead of posted (see "batch").
+_batch: ContextVar[tuple[str, list[str]] | None] = ContextVar("batch", default=None)
+
+
+@contextlib.contextmanager
+def batch(channel_id: str) -> Iterator[list[str]]:
+    """Collect the messages to a Slack channel in a list, instead of posting them.
+
+    This applies only to messages (not replies) that are posted by "post_message"
+    and "mention_in_message" in the current thread. The caller is responsible
+    for posting them later, with "post_messages".
+
+    Args:
+        channel_id: ID of the channel whose messages are collected.
+
+    Yields:
+        List of collected messages, in the order they were "posted".
+    """
+    msgs: list[str] = []
+    token = _batch.set((channel_id, msgs))
+    try:
+        yield msgs
+    finally:
+        _batch.reset(token)
+
+
+def _batched(channel_id: str, msg: str) -> bool:
+    """Add a message to the current batch, if it collects the channel's messages."""
+    current = _batch.get()
+    if not current or current[0] != channel_id:
+        return False
+
+    current[1].append(msg)
+    return True
 
 
 def create_channel(name: str) -> str:
     """Create a public or private Slack channel.
 
-    If the name is already taken, add a numeric suffix to it.
+    If the name is already taken, add a numeric suffix to it. Free names are
+    picked from an index of taken names, so this is usually a single API call.
 
     Args:
         name: Desired (and valid) name of the channel.
@@ -32,17 +77,16 @@ def create_channel(name: str) -> str:
     """
     is_private = _IS_PRIVATE.lower().strip() == "private"
     visibility = "private" if is_private else "public"
-    suffix = 0
 
     while True:
-        suffix += 1
-        n = _CHANNEL_PREFIX + "_" + name if suffix == 1 else f"{name}_{suffix}"
+        n = channel_names.allocate(_CHANNEL_PREFIX + "_" + name)
         try:
             resp = shared_client.conversations_create(name=n, is_private=is_private)
             channel_id = resp["channel"]["id"]
             print(f"Created {visibility} Slack channel {n!r} ({channel_id})")
             return channel_id
         except SlackApiError as e:
+            # Taken by a channel that isn't indexed: allocate the next name.
             if e.response["error"] != "name_taken":
                 error = f"Failed to create {visibility} Slack channel `{n}`"
                 debug.log(f"{error}: `{e.response['error']}`")
@@ -52,16 +96,26 @@ def create_channel(name: str) -> str:
 def rename_channel(channel_id: str, name: str) -> None:
     """Safely rename a Slack channel.
 
-    If the name is already taken, add a numeric suffix to it.
+    If the name is already taken, add a numeric suffix to it. Free names are
+    picked from an index of taken names, so this is usually a single API call.
+
+    If the channel already has this name (or this name with a numeric suffix),
+    e.g. when a PR title edit doesn't affect its normalized form, do nothing.
 
     Args:
         channel_id: Slack channel ID.
         name: Desired (and valid) name of the channel.
     """
-    suffix = 0
+    base = _CHANNEL_PREFIX + "_" + name
+    try:
+        current = shared_client.conversations_info(channel=channel_id)["channel"]
+        if re.fullmatch(re.escape(base) + r"(_\d+)?", current["name"]):
+            return
+    except SlackApiError as e:
+        print(f"Failed to get Slack channel info ({channel_id}): {e.response['error']}")
+
     while True:
-        suffix += 1
-        n = _CHANNEL_PREFIX + "_" + name if suffix == 1 else f"{name}_{suffix}"
+        n = channel_names.allocate(base)
         try:
             shared_client.conversations_rename(channel=channel_id, name=n)
             print(f"Renamed Slack channel to {n!r} ({channel_id})")
@@ -176,6 +230,43 @@ def _lookup_message(comment_url: str) -> str | None:
     return thread_ts
 
 
+def post_message(channel_id: str, msg: str) -> str:
+    """Post a message to a Slack channel (or add it to the current batch).
+
+    Args:
+        channel_id: ID of the channel to send the message to.
+        msg: Message to send.
+
+    Returns:
+        Message's thread timestamp, or "" in case of an error or if it's batched.
+    """
+    if _batched(channel_id, msg):
+        return ""
+
+    try:
+        resp = shared_client.chat_postMessage(channel=channel_id, text=msg)
+        return resp["ts"]
+    except SlackApiError as e:
+        debug.log(f"Failed to post message in <#{channel_id}>: `{e.response['error']}`")
+        return ""
+
+
+def post_messages(channel_id: str, msgs: list[str]) -> None:
+    """Post multiple messages to a Slack channel, combined into as few as possible.
+
+    Messages are kept in order, and never split.
+    """
+    texts: list[str] = []
+    for msg in msgs:
+        if texts and len(texts[-1]) + len(msg) < _MAX_MESSAGE_LENGTH:
+            texts[-1] += "\n" + msg
+        else:
+            texts.append(msg)
+
+    for text in texts:
+        post_message(channel_id, text)
+
+
 def mention_in_message(channel_id: str, github_user, msg: str) -> str:
     """Post a message to a Slack channel, mentioning a GitHub user.
 
@@ -190,7 +281,7 @@ def mention_in_message(channel_id: str, github_user, msg: str) -> str:
         msg: Message to send, containing a single "{}" placeholder.
 
     Returns:
-        Message's thread timestamp, or "" in case of an error.
+        Message's thread timestamp, or "" in case of an error or if it's batched.
     """
     return mention_in_reply(channel_id, "", github_user, msg)
 
@@ -217,7 +308,10 @@ def mention_in_reply(channel_id: str, comment_url: str, github_user, msg: str) -
     #     return ""
 
     m = msg.format(users.format_github_user_for_slack(github_user))
-    ts = _lookup_message(comment_url)
+    if not comment_url and _batched(channel_id, m):
+        return ""
+
+    ts = _lookup_message(comment_url) if comment_url else None
 
     try:
         resp = shared_client.chat_postMessage(channel=channel_id, text=m, thread_ts=ts)
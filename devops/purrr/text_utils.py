@@ -13,12 +13,81 @@ import users
 
 _GithubUser = collections.namedtuple("GithubUser", ["login", "html_url"])
 _SlackChannel = collections.namedtuple("SlackChannel", ["name", "id"])
-_SlackUser = collections.namedtuple("SlackUser", ["link", "id"])
+_SlackUser = collections.namedtuple("SlackUser", ["id"])
 
 
 slack = slack_helper.shared_client
 
 
+# Each alternative is a GitHub markdown token, matched in a single left-to-right
+# pass. Where there's a choice, the name of the outermost group is the token's
+# kind (see "re.Match.lastgroup"). Earlier alternatives take precedence.
+_GITHUB_TOKENS = re.compile(
+    r"""
+      (?P<code>(?P<ticks>`+)(?s:.+?)(?P=ticks))          # Code spans and blocks.
+    | (?P<comment>(?s:<!--.*?-->))                      # HTML comments.
+    | ^\#+[ \t]+(?P<header>[^\n]+)                     # Headers.
+    | (?P<bullet>^(?P<indent>[ \t]{2,4})?[-+*][ \t]+)   # List items.
+    | (?P<url>https?://[^\s<>()]+)                      # Plain URLs.
+    | (?P<image>!\[(?P<image_text>[^]\n]*)\]\((?P<image_url>[^)\s]*)\))
+    | (?P<link>\[(?P<link_text>[^]\n]*)\]\((?P<link_url>[^)\s]*)\))
+    | !<(?P<slack_image>[^>\n]*)>
+    | \*\*\*(?P<bold_italic>.+?)\*\*\*
+    | \*\*(?P<bold>.+?)\*\*
+    | __(?P<bold_underscores>.+?)__
+    | (?<!\*)\*(?P<italic>[^*\n]+?)\*
+    | ~~(?P<strikethrough>.+?)~~
+    | (?<![\w@])@(?P<mention>[\w-]+(?:/[\w-]+)?)
+    | (?<![\w&])\#(?P<pr_ref>\d+)\b
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+
+# GitHub token kind --> Slack markdown before and after its converted content.
+_GITHUB_TO_SLACK_STYLES = {
+    "header": ("*", "*"),
+    "bold_italic": ("_*", "*_"),
+    "bold": ("*", "*"),
+    "bold_underscores": ("*", "*"),
+    "italic": ("_", "_"),
+    "strikethrough": ("~", "~"),
+}
+
+# Same as "_GITHUB_TOKENS", but for Slack markdown.
+_SLACK_TOKENS = re.compile(
+    r"""
+      (?P<code_block>```(?P<code_body>(?s:.+?))```)      # Multiline code blocks.
+    | (?P<code>`[^`\n]+`)                               # Inline code.
+    | (?P<quote>^&gt;)                                  # Block quotes.
+    | (?P<bullet>^(?P<indent>(?:[ ]{4})*)[•◦▪]\ufe0e?)  # List items.
+    | (?P<user><@(?P<user_id>[A-Z0-9]+)(?:\|[^<>\n]*)?>)
+    | (?P<channel><\#(?P<channel_id>[A-Z0-9]+)(?:\|(?P<channel_name>[^<>\n]*))?>)
+    | (?P<link><(?P<link_url>[^<>|\n]*)\|(?P<link_text>[^<>\n]*)>)
+    | _\*(?P<bold_italic>.+?)\*_
+    | \*_(?P<italic_bold>.+?)_\*
+    | \*\*\*(?P<github_bold_italic>.+?)\*\*\*
+    | \*\*(?P<github_bold>.+?)\*\*
+    | (?<!\*)\*(?P<bold>[^*\n]+?)\*
+    | __(?P<italic>.+?)__
+    | ~~(?P<github_strikethrough>.+?)~~
+    | (?<!~)~(?P<strikethrough>[^~\n]+?)~
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+
+# Slack token kind --> GitHub markdown before and after its converted content.
+_SLACK_TO_GITHUB_STYLES = {
+    "bold_italic": ("***", "***"),
+    "italic_bold": ("***", "***"),
+    "github_bold_italic": ("***", "***"),
+    "github_bold": ("**", "**"),
+    "bold": ("**", "**"),
+    "italic": ("_", "_"),
+    "github_strikethrough": ("~~", "~~"),
+    "strikethrough": ("~~", "~~"),
+}
+
+
 def github_to_slack(text: str, pr_url: str) -> str:
     """Convert GitHub markdown text to Slack markdown text.
 
@@ -26,6 +95,10 @@ def github_to_slack(text: str, pr_url: str) -> str:
     - https://docs.github.com/en/get-started/writing-on-github/getting-started-with-writing-and-formatting-on-github/basic-writing-and-formatting-syntax
     - https://api.slack.com/reference/surfaces/formatting
 
+    The text is tokenized in a single pass, leaving code spans and blocks
+    as-is. User mentions are resolved in one batch after that, so each
+    user is looked up only once, regardless of how often they're mentioned.
+
     Args:
         text: Text body, possibly containing GitHub markdown.
         pr_url: URL of the PR we're working on, used to convert
@@ -34,54 +107,64 @@ def github_to_slack(text: str, pr_url: str) -> str:
     Returns:
         Slack markdown text.
     """
-    # Header lines --> bold lines.
-    text = re.sub(r"^#+\s+(.+)", r"**\1**", text, flags=re.MULTILINE)
+    parsed = urlparse(pr_url)
+    github_url = f"{parsed.scheme}://{parsed.netloc}"
+    pr_url_base = re.sub(r"/pull/\d+$", "/pull", pr_url)
+
+    parts: list[str | _GithubUser] = []
+
+    def convert(start: int, end: int) -> None:
+        pos = start
+        for m in _GITHUB_TOKENS.finditer(text, start, end):
+            parts.append(text[pos : m.start()])
+            pos = m.end()
+
+            kind = m.lastgroup
+            if kind in _GITHUB_TO_SLACK_STYLES:
+                prefix, suffix = _GITHUB_TO_SLACK_STYLES[kind]
+                parts.append(prefix)
+                convert(m.start(kind), m.end(kind))
+                parts.append(suffix)
 
-    # Bold and italic text together: "*** ... ***" --> "_* ... *_".
-    text = re.sub(r"\*\*\*(.+?)\*\*\*", r"_**\1**_", text)
+            elif kind in ("code", "url"):
+                parts.append(m[0])
 
-    # Italic text: "*" --> "_" ("_" -> "_" is a no-op).
-    text = re.sub(r"(^|[^*])\*([^*]+?)\*", r"\1_\2_", text)
+            elif kind == "bullet":
+                # Lists (up to 2 levels): "-" or "*" or "+" --> "•" and "◦".
+                parts.append("          ◦   " if m["indent"] else "  •  ")
 
-    # Bold text: "**" or "__" --> "*".
-    text = re.sub(r"\*\*(.+?)\*\*", r"*\1*", text)
-    text = re.sub(r"__(.+?)__", r"*\1*", text)
+            elif kind in ("image", "link"):
+                # "[text](url)" --> "<url|text>", "![text](url)" --> "Image: <...>".
+                parts.append("Image: <" if kind == "image" else "<")
+                parts.append(m[kind + "_url"] + "|")
+                convert(m.start(kind + "_text"), m.end(kind + "_text"))
+                parts.append(">")
 
-    # Strikethrough text: "~~" --> "~" ("~" -> "~" is a no-op).
-    text = re.sub(r"~~(.+?)~~", r"~\1~", text)
+            elif kind == "slack_image":
+                parts.append(f"Image: <{m[kind]}>")
 
-    # Links: "[text](url)" --> "<url|text>".
-    # Images: "![text](url)" --> "!<url|text>" --> "Image: <url|text>".
-    text = re.sub(r"\[(.*?)\]\((.*?)\)", r"<\2|\1>", text)
-    text = re.sub(r"!<(.*?)>", r"Image: <\1>", text)
+            elif kind == "mention":
+                # "@user" --> "<@U123>" or "<https://github.com/user|@user>",
+                # "@org/team" --> "<https://github.com/org/teams/team|@org/team>".
+                url_suffix = m[kind].replace("/", "/teams/")
+                profile_link = f"{github_url}/{url_suffix}"
+                parts.append(_GithubUser(login=m[kind], html_url=profile_link))
 
-    # Lists (up to 2 levels): "-" or "*" or "+" --> "•" and "◦".
-    for bullet in ("-", r"\+"):
-        text = re.sub(rf"^{bullet}\s*", "  •  ", text, flags=re.MULTILINE)
-        text = re.sub(
-            rf"^\s{{2,4}}{bullet}\s*", r"          ◦   ", text, flags=re.MULTILINE
-        )
+            elif kind == "pr_ref":
+                # "#123" --> "<PR URL|#123>" (works for issues too).
+                parts.append(f"<{pr_url_base}/{m[kind]}|#{m[kind]}>")
 
-    # Mentions: "@user" --> "<@U123>" or "<https://github.com/user|@user>",
-    # "@org/team" --> "<https://github.com/org/teams/team|@org/team>".
-    for github_user in re.findall(r"@[\w/-]+", text):
-        parsed = urlparse(pr_url)
-        url_suffix = github_user[1:]
-        if "/" in url_suffix:
-            url_suffix = url_suffix.replace("/", "/teams/")
-        profile_link = f"{parsed.scheme}://{parsed.netloc}/{url_suffix}"
-        user_obj = _GithubUser(login=github_user[1:], html_url=profile_link)
-        slack_user = users.format_github_user_for_slack(user_obj)
-        text = text.replace(github_user, slack_user)
+            # Otherwise, hide HTML comments.
 
-    # PR references: "#123" --> "<PR URL|#123>" (works for issues too).
-    url_base = re.sub(r"/pull/\d+$", "/pull", pr_url)
-    text = re.sub(r"#(\d+)", rf"<{url_base}/\1|#\1>", text)
+        parts.append(text[pos:end])
 
-    # Hide HTML comments.
-    text = re.sub(r"<!--.+?-->", "", text, flags=re.DOTALL)
+    convert(0, len(text))
 
-    return text
+    github_users = [p for p in parts if isinstance(p, _GithubUser)]
+    mentions = users.format_github_users_for_slack(github_users)
+    return "".join(
+        mentions[p.login] if isinstance(p, _GithubUser) else p for p in parts
+    )
 
 
 def slack_to_github(text: str) -> str:
@@ -91,61 +174,83 @@ def slack_to_github(text: str) -> str:
     - https://api.slack.com/reference/surfaces/formatting
     - https://docs.github.com/en/get-started/writing-on-github/getting-started-with-writing-and-formatting-on-github/basic-writing-and-formatting-syntax
 
+    The text is tokenized in a single pass, leaving code spans and blocks
+    as-is. User mentions and channel references are resolved in one batch
+    after that, so each user and channel is looked up only once.
+
     Args:
         text: Text body, possibly containing Slack markdown.
 
     Returns:
         GitHub markdown text.
     """
-    # Bold and italic text together: "_*" or "*_" --> "***".
-    text = re.sub(r"_\*(.+?)\*_", r"***\1***", text)
-    text = re.sub(r"\*_(.+?)_\*", r"***\1***", text)
+    parts: list[str | _SlackChannel | _SlackUser] = []
+
+    def convert(start: int, end: int) -> None:
+        pos = start
+        for m in _SLACK_TOKENS.finditer(text, start, end):
+            parts.append(text[pos : m.start()])
+            pos = m.end()
+
+            kind = m.lastgroup
+            if kind in _SLACK_TO_GITHUB_STYLES:
+                prefix, suffix = _SLACK_TO_GITHUB_STYLES[kind]
+                parts.append(prefix)
+                convert(m.start(kind), m.end(kind))
+                parts.append(suffix)
+
+            elif kind == "code_block":
+                # Multiline code blocks: ```aaa\nbbb``` --> ```\naaa\nbbb\n```.
+                body = m["code_body"].removeprefix("\n").removesuffix("\n")
+                parts.append(f"```\n{body}\n```")
+
+            elif kind == "code":
+                parts.append(m[0])
+
+            elif kind == "quote":
+                # Block quotes: "&gt; aaa" --> "> aaa".
+                parts.append(">")
 
-    # Bold text: "*" --> "**" (italic text is a no-op: "_" --> "_").
-    text = re.sub(r"(^|[^*])\*([^*]+?)\*", r"\1**\2**", text)
+            elif kind == "bullet":
+                # Lists (up to 5 levels): "•", "◦", and "▪︎" --> "-".
+                parts.append("  " * (len(m["indent"]) // 4) + "-")
 
-    # Italic text: "__" --> "_".
-    text = re.sub(r"__(.+?)__", r"_\1_", text)
+            elif kind == "user":
+                parts.append(_SlackUser(m["user_id"]))
 
-    # Strikethrough text: "~" --> "~~" ("~~" -> "~~" is a no-op).
-    text = re.sub(r"(^|[^~])~([^~]+?)~", r"\1~~\2~~", text)
+            elif kind == "channel":
+                parts.append(_SlackChannel(m["channel_name"] or "", m["channel_id"]))
 
-    # Block quotes: "&gt; aaa" --> "> aaa".
-    text = re.sub(r"^&gt;(.*)", r">\1", text, flags=re.MULTILINE)
+            elif kind == "link":
+                # Links: "<url|text>" --> "[text](url)".
+                parts.append(f"[{m['link_text']}]({m['link_url']})")
 
-    # Multiline code blocks: ```aaa\nbbb``` --> ```\naaa\nbbb\n```.
-    text = re.sub(r"```(.+?)```", r"```\n\1\n```", text, flags=re.DOTALL)
+        parts.append(text[pos:end])
 
-    # Lists (up to 5 levels): "•", "◦", and "▪︎" --> "-".
-    text = re.sub(r"^•", "-", text, flags=re.MULTILINE)
-    text = re.sub(r"^    ◦", "  -", text, flags=re.MULTILINE)
-    text = re.sub(r"^        ▪︎", "    -", text, flags=re.MULTILINE)
-    text = re.sub(r"^            •", "      -", text, flags=re.MULTILINE)
-    text = re.sub(r"^                ◦", "        -", text, flags=re.MULTILINE)
+    convert(0, len(text))
 
-    # Links: "<url|text>" or "<@...>" or "<#...>" --> "[text](url)".
-    text = re.sub(r"<(.*?)\|(.*?)>", r"[\2](\1)", text)
-    text = re.sub(r"<([@#][A-Z0-9]+)>", r"[](\1)", text)
+    # User mentions: "<@...>" --> "@github-user" or "Full Name".
+    user_ids = [p.id for p in parts if isinstance(p, _SlackUser)]
+    mentions = users.format_slack_users_for_github(user_ids)
 
-    # Channel references: "<#...>" or "<#...|name>" --> "[name](#...)" -->
+    # Channel references: "<#...>" or "<#...|name>" -->
     # "[#name](slack://channel?team={TEAM_ID}&id={CHANNEL_ID})"
     # (see https://api.slack.com/reference/deep-linking).
-    for channel in re.findall(r"\[(.*?)\]\(#([A-Z0-9]+)\)", text):
-        channel = _SlackChannel(*channel)
-        old = f"[{channel.name}](#{channel.id})"
-        if not channel.name:
-            channel = _SlackChannel(_slack_channel_name(channel.id), channel.id)
-        team_id = _slack_team_id()
-        new = f"[#{channel.name}](slack://channel?team={team_id}&id={channel.id})"
-        text = text.replace(old, new)
-
-    # User mentions: "<@...>" --> "[](@...)" --> "@github-user" or "Full Name".
-    for slack_user in re.findall(r"(\[.*?\]\(@([A-Z0-9]+)\))", text):
-        slack_user = _SlackUser(*slack_user)
-        github_user = users.format_slack_user_for_github(slack_user.id)
-        text = text.replace(slack_user.link, github_user)
-
-    return text
+    channels = {p.id: p.name for p in parts if isinstance(p, _SlackChannel)}
+    team_id = _slack_team_id() if channels else ""
+    for channel_id, name in channels.items():
+        name = name or _slack_channel_name(channel_id)
+        url = f"slack://channel?team={team_id}&id={channel_id}"
+        channels[channel_id] = f"[#{name}]({url})"
+
+    def render(part: str | _SlackChannel | _SlackUser) -> str:
+        if isinstance(part, _SlackUser):
+            return mentions[part.id]
+        if isinstance(part, _SlackChannel):
+            return channels[part.id]
+        return part
+
+    return "".join(render(p) for p in parts)
 
 
 def _slack_channel_name(id: str) -> str:
@@ -1,17 +1,34 @@
 """User-related helper functions across GitHub and Slack."""
 
-from autokitteh.slack import slack_client
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
 from github import GithubException
 from github import NamedUser
 from slack_sdk.errors import SlackApiError
 
 import data_helper
 import debug
+import directory
 import github_helper
+import slack_api
+
 
+# Concurrent user lookups in batches. Each lookup makes a few calls
+# to GitHub and to Slack's "users.lookupByEmail" (Tier 3: 50+ per
+# minute), so a small pool speeds up batches without being throttled.
+_MAX_CONCURRENT_LOOKUPS = 4
+
+# Concurrent and consecutive lookups share the list of all Slack users.
+_SLACK_USERS_TTL = 600  # Seconds.
 
 gh = github_helper.shared_client
-slack = slack_client("slack_conn")
+slack = slack_api.shared_client
+
+_slack_users_lock = threading.Lock()
+_slack_users_cache: list[dict] = []
+_slack_users_listed_at: float | None = None  # None = not listed yet.
 
 
 def _email_to_github_user_id(email: str) -> str:
@@ -47,6 +64,29 @@ def format_github_user_for_slack(github_user) -> str:
         Used for mentioning users in Slack messages.
     """
     slack_user_id = github_username_to_slack_user_id(github_user.login)
+    return _format_github_user(github_user, slack_user_id)
+
+
+def format_github_users_for_slack(github_users) -> dict[str, str]:
+    """Convert multiple GitHub users or teams to linkified references in Slack.
+
+    Args:
+        github_users: GitHub user objects, possibly with repetitions.
+
+    Returns:
+        GitHub login --> Slack user reference, or GitHub profile link.
+        Each user is looked up only once, and misses are looked up concurrently
+        (see "github_usernames_to_slack_user_ids").
+    """
+    unique_users = {user.login: user for user in github_users}
+    slack_user_ids = github_usernames_to_slack_user_ids(list(unique_users))
+    return {
+        login: _format_github_user(u, slack_user_ids.get(login, ""))
+        for login, u in unique_users.items()
+    }
+
+
+def _format_github_user(github_user, slack_user_id: str) -> str:
     if slack_user_id:
         # Mention the user by their Slack ID, if possible.
         return f"<@{slack_user_id}>"
@@ -72,6 +112,11 @@ def format_slack_user_for_github(slack_user_id: str) -> str:
         debug.log("Required input not found: Slack user ID")
         return "Someone"
 
+    # Optimization: answer from the org-wide directory, if the user isn't new.
+    github_ref = directory.github_reference(slack_user_id)
+    if github_ref:
+        return github_ref
+
     # Optimization: if we already have it cached, no need to look it up.
     github_ref = data_helper.cached_github_reference(slack_user_id)
     if github_ref:
@@ -107,18 +152,19 @@ def format_slack_user_for_github(slack_user_id: str) -> str:
         debug.log(f"Slack user <@{slack_user_id}>: `real_name` not found in profile")
         return "Someone"
 
-    users = []
-    for user in _github_users():
-        if user.name and user.name.lower() == slack_name:
-            users.append(user)
+    logins = directory.github_logins_by_name(slack_name)
+    if logins is None:  # The directory wasn't synced yet.
+        logins = [
+            u.login for u in _github_users() if (u.name or "").lower() == slack_name
+        ]
 
-    if len(users) == 1:
-        github_ref = "@" + users[0].login
+    if len(logins) == 1:
+        github_ref = "@" + logins[0]
         data_helper.cache_github_reference(slack_user_id, github_ref)
         return github_ref
 
     # Optimization: cache unsuccessful results too (i.e. external collaborators).
-    error = f"Slack user <@{slack_user_id}>: found {len(users)}"
+    error = f"Slack user <@{slack_user_id}>: found {len(logins)}"
     debug.log(f"{error} GitHub org members with the same full name")
     data_helper.cache_github_reference(slack_user_id, profile["real_name"])
 
@@ -126,6 +172,21 @@ def format_slack_user_for_github(slack_user_id: str) -> str:
     return profile["real_name"]
 
 
+def format_slack_users_for_github(slack_user_ids: list[str]) -> dict[str, str]:
+    """Convert multiple Slack user IDs to GitHub user references/names.
+
+    Args:
+        slack_user_ids: Slack user IDs, possibly with repetitions.
+
+    Returns:
+        Slack user ID --> GitHub user reference, or the Slack user's full name,
+        or "Someone". Each user is looked up only once.
+    """
+    return {
+        id: format_slack_user_for_github(id) for id in dict.fromkeys(slack_user_ids)
+    }
+
+
 def _github_users() -> list[NamedUser.NamedUser]:
     """Return a list of all GitHub users in the organization."""
     try:
@@ -166,24 +227,70 @@ def github_username_to_slack_user(github_username: str) -> dict:
     return _slack_user_info(slack_user_id) if slack_user_id else {}
 
 
-def github_username_to_slack_user_id(github_username: str) -> str:
-    """Convert a GitHub username to a Slack user ID, or "" if not found.
+def github_usernames_to_slack_user_ids(github_usernames: list[str]) -> dict[str, str]:
+    """Convert multiple GitHub usernames to Slack user IDs.
 
-    This function tries to match the email address first, and then
-    falls back to matching the user's full name (case-insensitive).
+    Usernames are deduplicated, and those that are already in the directory
+    or cached are resolved first, without API calls. The rest are looked
+    up concurrently, with a bounded number of lookups at a time.
 
-    This function also caches both successful and failed results for
-    a day, to reduce the amount of API calls, especially to Slack.
+    Returns:
+        GitHub username --> Slack user ID, or "" if not found.
+    """
+    slack_user_ids = {}
+    misses = []
+    for username in dict.fromkeys(github_usernames):
+        slack_user_id = _known_slack_user_id(username)
+        if slack_user_id is None:
+            misses.append(username)
+        else:
+            slack_user_ids[username] = slack_user_id
+
+    if len(misses) == 1:
+        slack_user_ids[misses[0]] = github_username_to_slack_user_id(misses[0])
+    elif misses:
+        workers = min(len(misses), _MAX_CONCURRENT_LOOKUPS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(github_username_to_slack_user_id, misses)
+            slack_user_ids.update(zip(misses, results, strict=True))
+
+    return slack_user_ids
+
+
+def _known_slack_user_id(github_username: str) -> str | None:
+    """Return the Slack user ID of a GitHub user, if it's known without API calls.
+
+    Returns:
+        Slack user ID, or "" if the GitHub user can't have one,
+        or None if it has to be looked up.
     """
     # Don't even check GitHub teams, only individual users.
     if "/" in github_username:
         return ""
 
+    # Optimization: answer from the org-wide directory, if the user is a member.
+    slack_user_id = directory.slack_user_id(github_username)
+    if slack_user_id is not None:
+        return slack_user_id
+
     # Optimization: if we already have it cached, no need to look it up.
     slack_user_id = data_helper.cached_slack_user_id(github_username)
     if slack_user_id in ("bot", "not found"):
         return ""
-    elif slack_user_id:
+    return slack_user_id or None
+
+
+def github_username_to_slack_user_id(github_username: str) -> str:
+    """Convert a GitHub username to a Slack user ID, or "" if not found.
+
+    This function tries to match the email address first, and then
+    falls back to matching the user's full name (case-insensitive).
+
+    This function also caches both successful and failed results for
+    a day, to reduce the amount of API calls, especially to Slack.
+    """
+    slack_user_id = _known_slack_user_id(github_username)
+    if slack_user_id is not None:
         return slack_user_id
 
     user = gh.get_user(github_username)
@@ -235,8 +342,32 @@ def _slack_user_info(slack_user_id: str) -> dict:
         return {}
 
 
+def reset_slack_users() -> None:
+    """Forget the list of all Slack users, so the next lookup lists them again."""
+    global _slack_users_listed_at
+
+    with _slack_users_lock:
+        _slack_users_listed_at = None
+
+
 def _slack_users() -> list[dict]:
-    """Return a list of all Slack users in the workspace."""
+    """Return a list of all Slack users in the workspace.
+
+    The list is shared by concurrent lookups, and reused for a few minutes.
+    """
+    global _slack_users_cache, _slack_users_listed_at
+
+    with _slack_users_lock:
+        listed_at = _slack_users_listed_at
+        if listed_at is None or time.monotonic() - listed_at > _SLACK_USERS_TTL:
+            _slack_users_cache = _list_slack_users()
+            _slack_users_listed_at = time.monotonic()
+
+        return _slack_users_cache
+
+
+def _list_slack_users() -> list[dict]:
+    """Return a list of all Slack users in the workspace (not cached)."""
     users = []
     next_cursor = None
     while next_cursor != "":
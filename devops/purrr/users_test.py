@@ -0,0 +1,124 @@
+"""Unit tests for the "users" module."""
+
+import threading
+
+from autokitteh import AttrDict, github, slack
+from autokitteh.store import _local_dev_store
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_github_and_slack_clients(mocker):
+    mocker.patch.object(github, "github_client", autospec=True)
+    mocker.patch.object(slack, "slack_client", autospec=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_store(setup_mock_github_and_slack_clients):
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
+class TestGithubUsernamesToSlackUserIds:
+    """Unit tests for the "github_usernames_to_slack_user_ids" function."""
+
+    @pytest.fixture
+    def mock_lookup(self, mocker):
+        import users
+
+        return mocker.patch.object(
+            users, "github_username_to_slack_user_id", autospec=True
+        )
+
+    def test_empty(self, mock_lookup):
+        import users
+
+        assert users.github_usernames_to_slack_user_ids([]) == {}
+        mock_lookup.assert_not_called()
+
+    def test_cached_and_teams_are_not_looked_up(self, mock_lookup):
+        import data_helper
+        import users
+
+        data_helper.cache_slack_user_id("alice", "U1")
+        data_helper.cache_slack_user_id("dependabot", "bot")
+        data_helper.cache_slack_user_id("stranger", "not found")
+        mock_lookup.return_value = "U2"
+
+        actual = users.github_usernames_to_slack_user_ids(
+            ["alice", "org/team", "dependabot", "stranger", "bob"]
+        )
+
+        assert actual == {
+            "alice": "U1",
+            "org/team": "",
+            "dependabot": "",
+            "stranger": "",
+            "bob": "U2",
+        }
+        mock_lookup.assert_called_once_with("bob")
+
+    def test_misses_are_deduped_and_concurrent(self, mock_lookup):
+        import users
+
+        n = users._MAX_CONCURRENT_LOOKUPS
+        barrier = threading.Barrier(n, timeout=5)
+
+        def lookup(username):
+            barrier.wait()  # Fails unless the lookups run concurrently.
+            return "U" + username
+
+        mock_lookup.side_effect = lookup
+        usernames = [str(i) for i in range(n)] * 2
+
+        actual = users.github_usernames_to_slack_user_ids(usernames)
+
+        assert actual == {str(i): f"U{i}" for i in range(n)}
+        assert mock_lookup.call_count == n
+
+
+class TestFormatGithubUsersForSlack:
+    """Unit tests for the "format_github_users_for_slack" function."""
+
+    def test_batch_lookup(self, mocker):
+        import users
+
+        mock_lookup = mocker.patch.object(
+            users, "github_usernames_to_slack_user_ids", autospec=True
+        )
+        mock_lookup.return_value = {"alice": "U1", "bob": ""}
+        alice = AttrDict(login="alice", html_url="https://github.com/alice")
+        bob = AttrDict(login="bob", html_url="https://github.com/bob")
+
+        actual = users.format_github_users_for_slack([alice, bob, alice])
+
+        assert actual == {"alice": "<@U1>", "bob": "<https://github.com/bob|@bob>"}
+        mock_lookup.assert_called_once_with(["alice", "bob"])
+
+
+def test_slack_users_are_listed_once(mocker):
+    import users
+
+    users.reset_slack_users()
+    mock_list = mocker.patch.object(users, "_list_slack_users", autospec=True)
+    mock_list.return_value = [{"id": "U1"}]
+
+    assert users._slack_users() == [{"id": "U1"}]
+    assert users._slack_users() == [{"id": "U1"}]
+    mock_list.assert_called_once()
+
+    users.reset_slack_users()
+
+
+def test_slack_users_are_listed_soon_after_boot(mocker):
+    import users
+
+    users.reset_slack_users()
+    mocker.patch.object(users.time, "monotonic", return_value=5.0)
+    mock_list = mocker.patch.object(users, "_list_slack_users", autospec=True)
+    mock_list.return_value = [{"id": "U1"}]
+
+    assert users._slack_users() == [{"id": "U1"}]
+
+    users.reset_slack_users()
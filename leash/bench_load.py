@@ -0,0 +1,319 @@
+"""Load test of the incident workflow against in-memory fakes of all services.
+
+Simulates a burst of concurrent incidents going through the handlers, the way
+AutoKitteh would run them: every incident is created and paged by the new
+incident webhook, half of them are acked from the dashboard, the rest are
+escalated by the escalation schedule, and then all of them are resolved.
+
+Google Sheets, Twilio, Gmail, Slack and the AutoKitteh store are replaced by
+the fakes in `leash_fakes`, each adding a fixed latency to every API call. The
+report includes the API calls per incident, the latency from receiving an
+incident until its first page, and the throughput of creating incidents.
+
+Usage:
+    python bench_load.py [--incidents N] [--concurrency N] [--latency-ms MS] [--json]
+
+Run it before and after changing the storage or the scheduling, with the same
+arguments, to compare the numbers.
+"""
+
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from contextlib import redirect_stdout
+from dataclasses import asdict
+from dataclasses import dataclass
+from functools import partial
+from datetime import datetime, timedelta
+import io
+import json
+import re
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from leash_fakes import Api
+from leash_fakes import FakeAutoKittehStore
+from leash_fakes import FakeGmail
+from leash_fakes import FakeSlack
+from leash_fakes import FakeSpreadsheet
+from leash_fakes import FakeTwilio
+
+
+with patch("autokitteh.get_webhook_url", return_value="http://localhost/dashboard"):
+    import dedup
+    import escalations
+    import handlers
+    import incident_ids
+    import incidents
+    import notifications
+    import store
+    import store_gsheets
+
+from model import Incident
+from model import IncidentState
+from model import ScheduleRow
+
+import config
+
+
+_ONCALL = ["alice", "bob", "carol"]
+
+
+@dataclass(frozen=True, kw_only=True)
+class Report:
+    """Load test results."""
+
+    incidents: int
+    concurrency: int
+    latency_ms: float
+    create_seconds: float
+    throughput_ips: float
+    page_p50_ms: float
+    page_p95_ms: float
+    page_max_ms: float
+    escalated: int
+    messages: int
+    unpaged: int
+    unresolved: int
+    api_calls_per_incident: float
+    calls_per_incident: dict[str, float]
+
+
+class _Request(SimpleNamespace):
+    """The `data` of an AutoKitteh HTTP event."""
+
+    def get(self, key: str):
+        return getattr(self, key, None)
+
+
+class _Clock:
+    """Current time for the incident workflow, which the test can skip ahead."""
+
+    def __init__(self) -> None:
+        self.offset = timedelta()
+
+    def now(self) -> datetime:
+        return datetime.now(tz=config.TZ) + self.offset
+
+
+_session = threading.local()
+
+
+def _start_session(spreadsheet: FakeSpreadsheet) -> None:
+    """Start a simulated AutoKitteh session in the current thread.
+
+    Every session runs in a process of its own, so it opens the storage
+    backend from scratch. In-process caches, e.g. of notification lookups,
+    are shared by the simulated sessions, which is slightly optimistic.
+    """
+    _session.__dict__.clear()
+    _session.store = store_gsheets.SheetsStore(spreadsheet)
+
+
+def _backend() -> store.Store:
+    return _session.store
+
+
+def _http_outcome(status_code: int = 200, **kwargs) -> None:
+    if not hasattr(_session, "outcome"):
+        _session.outcome = {"status_code": status_code, **kwargs}
+
+
+def _call_handler(spreadsheet: FakeSpreadsheet, handler, data: _Request) -> dict:
+    """Call a webhook handler in a new session, and return its HTTP outcome."""
+    _start_session(spreadsheet)
+    handler(SimpleNamespace(data=data))
+    return _session.outcome
+
+
+def _new_incident(spreadsheet: FakeSpreadsheet, details: str) -> tuple[str, float]:
+    """Report a new incident, and return its ID and when it was reported."""
+    start = time.monotonic()
+    data = _Request(body=SimpleNamespace(text=details))
+    outcome = _call_handler(spreadsheet, handlers.on_new_incident_webhook, data)
+    return outcome["json"]["incident_id"], start
+
+
+def _dashboard_action(spreadsheet: FakeSpreadsheet, unique_id: str, action: str):
+    data = _Request(
+        method="POST",
+        url=SimpleNamespace(query={"unique_id": unique_id}),
+        body=SimpleNamespace(form={"action": action}),
+    )
+    _call_handler(spreadsheet, handlers.on_incident_dashboard_webhook, data)
+
+
+def _spreadsheet(api: Api) -> FakeSpreadsheet:
+    """Return the spreadsheet of a deployment, with an on-call team."""
+    spreadsheet = FakeSpreadsheet(api)
+
+    spreadsheet.add_worksheet("contacts").update(
+        [["name", "email", "phone"]]
+        + [
+            [name, f"{name}@example.com", f"+1555000{i:04}"]
+            for i, name in enumerate(_ONCALL)
+        ]
+    )
+
+    now = datetime.now(tz=config.TZ)
+    schedule = ScheduleRow(
+        start_time=now - config.ESCALATION_DELAY * 10,
+        end_time=now + config.ESCALATION_DELAY * 10,
+        assignees=_ONCALL,
+    )
+    spreadsheet.add_worksheet("schedule").update(
+        [ScheduleRow.labels, schedule.row], raw=False
+    )
+
+    spreadsheet.add_worksheet("incidents").update([Incident.labels])
+
+    return spreadsheet
+
+
+def run(count: int = 100, concurrency: int = 10, latency_ms: float = 50) -> Report:
+    """Run the load test.
+
+    Args:
+        count: Number of incidents to create.
+        concurrency: Number of sessions handling webhooks at the same time.
+        latency_ms: Latency of every call to a fake service.
+
+    Returns:
+        The load test report.
+    """
+    latency = latency_ms / 1000
+    apis = {
+        name: Api(name, latency)
+        for name in ("sheets", "twilio", "gmail", "slack", "ak_store")
+    }
+
+    spreadsheet = _spreadsheet(apis["sheets"])
+    twilio, gmail, slack = (
+        FakeTwilio(apis["twilio"]),
+        FakeGmail(apis["gmail"]),
+        FakeSlack(apis["slack"]),
+    )
+    ak_store = FakeAutoKittehStore(apis["ak_store"])
+    clock = _Clock()
+
+    for api in apis.values():
+        api.calls.clear()  # Setting up is not part of the measurements.
+
+    with ExitStack() as stack:
+        stack.enter_context(redirect_stdout(io.StringIO()))
+        stack.enter_context(patch.object(store, "backend", _backend))
+        stack.enter_context(patch.object(handlers, "http_outcome", _http_outcome))
+        stack.enter_context(patch.object(incidents, "_now", clock.now))
+        stack.enter_context(patch.object(incident_ids, "_block", iter(())))
+        stack.enter_context(patch.object(notifications, "twilio", twilio))
+        stack.enter_context(patch.object(notifications, "gmail", gmail))
+        stack.enter_context(patch.object(notifications, "slack", slack))
+        for module in (dedup, escalations, incident_ids, incidents, store_gsheets):
+            for name in vars(FakeAutoKittehStore):
+                if not name.startswith("_") and hasattr(module, name):
+                    stack.enter_context(
+                        patch.object(module, name, getattr(ak_store, name))
+                    )
+
+        notifications._gmail_sender.cache_clear()
+        notifications._slack_user_id.cache_clear()
+
+        executor = stack.enter_context(ThreadPoolExecutor(max_workers=concurrency))
+
+        # Every incident is created and paged.
+        t0 = time.monotonic()
+        details = (f"load test incident #{i}" for i in range(count))
+        reported = dict(executor.map(partial(_new_incident, spreadsheet), details))
+        create_seconds = time.monotonic() - t0
+
+        unique_ids = [
+            Incident.from_row(row).unique_id
+            for row in spreadsheet.worksheet("incidents").rows[1:]
+        ]
+        act = partial(_dashboard_action, spreadsheet)
+
+        # Half of them are acked, and the rest are escalated.
+        list(executor.map(partial(act, action="ack"), unique_ids[::2]))
+
+        clock.offset += config.ESCALATION_DELAY * 2
+        _start_session(spreadsheet)
+        escalated = incidents.escalate_due()
+
+        _start_session(spreadsheet)
+        handlers.on_flush_schedule(None)
+
+        # And finally all of them are resolved.
+        list(executor.map(partial(act, action="resolve"), unique_ids))
+
+        _start_session(spreadsheet)
+        handlers.on_flush_schedule(None)
+
+        calls = Counter()
+        for api in apis.values():
+            calls.update(api.calls)
+            api.latency = 0  # Checking the results is not measured either.
+
+        _start_session(spreadsheet)
+        unresolved = sum(
+            1
+            for uid in unique_ids
+            if store.get_incident_by_unique_id(uid).state != IncidentState.RESOLVED
+        )
+
+    paged: dict[str, float] = {}
+    messages = [m for fake in (twilio, gmail, slack) for m in fake.outbox.messages]
+    for t, _, text in sorted(messages):
+        if (m := re.search(r"^ID: (\d+)", text, re.MULTILINE)) and m[1] not in paged:
+            paged[m[1]] = t
+
+    page_ms = [(paged[i] - start) * 1000 for i, start in reported.items() if i in paged]
+    percentiles = statistics.quantiles(page_ms, n=100, method="inclusive")
+
+    return Report(
+        incidents=count,
+        concurrency=concurrency,
+        latency_ms=latency_ms,
+        create_seconds=create_seconds,
+        throughput_ips=count / create_seconds,
+        page_p50_ms=percentiles[49],
+        page_p95_ms=percentiles[94],
+        page_max_ms=max(page_ms),
+        escalated=escalated,
+        messages=len(messages),
+        unpaged=count - len(page_ms),
+        unresolved=unresolved,
+        api_calls_per_incident=calls.total() / count,
+        calls_per_incident={k: n / count for k, n in sorted(calls.items())},
+    )
+
+
+def main() -> None:
+    """Run the load test from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--incidents", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50, help="per API call")
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    report = run(args.incidents, args.concurrency, args.latency_ms)
+
+    if args.json:
+        print(json.dumps(asdict(report)))
+        return
+
+    for k, v in asdict(report).items():
+        if isinstance(v, dict):
+            print(f"{k:>24}:")
+            for call, n in v.items():
+                print(f"{call:>40}: {n:.2f}")
+        else:
+            print(f"{k:>24}: {v:.3f}" if isinstance(v, float) else f"{k:>24}: {v}")
+
+
+if __name__ == "__main__":
+    main()
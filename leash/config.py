@@ -35,4 +35,18 @@ TS_FORMAT = _get("TS_FORMAT", "%m-%d-%Y %H:%M")
 
 TWILIO_PHONE_NUMBER = _get("TWILIO_PHONE_NUMBER", "")
 
+NOTIFY_TIMEOUT = timedelta(seconds=_get("NOTIFY_TIMEOUT_SECONDS", 10))
+
+STORE_BACKEND = _get("STORE_BACKEND", "gsheets")
+
+SQLITE_DB_PATH = _get("SQLITE_DB_PATH", "leash.db")
+
+STORE_SNAPSHOT_TTL = timedelta(seconds=_get("STORE_SNAPSHOT_TTL_SECONDS", 60))
+
+INCIDENT_ID_BLOCK_SIZE = _get("INCIDENT_ID_BLOCK_SIZE", 1)
+
+DEDUP_WINDOW = timedelta(minutes=_get("DEDUP_WINDOW_MINUTES", 60))
+
+DEDUP_KEY_PATTERN = _get("DEDUP_KEY_PATTERN", "")
+
 INCIDENT_DASHBOARD_WEBHOOK_URL = get_webhook_url("incident_dashboard_webhook")
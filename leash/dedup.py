@@ -0,0 +1,88 @@
+"""Deduplication of incoming incidents.
+
+Monitors tend to report the same problem many times, e.g. while flapping.
+Instead of creating a new incident for each report, reports with the same
+fingerprint as an active incident, within `config.DEDUP_WINDOW` of the last
+such report, are attached to it as a duplicate counter.
+
+The fingerprint is a hash of the incident details, after normalizing case and
+whitespace. If `config.DEDUP_KEY_PATTERN` is set and matches the details, only
+the matched key is hashed (its first group, if it has one), so that reports
+which differ in e.g. timestamps are grouped as well.
+
+Fingerprints and counters are kept in the AutoKitteh store, so they are shared
+by all sessions.
+"""
+
+from datetime import datetime
+import hashlib
+import re
+
+from autokitteh import add_values, get_value, set_value
+from model import Incident
+import store
+
+import config
+
+
+_FINGERPRINT_KEY_PREFIX = "leash_dedup_fingerprint:"
+
+_COUNT_KEY_PREFIX = "leash_dedup_count:"
+
+
+def fingerprint(details: str) -> str:
+    """Return the fingerprint of incident details."""
+    key = details
+
+    if config.DEDUP_KEY_PATTERN and (m := re.search(config.DEDUP_KEY_PATTERN, key)):
+        key = m.group(1) if m.groups() else m.group(0)
+
+    key = " ".join(key.lower().split())
+
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def attach(details: str, t: datetime) -> Incident | None:
+    """Attach a report to an active incident with the same fingerprint.
+
+    Returns:
+        The incident the report was attached to, or None if there is no such
+        incident and a new one should be created.
+    """
+    if not config.DEDUP_WINDOW:
+        return None
+
+    key = _FINGERPRINT_KEY_PREFIX + fingerprint(details)
+
+    entry = get_value(key)
+    if not entry:
+        return None
+
+    unique_id, last_seen = entry
+    if t.timestamp() - last_seen > config.DEDUP_WINDOW.total_seconds():
+        return None
+
+    inc = store.get_incident_by_unique_id(unique_id)
+    if not inc or not inc.state.is_active:
+        return None
+
+    set_value(key, [unique_id, t.timestamp()])
+    n = add_values(_COUNT_KEY_PREFIX + unique_id, 1)
+
+    print(f"duplicate #{n} of incident {inc.id}")
+
+    return inc
+
+
+def register(details: str, inc: Incident) -> None:
+    """Make an incident the target of later reports with the same fingerprint."""
+    if not config.DEDUP_WINDOW:
+        return
+
+    key = _FINGERPRINT_KEY_PREFIX + fingerprint(details)
+    set_value(key, [inc.unique_id, inc.started_at.timestamp()])
+
+
+def duplicates(inc: Incident) -> int:
+    """Return the number of duplicate reports attached to an incident."""
+    return get_value(_COUNT_KEY_PREFIX + inc.unique_id) or 0
@@ -0,0 +1,79 @@
+"""Escalation timers for active incidents.
+
+All the timers are kept in a single min-heap in the AutoKitteh store, keyed by
+deadline, so that every session sees the same timers. The escalation schedule
+trigger only needs to look at the top of the heap to find the incidents that
+are due, instead of every active incident checking its own state.
+
+The heap is updated with compare-and-set, so concurrent sessions don't lose
+each other's changes.
+"""
+
+from collections.abc import Callable
+from datetime import datetime
+import heapq
+from typing import Any
+
+from autokitteh import check_and_set_value, get_value
+
+
+_KEY = "leash_escalation_timers"
+
+
+def _update(f: Callable[[list[list[Any]]], Any]) -> Any:
+    """Apply a change to the heap atomically, and return the change's result.
+
+    The heap is a list of [deadline timestamp, incident unique ID] pairs.
+    """
+    while True:
+        old = get_value(_KEY)
+        heap = [list(timer) for timer in old or []]
+
+        result = f(heap)
+
+        if check_and_set_value(_KEY, old, heap):
+            return result
+
+
+def _remove(heap: list[list[Any]], unique_id: str) -> None:
+    heap[:] = [timer for timer in heap if timer[1] != unique_id]
+    heapq.heapify(heap)
+
+
+def schedule(unique_id: str, at: datetime) -> None:
+    """Set the time at which an incident is due, replacing any previous one."""
+
+    def f(heap: list[list[Any]]) -> None:
+        _remove(heap, unique_id)
+        heapq.heappush(heap, [at.timestamp(), unique_id])
+
+    _update(f)
+
+
+def cancel(unique_id: str) -> None:
+    """Remove an incident's timer, if it has one."""
+    _update(lambda heap: _remove(heap, unique_id))
+
+
+def claim_due(t: datetime, retry_at: datetime) -> list[str]:
+    """Return the unique IDs of the incidents due at a given time, and claim them.
+
+    The timers of due incidents are moved to `retry_at` rather than removed,
+    so an incident whose handling fails (or whose session crashes) is retried
+    then, unless its timer is rescheduled or cancelled first. This also keeps
+    concurrent callers from handling the same incident twice.
+
+    Incidents are returned in order of their deadlines.
+    """
+    if not (timers := get_value(_KEY)) or timers[0][0] > t.timestamp():
+        return []  # Nothing is due, so don't bother updating.
+
+    def f(heap: list[list[Any]]) -> list[str]:
+        due = []
+        while heap and heap[0][0] <= t.timestamp():
+            due.append(heapq.heappop(heap)[1])
+        for unique_id in due:
+            heapq.heappush(heap, [retry_at.timestamp(), unique_id])
+        return due
+
+    return _update(f)
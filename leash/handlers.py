@@ -2,30 +2,40 @@
 
 This module contains the AutoKitteh event handlers for processing incoming
 webhooks, including new incident creation and interactive incident dashboard
-requests. Handlers coordinate between incoming HTTP events and the incident
+requests, and the schedules that escalate due incidents and write pending
+updates. Handlers coordinate between incoming events and the incident
 management workflow.
 """
 
 from dataclasses import replace
+from datetime import datetime
 
+import dedup
 import incidents
 from model import IncidentState
 import store
 
 from autokitteh import Event, http_outcome
 
+import config
+
 
 def on_new_incident_webhook(event: Event):
     details = event.data.body.text.strip()
 
     print(f"new incident, details={details}")
 
+    if inc := dedup.attach(details, datetime.now(tz=config.TZ)):
+        http_outcome(status_code=200, json={"incident_id": inc.id, "duplicate": True})
+        return
+
     inc = incidents.create(details)
+    dedup.register(details, inc)
 
     http_outcome(status_code=201, json={"incident_id": inc.id})
 
     try:
-        incidents.run(inc)
+        incidents.advance(inc)
     except Exception as e:
         store.update_incident(
             replace(
@@ -58,6 +68,8 @@ def on_incident_dashboard_webhook(event: Event):
             pass
 
         case "POST":
+            inc = incidents.handle_action(data.body.form, user, inc)
+
             http_outcome(
                 status_code=303,
                 headers={"Location": f"{inc.dashboard_url + '&msg=notified'}"},
@@ -100,6 +112,7 @@ def on_incident_dashboard_webhook(event: Event):
         <p>Comment: <pre>{inc.comment or "none"}</pre></p>
         <p>Assignee: {inc.assignee or "none"}</p>
         <p>Assigned at: {inc.assigned_at}</p>
+        <p>Duplicate reports: {dedup.duplicates(inc)}</p>
 
         {form if inc.state.is_active else "<p>Incident is no longer active.</p>"}
 
@@ -109,6 +122,20 @@ def on_incident_dashboard_webhook(event: Event):
     )
 
 
+def on_escalation_schedule(_):
+    """Escalate the incidents that are due."""
+    n = incidents.escalate_due()
+    if n:
+        print(f"checked {n} due incidents.")
+
+
+def on_flush_schedule(_):
+    """Write the pending incident updates to the sheet."""
+    n = store.flush_incident_updates()
+    if n:
+        print(f"flushed {n} incident updates.")
+
+
 def init(_):
     """Run this function manually once to initialize the system."""
     print("initialized.")
@@ -0,0 +1,55 @@
+"""Allocation of incident IDs.
+
+IDs come from a counter in the AutoKitteh store, which holds the highest ID
+handed out so far. A process leases a block of `config.INCIDENT_ID_BLOCK_SIZE`
+IDs at a time with an atomic add, and hands them out locally, so concurrent
+sessions never get the same ID and creating an incident doesn't query the
+storage backend.
+
+IDs in a leased block that the process doesn't use are skipped. Every session
+runs in its own process, so blocks larger than 1 only pay off where a single
+session creates many incidents.
+
+The counter starts after the highest incident ID in the storage backend.
+"""
+
+from collections.abc import Callable
+from collections.abc import Iterator
+from threading import Lock
+
+from autokitteh import add_values, check_and_set_value, get_value
+
+import config
+
+
+_KEY = "leash_incident_id_counter"
+
+_lock = Lock()
+
+_block: Iterator[int] = iter(())
+
+
+def allocate(highest: Callable[[], int]) -> int:
+    """Return a new incident ID.
+
+    Args:
+        highest: Returns the highest incident ID in the storage backend. Only
+            called once per deployment, to initialize the counter.
+    """
+    global _block
+
+    with _lock:
+        if (n := next(_block, None)) is None:
+            _block = iter(_lease(config.INCIDENT_ID_BLOCK_SIZE, highest))
+            n = next(_block)
+
+        return n
+
+
+def _lease(size: int, highest: Callable[[], int]) -> range:
+    if get_value(_KEY) is None:
+        # Another session may initialize it first, which is just as good.
+        check_and_set_value(_KEY, None, highest())
+
+    end = add_values(_KEY, size)
+    return range(end - size + 1, end + 1)
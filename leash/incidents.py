@@ -4,6 +4,10 @@ This module implements the incident lifecycle management including creation,
 assignment, escalation, and resolution. It handles the automatic escalation
 workflow, on-call schedule rotation, notification delivery, and processing
 of user actions from the incident dashboard.
+
+Incidents don't wait for their escalation in a session of their own. Instead,
+each active incident has a timer in `escalations`, and a schedule trigger
+advances only the incidents whose timers are due.
 """
 
 from dataclasses import replace
@@ -11,16 +15,27 @@ from datetime import datetime, timedelta
 import secrets
 from typing import cast
 
+from autokitteh import check_and_set_value, get_value, set_value
+
+import escalations
 from model import Incident
 from model import IncidentState
 from model import ScheduleRow
 from notifications import notify
 import store
 
-from autokitteh import next_event, subscribe
 import config
 
 
+_PENDING_RETRY_DELAY = timedelta(minutes=1)
+
+# State and assignee of each incident, for compare-and-set between sessions.
+_STATE_KEY_PREFIX = "leash_incident_state:"
+
+# When to retry an incident whose escalation failed.
+_RETRY_DELAY = timedelta(minutes=1)
+
+
 def _now() -> datetime:
     return datetime.now(tz=config.TZ)
 
@@ -38,40 +53,134 @@ def create(details: str) -> Incident:
     )
 
     store.add_incident(inc)
+    set_value(_STATE_KEY_PREFIX + inc.unique_id, _state(inc))
 
     return inc
 
 
-def run(inc: Incident) -> None:
-    """Run the incident management loop in a durable workflow."""
-    # Subscribe to incident dashboard webhooks for this incident id.
-    webhook_response_subscription = subscribe(
-        "incident_dashboard_webhook",
-        filter=(
-            f"data.method == 'POST' && data.url.query.unique_id == '{inc.unique_id}'"
-        ),
-    )
+def advance(inc: Incident) -> Incident:
+    """Assign or escalate an incident if needed, and set its escalation timer.
+
+    This is called when an incident is created, when its escalation timer is
+    due, and after every dashboard action.
+    """
+    now = _now()
+
+    if _is_new_assignee_required(now, inc):
+        schedule = store.get_schedule_row(now)
 
-    # Escalation loop.
-    while inc.state.is_active:
-        now = _now()
+        new = _auto_assign(now, inc, schedule)
+        stored = _save(inc, new)
+        if stored is new:
+            _page(inc, new)
+        inc = stored
 
-        if _is_new_assignee_required(now, inc):
-            schedule = store.get_schedule_row(now)
+    if deadline := _next_deadline(now, inc):
+        escalations.schedule(inc.unique_id, deadline)
+    else:
+        escalations.cancel(inc.unique_id)
+        print(f"incident {inc.id} no longer active.")
 
-            inc = _auto_assign(now, inc, schedule)
+    return inc
+
+
+def escalate_due() -> int:
+    """Advance all the incidents whose escalation timers are due.
 
-            store.update_incident(inc)
+    An incident that fails to advance keeps a timer, and is retried later.
 
-            if not inc.state.is_active:
+    Returns:
+        The number of incidents that were due.
+    """
+    now = _now()
+    due = escalations.claim_due(now, now + _RETRY_DELAY)
+
+    for unique_id in due:
+        try:
+            inc = store.get_incident_by_unique_id(unique_id)
+            if not inc:
+                print(f"WARN: incident with unique id {unique_id} not found")
+                escalations.cancel(unique_id)
                 continue
 
-        data = next_event(webhook_response_subscription, timeout=timedelta(minutes=1))
-        if data:
-            inc = _handle_webhook_response(data.body.form, data.get("user"), inc)
-            store.update_incident(inc)
+            advance(inc)
+        except Exception as e:  # noqa: BLE001 - don't block other incidents.
+            print(f"ERROR: incident with unique id {unique_id}: {e}")
+
+    return len(due)
+
+
+def handle_action(form: dict[str, str], user: dict | None, inc: Incident) -> Incident:
+    """Apply an incident dashboard action, and continue the escalation."""
+    new = _handle_webhook_response(form, user, inc)
+    stored = _save(inc, new)
+    if stored is new:
+        _page(inc, new, again=form.get("action") in ("notify", "n"))
+
+    return advance(stored)
+
 
-    print(f"incident {inc.id} no longer active.")
+def _save(old: Incident, new: Incident) -> Incident:
+    """Store an update of an incident, unless another session changed it first.
+
+    Escalations and dashboard actions run in separate sessions, so the update
+    first compares-and-sets the incident's state and assignee in the AutoKitteh
+    store, from those of `old` (which `new` is based on) to those of `new`. If
+    that fails, the other session's update wins, and `new` is dropped. If the
+    update itself fails, the state is set back, so it can be retried.
+
+    Returns:
+        The incident as stored: `new`, or the other session's version.
+    """
+    key = _STATE_KEY_PREFIX + new.unique_id
+    stored = get_value(key)  # None if created before states were kept there.
+    if (stored or _state(old)) != _state(old) or not check_and_set_value(
+        key, stored, _state(new)
+    ):
+        print(f"incident {new.id} changed concurrently, dropping update: {new}")
+        return store.get_incident_by_unique_id(new.unique_id) or old
+
+    try:
+        store.update_incident(new)
+    except Exception:
+        check_and_set_value(key, _state(new), stored)
+        raise
+
+    return new
+
+
+def _state(inc: Incident) -> list[str]:
+    return [str(inc.state), inc.assignee or ""]
+
+
+def _page(old: Incident, new: Incident, again: bool = False) -> None:
+    """Page the assignee of an incident, after it's stored.
+
+    Args:
+        old: The incident before the update.
+        new: The incident after the update.
+        again: Page the assignee even if the update didn't assign the incident.
+    """
+    assigned = new.state == IncidentState.ASSIGNED and (
+        (new.assignee, new.assigned_at) != (old.assignee, old.assigned_at)
+    )
+    if not (assigned or again) or not new.assignee:
+        return
+
+    if contact := store.get_contact_by_name(new.assignee):
+        _notify(contact, new)
+
+
+def _next_deadline(t: datetime, inc: Incident) -> datetime | None:
+    """Return when the incident should be checked for escalation next, if ever."""
+    match inc.state:
+        case IncidentState.PENDING:
+            # No assignee was found, retry later.
+            return t + _PENDING_RETRY_DELAY
+        case IncidentState.ASSIGNED if inc.assigned_at:
+            return inc.assigned_at + config.ESCALATION_DELAY
+        case _:
+            return None
 
 
 def _is_new_assignee_required(t: datetime, inc: Incident) -> bool:
@@ -108,8 +217,7 @@ def _assign(t: datetime, inc: Incident, assignee: str, comment: str) -> Incident
             comment=f"assignee '{assignee}' not found in contacts",
         )
 
-    _notify(contact, inc)
-
+    # The contact is paged only after the assignment is stored, see "_page".
     return replace(
         inc,
         state=IncidentState.ASSIGNED,
@@ -197,8 +305,7 @@ def _handle_webhook_response(
                     comment=f"notify: assignee '{inc.assignee}' not found in contacts",
                 )
 
-            _notify(contact, inc)
-
+            # The contact is paged only after the comment is stored, see "_page".
             return replace(inc, comment=f"notified assignee via webhook{by}")
 
         case _:
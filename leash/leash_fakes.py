@@ -0,0 +1,238 @@
+"""In-memory fakes of the services used by Leash.
+
+These stand in for Google Sheets, Twilio, Gmail, Slack and the AutoKitteh
+store in tests and in the load test (`bench_load.py`). Every fake counts the
+API calls made to it, and can add a fixed latency to each one to simulate
+network round-trips. They are thread-safe, to be used by concurrent sessions.
+"""
+
+import base64
+from collections import Counter
+import copy
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from gspread.exceptions import WorksheetNotFound
+
+
+class Api:
+    """API calls to a fake service, with simulated latency."""
+
+    def __init__(self, name: str, latency: float = 0) -> None:
+        """Initialize the API.
+
+        Args:
+            name: Prefix of the call names, e.g. "sheets".
+            latency: Seconds each call takes.
+        """
+        self.name = name
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def call(self, method: str) -> None:
+        """Count a call to a method, and wait for its latency."""
+        with self._lock:
+            self.calls[f"{self.name}.{method}"] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class Outbox:
+    """Messages sent through a fake notification channel."""
+
+    def __init__(self) -> None:
+        self.messages: list[tuple[float, str, str]] = []
+        """(time.monotonic(), recipient, text) for every sent message."""
+
+        self._lock = threading.Lock()
+
+    def add(self, recipient: str, text: str) -> str:
+        """Record a sent message, and return its ID."""
+        with self._lock:
+            self.messages.append((time.monotonic(), recipient, text))
+            return str(len(self.messages))
+
+
+class FakeWorksheet:
+    """In-memory stand-in for the parts of gspread.Worksheet used by Leash."""
+
+    def __init__(self, spreadsheet: "FakeSpreadsheet", name: str) -> None:
+        self._spreadsheet = spreadsheet
+        self._name = name
+        self.rows: list[list[str]] = []
+
+    def get_all_values(self) -> list[list[str]]:
+        self._spreadsheet.api.call("get_all_values")
+        with self._spreadsheet.lock:
+            return [list(row) for row in self.rows]
+
+    def update(self, values: list[list], range_name: str = "A1", **kwargs) -> None:
+        self._spreadsheet.api.call("update")
+        self._write(values, range_name)
+
+    def append_row(self, row: list, **kwargs) -> dict:
+        self._spreadsheet.api.call("append_row")
+        with self._spreadsheet.lock:
+            self._write([row], f"A{len(self.rows) + 1}")
+            n = len(self.rows)
+        return {"updates": {"updatedRange": f"{self._name}!A{n}:I{n}"}}
+
+    def batch_update(self, data: list[dict], **kwargs) -> None:
+        self._spreadsheet.api.call("batch_update")
+        for d in data:
+            self._write(d["values"], d["range"])
+
+    def _write(self, values: list[list], range_name: str) -> None:
+        start = int(re.sub(r"\D", "", range_name) or 1) - 1
+        with self._spreadsheet.lock:
+            self.rows.extend([] for _ in range(start + len(values) - len(self.rows)))
+            for i, row in enumerate(values):
+                self.rows[start + i] = ["" if v is None else str(v) for v in row]
+            self._spreadsheet.version += 1
+
+
+class FakeSpreadsheet:
+    """In-memory stand-in for the parts of gspread.Spreadsheet used by Leash."""
+
+    def __init__(self, api: Api | None = None) -> None:
+        self.api = api or Api("sheets")
+        self.lock = threading.RLock()
+        self.version = 0
+        self._worksheets: dict[str, FakeWorksheet] = {}
+
+    def worksheet(self, name: str) -> FakeWorksheet:
+        self.api.call("worksheet")
+        try:
+            return self._worksheets[name]
+        except KeyError:
+            raise WorksheetNotFound(name) from None
+
+    def add_worksheet(self, name: str, **kwargs) -> FakeWorksheet:
+        self.api.call("add_worksheet")
+        with self.lock:
+            if name in self._worksheets:
+                # Google Sheets doesn't allow duplicate names either.
+                raise ValueError(f"worksheet {name} already exists")
+
+            self._worksheets[name] = FakeWorksheet(self, name)
+            return self._worksheets[name]
+
+    def get_lastUpdateTime(self) -> str:  # noqa: N802 - gspread's name.
+        self.api.call("get_lastUpdateTime")
+        return str(self.version)
+
+
+class FakeTwilio:
+    """In-memory stand-in for the Twilio client's messages API."""
+
+    def __init__(self, api: Api | None = None) -> None:
+        self.api = api or Api("twilio")
+        self.outbox = Outbox()
+        self.messages = self
+
+    def create(self, from_: str, to: str, body: str) -> SimpleNamespace:
+        self.api.call("messages.create")
+        return SimpleNamespace(sid="SM" + self.outbox.add(to, body))
+
+
+class FakeGmail:
+    """In-memory stand-in for the Gmail API client's users resource."""
+
+    def __init__(self, api: Api | None = None, address: str = "leash@example.com"):
+        self.api = api or Api("gmail")
+        self.outbox = Outbox()
+        self._address = address
+
+    def users(self) -> SimpleNamespace:
+        return SimpleNamespace(
+            getProfile=self._get_profile,
+            messages=lambda: SimpleNamespace(send=self._send),
+        )
+
+    def _get_profile(self, userId: str) -> SimpleNamespace:  # noqa: N803
+        return self._request("getProfile", lambda: {"emailAddress": self._address})
+
+    def _send(self, userId: str, body: dict) -> SimpleNamespace:  # noqa: N803
+        def send() -> dict:
+            msg = base64.urlsafe_b64decode(body["raw"]).decode()
+            to = re.search(r"^To: (.*)$", msg, re.MULTILINE)
+            return {"id": self.outbox.add(to.group(1).strip() if to else "", msg)}
+
+        return self._request("messages.send", send)
+
+    def _request(self, method: str, f) -> SimpleNamespace:
+        def execute() -> dict:
+            self.api.call(method)
+            return f()
+
+        return SimpleNamespace(execute=execute)
+
+
+class FakeSlack:
+    """In-memory stand-in for the parts of the Slack WebClient used by Leash."""
+
+    def __init__(self, api: Api | None = None) -> None:
+        self.api = api or Api("slack")
+        self.outbox = Outbox()
+
+    def users_lookupByEmail(self, email: str) -> dict:  # noqa: N802 - Slack's name.
+        self.api.call("users_lookupByEmail")
+        return {"user": {"id": "U" + email}}
+
+    def chat_postMessage(self, channel: str, text: str) -> dict:  # noqa: N802
+        self.api.call("chat_postMessage")
+        return {"ts": self.outbox.add(channel, text)}
+
+
+class FakeAutoKittehStore:
+    """Atomic in-memory stand-in for the AutoKitteh store functions.
+
+    Unlike the local development store of the AutoKitteh SDK, compare-and-set
+    and add are atomic here, like in the real store.
+    """
+
+    def __init__(self, api: Api | None = None) -> None:
+        self.api = api or Api("ak_store")
+        self.values: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get_value(self, key: str) -> Any:
+        self.api.call("get_value")
+        with self._lock:
+            return copy.deepcopy(self.values.get(key))
+
+    def set_value(self, key: str, value: Any) -> None:
+        self.api.call("set_value")
+        with self._lock:
+            self._set(key, value)
+
+    def check_and_set_value(self, key: str, expected_value: Any, new_value: Any):
+        self.api.call("check_and_set_value")
+        with self._lock:
+            if self.values.get(key) != expected_value:
+                return False
+
+            self._set(key, new_value)
+            return True
+
+    def add_values(self, key: str, value: float) -> float:
+        self.api.call("add_values")
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+            return self.values[key]
+
+    def list_values_keys(self) -> list[str]:
+        self.api.call("list_values_keys")
+        with self._lock:
+            return list(self.values)
+
+    def _set(self, key: str, value: Any) -> None:
+        if value is None:
+            self.values.pop(key, None)
+        else:
+            self.values[key] = copy.deepcopy(value)
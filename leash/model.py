@@ -1,15 +1,18 @@
 """Data models for the Leash incident management system.
 
 This module defines the core data structures used throughout the system including
-Contact (person to notify), ScheduleRow (on-call rotation schedule), Incident
+Contact (person to notify), ScheduleRow (on-call rotation schedule), Schedule
+(schedule rows indexed by time), Incident
 (event being tracked), and IncidentState (lifecycle state). Models include
 serialization methods for Google Sheets storage.
 """
 
+import bisect
 from dataclasses import dataclass
 from datetime import datetime
 from enum import auto
 from enum import StrEnum
+import heapq
 from typing import ClassVar
 
 from utils import format_ts
@@ -103,6 +106,68 @@ class ScheduleRow:
         return self.start_time <= t <= self.end_time
 
 
+class Schedule:
+    """Schedule rows, indexed for looking up the row in effect at a time.
+
+    The start and end times of all rows split the timeline into points and
+    the open intervals between them, and the first matching row is the same
+    throughout each one of those. They are precomputed once, so a lookup is a
+    binary search over the boundaries.
+    """
+
+    def __init__(self, rows: list[ScheduleRow]) -> None:
+        """Index schedule rows.
+
+        Args:
+            rows: Schedule rows, in order of precedence.
+        """
+        self.rows = rows
+
+        starts = sorted(
+            (r.start_time, i) for i, r in enumerate(rows) if r.start_time <= r.end_time
+        )
+
+        self._bounds = sorted({r.start_time for r in rows} | {r.end_time for r in rows})
+
+        # _at_bound[k] is the first row matching _bounds[k], and _before[k] is
+        # the first row matching the open interval before it (the last entry
+        # is after all bounds).
+        self._at_bound: list[int | None] = []
+        self._before: list[int | None] = [None]
+
+        active: list[tuple[int, datetime]] = []  # Heap of (row index, end time).
+        j = 0
+
+        for b in self._bounds:
+            while j < len(starts) and starts[j][0] == b:
+                i = starts[j][1]
+                heapq.heappush(active, (i, rows[i].end_time))
+                j += 1
+
+            while active and active[0][1] < b:
+                heapq.heappop(active)
+            self._at_bound.append(active[0][0] if active else None)
+
+            while active and active[0][1] <= b:
+                heapq.heappop(active)
+            self._before.append(active[0][0] if active else None)
+
+    def __len__(self) -> int:
+        """Number of schedule rows."""
+        return len(self.rows)
+
+    def at(self, t: datetime) -> ScheduleRow | None:
+        """Return the first row that matches the given time, if any."""
+        k = bisect.bisect_left(self._bounds, t)
+
+        if k < len(self._bounds) and self._bounds[k] == t:
+            i = self._at_bound[k]
+        else:
+            i = self._before[k]
+
+        return None if i is None else self.rows[i]
+
+
 class IncidentState(StrEnum):
     """An incident state."""
 
@@ -3,10 +3,17 @@
 This module handles sending notifications to contacts through multiple channels
 including email (Gmail), SMS (Twilio), and Slack messages. It initializes
 connections to these services and provides a unified interface for notifying
-contacts about incidents.
+contacts about incidents, which sends through all the channels concurrently.
 """
 
 import base64
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+from functools import lru_cache
+from functools import partial
+import time
 
 from autokitteh.errors import ConnectionInitError
 from autokitteh.google import gmail_client
@@ -41,90 +48,137 @@ except ConnectionInitError:
     print("WARN: gmail connection not initialized.")
 
 
-def notify(contact: Contact, subject: str, message: str) -> None:
-    print(f"notifying {contact}: {subject}...")
+@dataclass(frozen=True, kw_only=True)
+class ChannelResult:
+    """The outcome of sending a notification through a single channel."""
 
-    any_sent = False
+    channel: str
+    """The channel name: "twilio", "gmail" or "slack"."""
 
-    if contact.phone:
-        any_sent |= _send_twilio_message(contact.phone, subject, message)
+    sent: bool
+    """Whether the message was sent."""
 
-    if contact.email:
-        any_sent |= _send_email(contact.email, subject, message)
+    detail: str
+    """The sent message's ID, or why it was not sent."""
 
-    if contact.email:
-        any_sent |= _send_slack_message(contact.email, subject, message)
+    seconds: float
+    """How long sending took, or until it timed out."""
 
-    if not any_sent:
-        print(f"WARN: no notification sent to {contact.name}.")
 
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="leash-notify")
 
-def _send_email(email: str, subject: str, message: str) -> bool:
-    if not gmail:
-        return False
 
-    print(f"sending email to {email}...")
+def notify(contact: Contact, subject: str, message: str) -> list[ChannelResult]:
+    """Notify a contact through all the available channels at once.
 
-    users = gmail.users()
-    profile = users.getProfile(userId="me").execute()
+    Each channel is given `config.NOTIFY_TIMEOUT` to send the message, so this
+    takes as long as the slowest channel, and no longer than the timeout.
 
-    msg = f"""From: {profile["emailAddress"]}
-To: {email}
-Subject: {subject}
+    Returns:
+        The results of the channels that apply to the contact.
+    """
+    print(f"notifying {contact}: {subject}...")
 
-{message}""".replace("\n", "\r\n")
+    sends: dict[str, Callable[[], str]] = {}
+
+    if contact.phone and twilio:
+        sends["twilio"] = partial(_send_twilio_message, contact.phone, subject, message)
+
+    if contact.email and gmail:
+        sends["gmail"] = partial(_send_email, contact.email, subject, message)
+
+    if contact.email and slack:
+        sends["slack"] = partial(_send_slack_message, contact.email, subject, message)
+
+    start = time.monotonic()
+    futures = {name: _executor.submit(_timed, send) for name, send in sends.items()}
+
+    results = []
+    for name, future in futures.items():
+        timeout = config.NOTIFY_TIMEOUT.total_seconds() - (time.monotonic() - start)
+        try:
+            results.append(
+                ChannelResult(channel=name, **future.result(max(timeout, 0)))
+            )
+        except TimeoutError:
+            results.append(
+                ChannelResult(
+                    channel=name,
+                    sent=False,
+                    detail="timed out",
+                    seconds=time.monotonic() - start,
+                )
+            )
+
+    for r in results:
+        status = "sent" if r.sent else "ERROR:"
+        print(f"{r.channel}: {status} {r.detail} ({r.seconds:.2f}s)")
+
+    if not any(r.sent for r in results):
+        print(f"WARN: no notification sent to {contact.name}.")
+
+    return results
 
-    msg = base64.urlsafe_b64encode(msg.encode()).decode()
+
+def _timed(send: Callable[[], str]) -> dict:
+    """Call a channel's send function, and return its ChannelResult fields."""
+    start = time.monotonic()
 
     try:
-        msg = users.messages().send(userId="me", body={"raw": msg}).execute()
-        print(f"sent message {msg['id']}.")
-        return True
+        detail, sent = send(), True
     except HttpError as e:
-        print(f"ERROR: `{e.reason}`")
-        return False
+        detail, sent = f"`{e.reason}`", False
+    except TwilioRestException as e:
+        detail, sent = f"`{e}`", False
+    except SlackApiError as e:
+        detail, sent = f"`{e.response['error']}`", False
+    except Exception as e:  # noqa: BLE001 - reported as the channel's result.
+        detail, sent = f"`{e!r}`", False
 
+    return {"sent": sent, "detail": detail, "seconds": time.monotonic() - start}
 
-def _send_twilio_message(phone: str, subject: str, message: str) -> bool:
-    if not twilio:
-        return False
 
-    print(f"sending text to {phone}...")
+@cache
+def _gmail_sender() -> str:
+    """Return the Gmail connection's email address, which doesn't change."""
+    return gmail.users().getProfile(userId="me").execute()["emailAddress"]
 
-    try:
-        msg = twilio.messages.create(
-            from_=config.TWILIO_PHONE_NUMBER,
-            to=phone,
-            body=f"{subject}\n\n{message}",
-        )
 
-        print(f"sent message {msg.sid}.")
+@lru_cache(maxsize=1024)
+def _slack_user_id(email: str) -> str:
+    """Return the ID of the Slack user with the given email address.
 
-        return True
-    except TwilioRestException as e:
-        print(f"ERROR: `{e}`")
-        return False
+    Successful lookups are cached, failed ones are retried next time.
+    """
+    return slack.users_lookupByEmail(email=email)["user"]["id"]
 
 
-def _send_slack_message(email: str, subject: str, message: str) -> bool:
-    if not slack:
-        return False
+def _send_email(email: str, subject: str, message: str) -> str:
+    msg = f"""From: {_gmail_sender()}
+To: {email}
+Subject: {subject}
 
-    print(f"sending slack message to {email}...")
+{message}""".replace("\n", "\r\n")
 
-    try:
-        user_id = slack.users_lookupByEmail(email=email)["user"]["id"]
-    except SlackApiError as e:
-        print(f"error: {e}")
-        return False
+    msg = base64.urlsafe_b64encode(msg.encode()).decode()
 
-    try:
-        msg = slack.chat_postMessage(
-            channel=user_id,
-            text=f"*{subject}*\n\n{message}",
-        )
-        print(f"sent message {msg['ts']}.")
-        return True
-    except SlackApiError as e:
-        print(f"ERROR: `{e.response['error']}`")
-        return False
+    return gmail.users().messages().send(userId="me", body={"raw": msg}).execute()["id"]
+
+
+def _send_twilio_message(phone: str, subject: str, message: str) -> str:
+    msg = twilio.messages.create(
+        from_=config.TWILIO_PHONE_NUMBER,
+        to=phone,
+        body=f"{subject}\n\n{message}",
+    )
+
+    return msg.sid
+
+
+def _send_slack_message(email: str, subject: str, message: str) -> str:
+    msg = slack.chat_postMessage(
+        channel=_slack_user_id(email),
+        text=f"*{subject}*\n\n{message}",
+    )
+
+    return msg["ts"]
@@ -1,111 +1,106 @@
-"""Google Sheets storage backend for Leash data.
+"""Storage for Leash data.
 
-This module provides data persistence using Google Sheets as the storage layer.
-It manages worksheets for incidents, schedules, contacts, and internal state,
-providing CRUD operations for incidents and queries for schedules and contacts.
+This module is the interface the rest of Leash uses to persist incidents and
+to query the on-call schedule and contacts. The data itself is kept by one of
+these backends, selected with the `STORE_BACKEND` project variable:
+
+- `gsheets` (default): A Google Spreadsheet, see `store_gsheets`.
+- `sqlite`: A local SQLite database, see `store_sqlite`.
+
+The backend is opened on first use.
 """
 
 from datetime import datetime
+from functools import cache
 from os import getenv
+from typing import Protocol
 
 from autokitteh.google import gspread_client
-from gspread.exceptions import WorksheetNotFound
-from gspread.utils import ValueInputOption
-from gspread.worksheet import Worksheet
+import incident_ids
 from model import Contact
 from model import Incident
 from model import ScheduleRow
+from store_gsheets import SheetsStore
+from store_sqlite import SQLiteStore
 
-
-_GOOGLE_SPREADSHEET_ID = getenv("GOOGLE_SPREADSHEET_ID")
-if not _GOOGLE_SPREADSHEET_ID:
-    raise RuntimeError("GOOGLE_SPREADSHEET_ID not set")
-
-_client = gspread_client("gsheets").open_by_key(_GOOGLE_SPREADSHEET_ID)
+import config
 
 
-#
-# Utils
-#
+class Store(Protocol):
+    """Storage backend interface."""
 
+    def highest_incident_id(self) -> int:
+        """Return the highest ID of a stored incident, or 0 if there are none."""
+        ...
 
-def get(name: str) -> Worksheet | None:
-    """Get a worksheet by name."""
-    try:
-        return _client.worksheet(name)
-    except WorksheetNotFound:
-        return None
-
-
-def _get_or_create(name: str, init=None) -> Worksheet:
-    """Ensure a worksheet exists, creating it if needed.
-
-    If `init` is given, it is used to initialize the sheet.
-    """
-    try:
-        return _client.worksheet(name)
-    except WorksheetNotFound:
-        pass
+    def add_incident(self, inc: Incident) -> None:
+        """Store a new incident."""
+        ...
 
-    w = _client.add_worksheet(name, rows=100, cols=20)
+    def get_incident_by_unique_id(self, unique_id: str) -> Incident | None:
+        """Get an incident by its unique ID, reflecting all prior updates."""
+        ...
 
-    if init:
-        w.update(init, raw=False)
+    def update_incident(self, inc: Incident) -> None:
+        """Update an existing incident, raising ValueError if not found."""
+        ...
 
-    return w
+    def flush_incident_updates(self) -> int:
+        """Write deferred incident updates, returning how many were written."""
+        ...
 
+    def get_schedule_row(self, t: datetime) -> ScheduleRow | None:
+        """Get the first schedule row that matches a specific time."""
+        ...
 
-#
-# Sheets
-#
+    def get_contact_by_name(self, name: str) -> Contact | None:
+        """Get a contact by name."""
+        ...
 
+    def get_contact_by_email(self, email: str) -> Contact | None:
+        """Get a contact by email."""
+        ...
 
-_incidents = _get_or_create("incidents", [Incident.labels])
-_schedule = _get_or_create("schedule", [ScheduleRow.labels])
 
-_scratchpad = _get_or_create(
-    "_scratchpad",
-    [
-        ["next_incident_id", "=MAX(incidents!A:A) + 1"],
-    ],
-)
+@cache
+def backend() -> Store:
+    """Return the configured storage backend."""
+    match config.STORE_BACKEND:
+        case "gsheets":
+            spreadsheet_id = getenv("GOOGLE_SPREADSHEET_ID")
+            if not spreadsheet_id:
+                raise RuntimeError("GOOGLE_SPREADSHEET_ID not set")
 
-_contacts = get("contacts")
+            return SheetsStore(gspread_client("gsheets").open_by_key(spreadsheet_id))
 
+        case "sqlite":
+            return SQLiteStore(config.SQLITE_DB_PATH)
 
-#
-# Operations
-#
+        case _:
+            raise RuntimeError(f"unknown STORE_BACKEND: {config.STORE_BACKEND}")
 
 
 def next_incident_id() -> str:
-    return str(_scratchpad.acell("B1").value or 1)
+    """Return the ID to use for a new incident, see `incident_ids`."""
+    return str(incident_ids.allocate(lambda: backend().highest_incident_id()))
 
 
 def add_incident(inc: Incident) -> None:
-    _incidents.append_row(inc.row, value_input_option=ValueInputOption.user_entered)
+    backend().add_incident(inc)
 
 
 def get_incident_by_unique_id(unique_id: str) -> Incident | None:
-    cell = _incidents.find(unique_id, in_column=9)
-    if not cell:
-        return None
-
-    return Incident.from_row(_incidents.row_values(cell.row))
+    return backend().get_incident_by_unique_id(unique_id)
 
 
 def update_incident(inc: Incident) -> None:
     print(f"update: {inc}")
 
-    cell = _incidents.find(str(inc.id), in_column=1)
-    if not cell:
-        raise ValueError(f"Incident with id {inc.id} not found")
+    backend().update_incident(inc)
+
 
-    _incidents.update(
-        [inc.row],
-        f"A{cell.row}",
-        value_input_option=ValueInputOption.user_entered,
-    )
+def flush_incident_updates() -> int:
+    return backend().flush_incident_updates()
 
 
 def get_schedule_row(t: datetime) -> ScheduleRow | None:
@@ -114,39 +109,14 @@ def get_schedule_row(t: datetime) -> ScheduleRow | None:
     If no schedule is found, returns None.
     If more than one schedule matches, returns the first one.
     """
-    rows = _schedule.get_all_values()
-    for i, row in enumerate(rows[1:]):
-        try:
-            sched = ScheduleRow.from_row(row)
-        except ValueError as exc:
-            print(f"ERROR: Invalid schedule row {i + 1}: {row} -> {exc}")
-            continue
-
-        if sched.match(t):
-            return sched
-
-    return None
+    return backend().get_schedule_row(t)
 
 
 def get_contact_by_name(name: str) -> Contact | None:
     """Get a contact by name."""
-    if not _contacts:
-        return None
-
-    cell = _contacts.find(name, in_column=1)
-    if not cell:
-        return None
-
-    return Contact.from_row(_contacts.row_values(cell.row))
+    return backend().get_contact_by_name(name)
 
 
 def get_contact_by_email(email: str) -> Contact | None:
     """Get a contact by email."""
-    if not _contacts:
-        return None
-
-    cell = _contacts.find(email, in_column=2)
-    if not cell:
-        return None
-
-    return Contact.from_row(_contacts.row_values(cell.row))
+    return backend().get_contact_by_email(email)
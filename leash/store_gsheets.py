@@ -0,0 +1,369 @@
+"""Google Sheets storage backend for Leash data.
+
+This module provides data persistence using Google Sheets as the storage layer.
+It manages worksheets for incidents, schedules, and contacts, providing CRUD
+operations for incidents and queries for schedules and contacts.
+
+Reads are served from local snapshots of the worksheets, indexed by the
+columns used for lookups. A snapshot is refreshed when it is older than
+`config.STORE_SNAPSHOT_TTL` and the spreadsheet has changed since it was
+fetched. Writes go to the worksheet and are applied to the snapshot as well.
+
+Incident updates are queued in the AutoKitteh store, merged per incident, and
+written to the sheet in a single batch by `flush_incident_updates`, which runs
+on a schedule. Reads of incidents include their pending updates.
+"""
+
+from collections.abc import Callable
+from datetime import datetime
+import time
+
+from autokitteh import check_and_set_value, get_value, list_values_keys, set_value
+from gspread.exceptions import APIError
+from gspread.exceptions import WorksheetNotFound
+from gspread.spreadsheet import Spreadsheet
+from gspread.utils import a1_range_to_grid_range
+from gspread.utils import ValueInputOption
+from gspread.worksheet import Worksheet
+from model import Contact
+from model import Incident
+from model import Schedule
+from model import ScheduleRow
+
+import config
+
+
+_PENDING_UPDATE_KEY_PREFIX = "leash_pending_incident_update:"
+
+
+def _cells(row: list) -> list[str]:
+    """Return a row as it would be read back from the sheet."""
+    return ["" if v is None else str(v) for v in row]
+
+
+class _Snapshot:
+    """Local copy of a worksheet, indexed by the values of some columns.
+
+    Row numbers are 1-based, like in the sheet. The first row is the header.
+    """
+
+    def __init__(
+        self,
+        worksheet: Worksheet | None,
+        keys: dict[str, int],
+        version: Callable[[], str | None],
+    ) -> None:
+        self.worksheet = worksheet
+        self._keys = keys
+        self._get_version = version
+        self._rows: dict[int, list[str]] = {}
+        self._indexes: dict[str, dict[str, int]] = {k: {} for k in keys}
+        self._version: str | None = None
+        self._fetched_at: float | None = None
+
+    def invalidate(self) -> None:
+        """Make the next read fetch the worksheet again."""
+        self._fetched_at = None
+
+    def refresh(self) -> None:
+        """Fetch the entire worksheet."""
+        if not self.worksheet:
+            return
+
+        self._version = self._get_version()
+        self._fetched_at = time.monotonic()
+
+        rows = self.worksheet.get_all_values()
+
+        self._rows = {}
+        self._indexes = {k: {} for k in self._keys}
+        for i, row in enumerate(rows[1:], start=2):
+            self._put(i, row)
+
+    def rows(self) -> list[list[str]]:
+        """Return all rows except the header, in sheet order."""
+        self._ensure_fresh()
+        return [self._rows[i] for i in sorted(self._rows)]
+
+    def get(self, key: str, value: str) -> list[str] | None:
+        """Return the first row whose `key` column equals `value`.
+
+        Missing rows may have been added by another session since the
+        snapshot was fetched, so a miss refetches the snapshot if the
+        spreadsheet has changed.
+        """
+        fetched = self._ensure_fresh()
+
+        i = self._indexes[key].get(value)
+        if i is None and not fetched and self._changed():
+            self.refresh()
+            i = self._indexes[key].get(value)
+
+        return None if i is None else self._rows[i]
+
+    def append(self, row: list) -> None:
+        """Append a row to the worksheet and the snapshot."""
+        if not self.worksheet:
+            raise ValueError("worksheet does not exist")
+
+        resp = self.worksheet.append_row(
+            row, value_input_option=ValueInputOption.user_entered
+        )
+
+        # Use the row number reported by Sheets, since other sessions may
+        # have appended rows since the snapshot was fetched.
+        i = _appended_row(resp)
+        if i is None or self._fetched_at is None:
+            self.invalidate()
+        else:
+            self._put(i, _cells(row))
+
+    def update(self, key: str, rows: list[list]) -> list[list]:
+        """Overwrite rows in a single batch, matching them by a key column.
+
+        Each row overwrites the first row whose `key` column equals its own.
+
+        Returns:
+            The rows that did not match any row, and were not written.
+        """
+        col = self._keys[key]
+
+        found, missing = [], []
+        for row in rows:
+            v = _col(_cells(row), col)
+            if self.get(key, v) is None:
+                missing.append(row)
+            else:
+                found.append((self._indexes[key][v], row))
+
+        if found:
+            self.worksheet.batch_update(
+                [{"range": f"A{i}", "values": [row]} for i, row in found],
+                value_input_option=ValueInputOption.user_entered,
+            )
+
+        for i, row in found:
+            self._put(i, _cells(row))
+
+        return missing
+
+    def _ensure_fresh(self) -> bool:
+        """Refresh the snapshot if needed, return True if it was fetched."""
+        if self._fetched_at is not None:
+            age = time.monotonic() - self._fetched_at
+            if age < config.STORE_SNAPSHOT_TTL.total_seconds():
+                return False
+
+            if not self._changed():
+                self._fetched_at = time.monotonic()
+                return False
+
+        self.refresh()
+        return True
+
+    def _changed(self) -> bool:
+        """Check whether the spreadsheet changed since the snapshot was fetched."""
+        if self._fetched_at is None:
+            return True
+
+        v = self._get_version()
+        return v is None or v != self._version
+
+    def _put(self, i: int, row: list[str]) -> None:
+        if old := self._rows.get(i):
+            for k, col in self._keys.items():
+                if self._indexes[k].get(_col(old, col)) == i:
+                    del self._indexes[k][_col(old, col)]
+
+        self._rows[i] = row
+
+        for k, col in self._keys.items():
+            if v := _col(row, col):
+                idx = self._indexes[k]
+                # Like Worksheet.find, the first matching row wins.
+                if v not in idx or idx[v] > i:
+                    idx[v] = i
+
+
+def _col(row: list[str], i: int) -> str:
+    return row[i] if i < len(row) else ""
+
+
+def _appended_row(resp) -> int | None:
+    """Return the row number of a row appended by Worksheet.append_row."""
+    try:
+        a1 = resp["updates"]["updatedRange"].split("!")[-1]
+        return a1_range_to_grid_range(a1)["startRowIndex"] + 1
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return None
+
+
+class SheetsStore:
+    """Storage backend using the worksheets of a Google Spreadsheet."""
+
+    def __init__(self, client: Spreadsheet) -> None:
+        """Open the worksheets, creating the missing ones.
+
+        The contacts worksheet is managed by the user and is not created.
+        """
+        self._client = client
+
+        self._incidents = _Snapshot(
+            self._get_or_create("incidents", [Incident.labels]),
+            keys={"id": 0, "unique_id": 8},
+            version=self._version,
+        )
+
+        self._schedule = _Snapshot(
+            self._get_or_create("schedule", [ScheduleRow.labels]),
+            keys={},
+            version=self._version,
+        )
+
+        self._contacts = _Snapshot(
+            self.get("contacts"),
+            keys={"name": 0, "email": 1},
+            version=self._version,
+        )
+
+        self._schedule_index = Schedule([])
+        self._schedule_index_rows: list[list[str]] = []
+
+    #
+    # Utils
+    #
+
+    def get(self, name: str) -> Worksheet | None:
+        """Get a worksheet by name."""
+        try:
+            return self._client.worksheet(name)
+        except WorksheetNotFound:
+            return None
+
+    def _get_or_create(self, name: str, init=None) -> Worksheet:
+        """Ensure a worksheet exists, creating it if needed.
+
+        If `init` is given, it is used to initialize the sheet.
+        """
+        try:
+            return self._client.worksheet(name)
+        except WorksheetNotFound:
+            pass
+
+        w = self._client.add_worksheet(name, rows=100, cols=20)
+
+        if init:
+            w.update(init, raw=False)
+
+        return w
+
+    def _version(self) -> str | None:
+        """Return the spreadsheet's last modification time, if available."""
+        try:
+            return self._client.get_lastUpdateTime()
+        except APIError as e:
+            print(f"WARN: cannot get spreadsheet version: {e}")
+            return None
+
+    #
+    # Operations
+    #
+
+    def highest_incident_id(self) -> int:
+        return max(
+            (int(row[0]) for row in self._incidents.rows() if row[0].isdigit()),
+            default=0,
+        )
+
+    def add_incident(self, inc: Incident) -> None:
+        self._incidents.append(inc.row)
+
+    def get_incident_by_unique_id(self, unique_id: str) -> Incident | None:
+        """Get an incident by its unique ID, including pending updates."""
+        row = self._incidents.get("unique_id", unique_id)
+        if not row:
+            return None
+
+        return Incident.from_row(get_value(_pending_update_key(row[0])) or row)
+
+    def update_incident(self, inc: Incident) -> None:
+        """Queue an incident update, to be written by `flush_incident_updates`.
+
+        Updates are kept in the AutoKitteh store, so they are visible to all
+        sessions immediately and survive failed flushes. Later updates to the
+        same incident replace earlier ones.
+        """
+        if not self._incidents.get("id", str(inc.id)):
+            raise ValueError(f"Incident with id {inc.id} not found")
+
+        set_value(_pending_update_key(inc.id), inc.row)
+
+    def flush_incident_updates(self) -> int:
+        """Write all pending incident updates to the sheet in a single batch.
+
+        If the write fails, the updates remain pending for the next flush.
+
+        Returns:
+            The number of incidents updated.
+        """
+        keys = [
+            k for k in list_values_keys() if k.startswith(_PENDING_UPDATE_KEY_PREFIX)
+        ]
+
+        pending = {k: row for k in keys if (row := get_value(k))}
+        if not pending:
+            return 0
+
+        for row in self._incidents.update("id", list(pending.values())):
+            print(f"WARN: dropping update of unknown incident {row[0]}")
+
+        # Keep updates that were queued while flushing, for the next flush.
+        for k, row in pending.items():
+            check_and_set_value(k, row, None)
+
+        return len(pending)
+
+    def _get_schedule(self) -> Schedule:
+        """Return the schedule index, rebuilding it if the sheet changed."""
+        rows = self._schedule.rows()
+        if rows == self._schedule_index_rows:
+            return self._schedule_index
+
+        scheds = []
+        for i, row in enumerate(rows):
+            try:
+                scheds.append(ScheduleRow.from_row(row))
+            except ValueError as exc:
+                print(f"ERROR: Invalid schedule row {i + 1}: {row} -> {exc}")
+
+        self._schedule_index, self._schedule_index_rows = Schedule(scheds), rows
+
+        return self._schedule_index
+
+    def get_schedule_row(self, t: datetime) -> ScheduleRow | None:
+        """Get the schedule row for a specific time.
+
+        If no schedule is found, returns None.
+        If more than one schedule matches, returns the first one.
+        """
+        return self._get_schedule().at(t)
+
+    def get_contact_by_name(self, name: str) -> Contact | None:
+        """Get a contact by name."""
+        row = self._contacts.get("name", name)
+        if not row:
+            return None
+
+        return Contact.from_row(row)
+
+    def get_contact_by_email(self, email: str) -> Contact | None:
+        """Get a contact by email."""
+        row = self._contacts.get("email", email)
+        if not row:
+            return None
+
+        return Contact.from_row(row)
+
+
+def _pending_update_key(incident_id: str) -> str:
+    return f"{_PENDING_UPDATE_KEY_PREFIX}{incident_id}"
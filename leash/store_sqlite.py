@@ -0,0 +1,229 @@
+"""SQLite storage backend for Leash data.
+
+This module keeps incidents, the on-call schedule and contacts in a local
+SQLite database, for deployments with an incident volume that makes Google
+Sheets too slow or runs into its API quotas. Writes are applied immediately,
+so there is nothing to flush.
+
+The schedule and contacts tables are managed by the user, e.g. with the
+`sqlite3` command line tool, or with `add_schedule_row` and `add_contact`.
+"""
+
+from datetime import datetime
+import json
+import sqlite3
+
+from model import Contact
+from model import Incident
+from model import IncidentState
+from model import ScheduleRow
+
+import config
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    state TEXT NOT NULL,
+    assignee TEXT,
+    assigned_at TEXT,
+    comment TEXT,
+    details TEXT NOT NULL,
+    unique_id TEXT NOT NULL UNIQUE
+);
+
+-- Rows are in order of precedence, times are Unix timestamps, and assignees
+-- are a JSON list.
+CREATE TABLE IF NOT EXISTS schedule (
+    id INTEGER PRIMARY KEY,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    assignees TEXT NOT NULL
+);
+
+-- Leading with the end time, lookups skip past rotations, which are most of
+-- the rows once a team has some history.
+CREATE INDEX IF NOT EXISTS schedule_end_start ON schedule (end_time, start_time);
+
+CREATE TABLE IF NOT EXISTS contacts (
+    name TEXT NOT NULL,
+    email TEXT,
+    phone TEXT
+);
+
+CREATE INDEX IF NOT EXISTS contacts_name ON contacts (name);
+
+CREATE INDEX IF NOT EXISTS contacts_email ON contacts (email);
+"""
+
+_INCIDENT_COLUMNS = (
+    "id, started_at, state, assignee, assigned_at, comment, details, unique_id"
+)
+
+
+def _ts(t: datetime | None) -> str | None:
+    return t.isoformat() if t else None
+
+
+def _parse_ts(s: str | None) -> datetime | None:
+    return datetime.fromisoformat(s) if s else None
+
+
+class SQLiteStore:
+    """Storage backend using a SQLite database."""
+
+    def __init__(self, path: str) -> None:
+        """Open the database, creating the tables if needed.
+
+        Args:
+            path: Path of the database file, or ":memory:".
+        """
+        self._db = sqlite3.connect(path)
+
+        # Allow sessions to read while another one writes.
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def highest_incident_id(self) -> int:
+        (n,) = self._db.execute("SELECT COALESCE(MAX(id), 0) FROM incidents").fetchone()
+        return n
+
+    def add_incident(self, inc: Incident) -> None:
+        with self._db:
+            self._db.execute(
+                f"INSERT INTO incidents ({_INCIDENT_COLUMNS}) "  # noqa: S608
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    int(inc.id),
+                    _ts(inc.started_at),
+                    inc.state,
+                    inc.assignee,
+                    _ts(inc.assigned_at),
+                    inc.comment,
+                    inc.details,
+                    inc.unique_id,
+                ),
+            )
+
+    def get_incident_by_unique_id(self, unique_id: str) -> Incident | None:
+        row = self._db.execute(
+            f"SELECT {_INCIDENT_COLUMNS} FROM incidents WHERE unique_id = ?",  # noqa: S608
+            (unique_id,),
+        ).fetchone()
+        if not row:
+            return None
+
+        id_, started_at, state, assignee, assigned_at, comment, details, uid = row
+
+        return Incident(
+            id=str(id_),
+            started_at=_parse_ts(started_at),
+            state=IncidentState(state),
+            assignee=assignee,
+            assigned_at=_parse_ts(assigned_at),
+            comment=comment,
+            details=details,
+            unique_id=uid,
+        )
+
+    def update_incident(self, inc: Incident) -> None:
+        with self._db:
+            cur = self._db.execute(
+                """
+                UPDATE incidents
+                SET started_at = ?, state = ?, assignee = ?, assigned_at = ?,
+                    comment = ?, details = ?, unique_id = ?
+                WHERE id = ?
+                """,
+                (
+                    _ts(inc.started_at),
+                    inc.state,
+                    inc.assignee,
+                    _ts(inc.assigned_at),
+                    inc.comment,
+                    inc.details,
+                    inc.unique_id,
+                    int(inc.id),
+                ),
+            )
+
+        if not cur.rowcount:
+            raise ValueError(f"Incident with id {inc.id} not found")
+
+    def flush_incident_updates(self) -> int:
+        """Nothing to do, updates are written immediately."""
+        return 0
+
+    def get_schedule_row(self, t: datetime) -> ScheduleRow | None:
+        """Get the schedule row for a specific time.
+
+        If no schedule is found, returns None.
+        If more than one schedule matches, returns the first one.
+        """
+        ts = t.timestamp()
+
+        row = self._db.execute(
+            """
+            SELECT start_time, end_time, assignees FROM schedule
+            WHERE end_time >= ? AND start_time <= ?
+            ORDER BY id LIMIT 1
+            """,
+            (ts, ts),
+        ).fetchone()
+        if not row:
+            return None
+
+        start_time, end_time, assignees = row
+
+        return ScheduleRow(
+            start_time=datetime.fromtimestamp(start_time, tz=config.TZ),
+            end_time=datetime.fromtimestamp(end_time, tz=config.TZ),
+            assignees=json.loads(assignees),
+        )
+
+    def add_schedule_row(self, sched: ScheduleRow) -> None:
+        """Add a schedule row, after all existing ones."""
+        with self._db:
+            self._db.execute(
+                """
+                INSERT INTO schedule (start_time, end_time, assignees)
+                VALUES (?, ?, ?)
+                """,
+                (
+                    sched.start_time.timestamp(),
+                    sched.end_time.timestamp(),
+                    json.dumps(sched.assignees),
+                ),
+            )
+
+    def get_contact_by_name(self, name: str) -> Contact | None:
+        """Get a contact by name."""
+        return self._get_contact("name", name)
+
+    def get_contact_by_email(self, email: str) -> Contact | None:
+        """Get a contact by email."""
+        return self._get_contact("email", email)
+
+    def add_contact(self, contact: Contact) -> None:
+        """Add a contact."""
+        with self._db:
+            self._db.execute(
+                "INSERT INTO contacts (name, email, phone) VALUES (?, ?, ?)",
+                (contact.name, contact.email, contact.phone),
+            )
+
+    def _get_contact(self, column: str, value: str) -> Contact | None:
+        row = self._db.execute(
+            f"SELECT name, email, phone FROM contacts WHERE {column} = ? "  # noqa: S608
+            "ORDER BY rowid LIMIT 1",
+            (value,),
+        ).fetchone()
+        if not row:
+            return None
+
+        name, email, phone = row
+
+        return Contact(name=name, email=email, phone=phone)
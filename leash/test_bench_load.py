@@ -0,0 +1,24 @@
+"""Tests for the load test harness."""
+
+import bench_load
+import pytest
+
+
+def test_run():
+    """Test that every incident goes through the whole workflow."""
+    report = bench_load.run(count=10, concurrency=4, latency_ms=0)
+
+    assert report.incidents == 10
+    assert report.unpaged == 0
+    assert report.unresolved == 0
+    assert report.escalated == 5
+
+    # Every incident pages its assignee through all 3 channels, and the
+    # escalated ones page the next assignee too.
+    assert report.messages == (10 + 5) * 3
+
+    assert report.calls_per_incident["sheets.append_row"] == 1
+    assert report.calls_per_incident["ak_store.add_values"] == 1
+    assert report.api_calls_per_incident == pytest.approx(
+        sum(report.calls_per_incident.values())
+    )
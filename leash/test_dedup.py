@@ -0,0 +1,149 @@
+"""Tests for incident deduplication."""
+
+from dataclasses import replace
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from unittest.mock import patch
+
+from autokitteh.store import _local_dev_store
+
+import pytest
+
+
+# Mock autokitteh dependencies before importing dedup
+with patch("autokitteh.get_webhook_url", return_value="http://test.webhook.url"):
+    import dedup
+
+from model import Incident
+from model import IncidentState
+
+
+T0 = datetime(2024, 1, 15, 10, 0, 0, tzinfo=UTC)
+
+
+@pytest.fixture(autouse=True)
+def ak_store():
+    """Use an empty local AutoKitteh store in every test."""
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
+@pytest.fixture
+def incident():
+    """Return an active incident, as returned by the store."""
+    inc = Incident(
+        id="42",
+        details="Server is down",
+        state=IncidentState.ASSIGNED,
+        started_at=T0,
+        unique_id="test_unique_id",
+    )
+
+    with patch("dedup.store.get_incident_by_unique_id", return_value=inc):
+        yield inc
+
+
+class TestFingerprint:
+    """Tests for fingerprint."""
+
+    def test_normalizes_case_and_whitespace(self):
+        """Test that formatting differences don't change the fingerprint."""
+        assert dedup.fingerprint("Server is down") == dedup.fingerprint(
+            "  server  IS\tdown\n"
+        )
+
+    def test_different_details(self):
+        """Test that different details have different fingerprints."""
+        assert dedup.fingerprint("Server is down") != dedup.fingerprint("Server is up")
+
+    def test_key_pattern_group(self, monkeypatch):
+        """Test that only the first group of the key pattern is hashed."""
+        monkeypatch.setattr(dedup.config, "DEDUP_KEY_PATTERN", r"alert=(\S+)")
+
+        assert dedup.fingerprint("alert=db-down at 10:00") == dedup.fingerprint(
+            "alert=DB-DOWN at 10:05"
+        )
+        assert dedup.fingerprint("alert=db-down") != dedup.fingerprint("alert=db-slow")
+
+    def test_key_pattern_without_group(self, monkeypatch):
+        """Test that the whole match is hashed if the pattern has no groups."""
+        monkeypatch.setattr(dedup.config, "DEDUP_KEY_PATTERN", r"host-\d+")
+
+        assert dedup.fingerprint("host-1 down, 3 errors") == dedup.fingerprint(
+            "host-1 down, 7 errors"
+        )
+
+    def test_key_pattern_no_match(self, monkeypatch):
+        """Test that the whole details are hashed if the pattern doesn't match."""
+        monkeypatch.setattr(dedup.config, "DEDUP_KEY_PATTERN", r"alert=(\S+)")
+
+        assert dedup.fingerprint("Server is down") == dedup.fingerprint(
+            "server is down"
+        )
+        assert dedup.fingerprint("Server is down") != dedup.fingerprint("Server is up")
+
+
+class TestAttach:
+    """Tests for register and attach."""
+
+    def test_not_registered(self, incident):
+        """Test that a first report isn't a duplicate."""
+        assert dedup.attach("Server is down", T0) is None
+
+    def test_duplicate(self, incident):
+        """Test that reports are counted against the registered incident."""
+        dedup.register(incident.details, incident)
+
+        assert dedup.duplicates(incident) == 0
+
+        assert dedup.attach("server is DOWN", T0) == incident
+        assert dedup.attach("Server is down", T0 + timedelta(minutes=1)) == incident
+
+        assert dedup.duplicates(incident) == 2
+
+    def test_different_details(self, incident):
+        """Test that reports with a different fingerprint aren't attached."""
+        dedup.register(incident.details, incident)
+
+        assert dedup.attach("Server is up", T0) is None
+
+    def test_window_since_last_report(self, incident, monkeypatch):
+        """Test that the window restarts with every duplicate report."""
+        monkeypatch.setattr(dedup.config, "DEDUP_WINDOW", timedelta(minutes=10))
+        dedup.register(incident.details, incident)
+
+        assert dedup.attach(incident.details, T0 + timedelta(minutes=10)) == incident
+        assert dedup.attach(incident.details, T0 + timedelta(minutes=20)) == incident
+        assert dedup.attach(incident.details, T0 + timedelta(minutes=31)) is None
+
+        assert dedup.duplicates(incident) == 2
+
+    def test_inactive_incident(self, incident):
+        """Test that reports aren't attached to resolved incidents."""
+        dedup.register(incident.details, incident)
+
+        with patch(
+            "dedup.store.get_incident_by_unique_id",
+            return_value=replace(incident, state=IncidentState.RESOLVED),
+        ):
+            assert dedup.attach(incident.details, T0) is None
+
+        assert dedup.duplicates(incident) == 0
+
+    def test_missing_incident(self, incident):
+        """Test that reports aren't attached to incidents that don't exist."""
+        dedup.register(incident.details, incident)
+
+        with patch("dedup.store.get_incident_by_unique_id", return_value=None):
+            assert dedup.attach(incident.details, T0) is None
+
+    def test_disabled(self, incident, monkeypatch):
+        """Test that a zero window disables deduplication."""
+        monkeypatch.setattr(dedup.config, "DEDUP_WINDOW", timedelta(0))
+
+        dedup.register(incident.details, incident)
+
+        assert dedup.attach(incident.details, T0) is None
+        assert not _local_dev_store
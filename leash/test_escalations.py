@@ -0,0 +1,98 @@
+"""Tests for the escalation timers."""
+
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from unittest.mock import patch
+
+from autokitteh.store import _local_dev_store
+
+import escalations
+import pytest
+
+
+T0 = datetime(2024, 1, 15, 10, 0, 0, tzinfo=UTC)
+LATER = T0 + timedelta(days=1)
+
+
+@pytest.fixture(autouse=True)
+def ak_store():
+    """Use an empty local AutoKitteh store in every test."""
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
+def test_claim_due_in_deadline_order():
+    """Test that only due incidents are returned, earliest first."""
+    escalations.schedule("b", T0 + timedelta(minutes=2))
+    escalations.schedule("c", T0 + timedelta(minutes=10))
+    escalations.schedule("a", T0 + timedelta(minutes=1))
+
+    assert escalations.claim_due(T0, LATER) == []
+    assert escalations.claim_due(T0 + timedelta(minutes=5), LATER) == ["a", "b"]
+    assert escalations.claim_due(T0 + timedelta(minutes=5), LATER) == []
+    assert escalations.claim_due(T0 + timedelta(minutes=10), LATER) == ["c"]
+
+
+def test_claimed_timers_are_retried():
+    """Test that claimed incidents are due again at the retry time."""
+    escalations.schedule("a", T0)
+    escalations.schedule("b", T0)
+
+    assert escalations.claim_due(T0, T0 + timedelta(minutes=1)) == ["a", "b"]
+    assert escalations.claim_due(T0, LATER) == []
+
+    escalations.cancel("b")
+    assert escalations.claim_due(T0 + timedelta(minutes=1), LATER) == ["a"]
+
+
+def test_schedule_replaces_timer():
+    """Test that an incident has at most one timer."""
+    escalations.schedule("a", T0)
+    escalations.schedule("a", T0 + timedelta(minutes=15))
+
+    assert escalations.claim_due(T0, LATER) == []
+    assert escalations.claim_due(T0 + timedelta(minutes=15), LATER) == ["a"]
+
+
+def test_cancel():
+    """Test removing a timer."""
+    escalations.schedule("a", T0)
+    escalations.schedule("b", T0)
+
+    escalations.cancel("a")
+    escalations.cancel("unknown")
+
+    assert escalations.claim_due(T0, LATER) == ["b"]
+
+
+def test_nothing_due_is_read_only():
+    """Test that checking for due incidents doesn't write to the store."""
+    escalations.schedule("a", T0 + timedelta(minutes=1))
+
+    with patch("escalations.check_and_set_value") as mock_cas:
+        assert escalations.claim_due(T0, LATER) == []
+
+    mock_cas.assert_not_called()
+
+
+def test_concurrent_update_is_retried():
+    """Test that a change made by another session between read and write is kept."""
+    escalations.schedule("a", T0)
+
+    cas = escalations.check_and_set_value
+    calls = []
+
+    def racing_cas(key, expected, new):
+        if not calls:
+            # Another session adds a timer before this one writes.
+            _local_dev_store[key] = [*_local_dev_store[key], [T0.timestamp(), "b"]]
+        calls.append(new)
+        return cas(key, expected, new)
+
+    with patch("escalations.check_and_set_value", side_effect=racing_cas):
+        escalations.schedule("c", T0)
+
+    assert len(calls) == 2
+    assert sorted(escalations.claim_due(T0, LATER)) == ["a", "b", "c"]
@@ -48,11 +48,20 @@ def sample_incident():
 class TestOnNewIncidentWebhook:
     """Tests for the on_new_incident_webhook handler."""
 
-    @patch("handlers.incidents.run")
+    @pytest.fixture(autouse=True)
+    def no_duplicates(self):
+        """Treat every report as a new incident, unless a test says otherwise."""
+        with (
+            patch("handlers.dedup.attach", return_value=None) as mock_attach,
+            patch("handlers.dedup.register") as mock_register,
+        ):
+            yield mock_attach, mock_register
+
+    @patch("handlers.incidents.advance")
     @patch("handlers.incidents.create")
     @patch("handlers.http_outcome")
     def test_successful_incident_creation(
-        self, mock_http_outcome, mock_create, mock_run, mock_event, sample_incident
+        self, mock_http_outcome, mock_create, mock_advance, mock_event, sample_incident
     ):
         """Test successful creation of a new incident."""
         mock_event.data.body.text = "Server is down"
@@ -68,14 +77,62 @@ class TestOnNewIncidentWebhook:
             status_code=201, json={"incident_id": "42"}
         )
 
-        # Verify incident was run
-        mock_run.assert_called_once_with(sample_incident)
+        # Verify incident was advanced
+        mock_advance.assert_called_once_with(sample_incident)
 
-    @patch("handlers.incidents.run")
+    @patch("handlers.incidents.advance")
+    @patch("handlers.incidents.create")
+    @patch("handlers.http_outcome")
+    def test_registers_new_incident(
+        self,
+        mock_http_outcome,
+        mock_create,
+        mock_advance,
+        mock_event,
+        sample_incident,
+        no_duplicates,
+    ):
+        """Test that new incidents are registered for deduplication."""
+        mock_attach, mock_register = no_duplicates
+        mock_event.data.body.text = "Server is down"
+        mock_create.return_value = sample_incident
+
+        handlers.on_new_incident_webhook(mock_event)
+
+        assert mock_attach.call_args.args[0] == "Server is down"
+        mock_register.assert_called_once_with("Server is down", sample_incident)
+
+    @patch("handlers.incidents.advance")
+    @patch("handlers.incidents.create")
+    @patch("handlers.http_outcome")
+    def test_duplicate(
+        self,
+        mock_http_outcome,
+        mock_create,
+        mock_advance,
+        mock_event,
+        sample_incident,
+        no_duplicates,
+    ):
+        """Test that duplicates don't create or advance incidents."""
+        mock_attach, mock_register = no_duplicates
+        mock_attach.return_value = sample_incident
+        mock_event.data.body.text = "Server is down"
+
+        handlers.on_new_incident_webhook(mock_event)
+
+        mock_http_outcome.assert_called_once_with(
+            status_code=200, json={"incident_id": "42", "duplicate": True}
+        )
+        mock_create.assert_not_called()
+        mock_register.assert_not_called()
+        mock_advance.assert_not_called()
+
+    @patch("handlers.incidents.advance")
     @patch("handlers.incidents.create")
     @patch("handlers.http_outcome")
     def test_strips_whitespace_from_details(
-        self, mock_http_outcome, mock_create, mock_run, mock_event, sample_incident
+        self, mock_http_outcome, mock_create, mock_advance, mock_event, sample_incident
     ):
         """Test that whitespace is stripped from incident details."""
         mock_event.data.body.text = "  Database connection failed  \n"
@@ -86,22 +143,22 @@ class TestOnNewIncidentWebhook:
         mock_create.assert_called_once_with("Database connection failed")
 
     @patch("handlers.store.update_incident")
-    @patch("handlers.incidents.run")
+    @patch("handlers.incidents.advance")
     @patch("handlers.incidents.create")
     @patch("handlers.http_outcome")
-    def test_handles_exception_during_run(
+    def test_handles_exception_during_advance(
         self,
         mock_http_outcome,
         mock_create,
-        mock_run,
+        mock_advance,
         mock_update,
         mock_event,
         sample_incident,
     ):
-        """Test that exceptions during run are handled properly."""
+        """Test that exceptions during advance are handled properly."""
         mock_event.data.body.text = "Test incident"
         mock_create.return_value = sample_incident
-        mock_run.side_effect = RuntimeError("Something went wrong")
+        mock_advance.side_effect = RuntimeError("Something went wrong")
 
         with pytest.raises(RuntimeError, match="Something went wrong"):
             handlers.on_new_incident_webhook(mock_event)
@@ -353,19 +410,32 @@ class TestOnIncidentDashboardWebhook:
         # Should show take button for authenticated user
         assert 'value="take"' in body
 
+    @patch("handlers.incidents.handle_action")
     @patch("handlers.store.get_incident_by_unique_id")
     @patch("handlers.http_outcome")
     def test_post_request_redirects_with_notification(
-        self, mock_http_outcome, mock_get_incident, mock_event, sample_incident
+        self,
+        mock_http_outcome,
+        mock_get_incident,
+        mock_handle_action,
+        mock_event,
+        sample_incident,
     ):
         """Test that POST request redirects with notification message."""
         mock_event.data.url.query.get.return_value = "test_unique_id"
         mock_event.data.get.return_value = None
         mock_event.data.method = "POST"
+        mock_event.data.body.form = {"action": "ack"}
         mock_get_incident.return_value = sample_incident
+        mock_handle_action.return_value = sample_incident
 
         handlers.on_incident_dashboard_webhook(mock_event)
 
+        # The action is handled before responding
+        mock_handle_action.assert_called_once_with(
+            {"action": "ack"}, None, sample_incident
+        )
+
         # Should return two http_outcome calls: redirect (303) and then content (200)
         assert mock_http_outcome.call_count == 2
 
@@ -413,6 +483,57 @@ class TestOnIncidentDashboardWebhook:
         assert "Working on it" in body
         assert "bob@example.com" in body
 
+    @patch("handlers.dedup.duplicates", return_value=3)
+    @patch("handlers.store.get_incident_by_unique_id")
+    @patch("handlers.http_outcome")
+    def test_get_request_shows_duplicates(
+        self,
+        mock_http_outcome,
+        mock_get_incident,
+        mock_duplicates,
+        mock_event,
+        sample_incident,
+    ):
+        """Test that dashboard shows the number of duplicate reports."""
+        mock_event.data.url.query.get.side_effect = lambda key: {
+            "unique_id": "test_unique_id",
+        }.get(key)
+        mock_event.data.get.return_value = None
+        mock_event.data.method = "GET"
+        mock_get_incident.return_value = sample_incident
+
+        handlers.on_incident_dashboard_webhook(mock_event)
+
+        body = mock_http_outcome.call_args[1]["body"]
+        assert "Duplicate reports: 3" in body
+        mock_duplicates.assert_called_once_with(sample_incident)
+
+
+class TestOnEscalationSchedule:
+    """Tests for the on_escalation_schedule handler."""
+
+    @patch("handlers.incidents.escalate_due", return_value=2)
+    @patch("builtins.print")
+    def test_escalates_due_incidents(self, mock_print, mock_escalate_due):
+        """Test that due incidents are escalated."""
+        handlers.on_escalation_schedule(None)
+
+        mock_escalate_due.assert_called_once_with()
+        mock_print.assert_called_once_with("checked 2 due incidents.")
+
+
+class TestOnFlushSchedule:
+    """Tests for the on_flush_schedule handler."""
+
+    @patch("handlers.store.flush_incident_updates", return_value=3)
+    @patch("builtins.print")
+    def test_flushes_updates(self, mock_print, mock_flush):
+        """Test that pending incident updates are flushed."""
+        handlers.on_flush_schedule(None)
+
+        mock_flush.assert_called_once_with()
+        mock_print.assert_called_once_with("flushed 3 incident updates.")
+
 
 class TestInit:
     """Tests for the init handler."""
@@ -0,0 +1,74 @@
+"""Tests for the incident ID allocation."""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from autokitteh.store import _local_dev_store
+
+import pytest
+
+
+# Mock autokitteh dependencies before importing incident_ids
+with patch("autokitteh.get_webhook_url", return_value="http://test.webhook.url"):
+    import incident_ids
+
+
+@pytest.fixture(autouse=True)
+def ak_store(monkeypatch):
+    """Use an empty local AutoKitteh store, and no leased IDs, in every test."""
+    monkeypatch.setattr(incident_ids, "_block", iter(()))
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
+def _new_process(monkeypatch):
+    """Forget the IDs leased by this process, as if a new session started."""
+    monkeypatch.setattr(incident_ids, "_block", iter(()))
+
+
+def test_starts_after_highest():
+    """Test that IDs follow the highest ID in the storage backend."""
+    highest = Mock(return_value=41)
+
+    assert incident_ids.allocate(highest) == 42
+    assert incident_ids.allocate(highest) == 43
+
+    highest.assert_called_once()
+
+
+def test_sessions_share_counter(monkeypatch):
+    """Test that sessions continue from each other's IDs."""
+    highest = Mock(return_value=0)
+
+    assert incident_ids.allocate(highest) == 1
+    _new_process(monkeypatch)
+    assert incident_ids.allocate(highest) == 2
+
+    highest.assert_called_once()
+
+
+def test_blocks(monkeypatch):
+    """Test that IDs are leased from the store a block at a time."""
+    monkeypatch.setattr(incident_ids.config, "INCIDENT_ID_BLOCK_SIZE", 100)
+
+    with patch("incident_ids.add_values", wraps=incident_ids.add_values) as add:
+        ids = [incident_ids.allocate(lambda: 0) for _ in range(150)]
+
+    assert ids == list(range(1, 151))
+    assert add.call_count == 2
+
+    # Unused IDs of the block are skipped by other sessions.
+    _new_process(monkeypatch)
+    assert incident_ids.allocate(lambda: 0) == 201
+
+
+def test_concurrent(monkeypatch):
+    """Test that concurrent callers never get the same ID."""
+    monkeypatch.setattr(incident_ids.config, "INCIDENT_ID_BLOCK_SIZE", 10)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids = list(executor.map(lambda _: incident_ids.allocate(lambda: 0), range(100)))
+
+    assert sorted(ids) == list(range(1, 101))
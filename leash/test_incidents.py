@@ -4,10 +4,13 @@ from dataclasses import replace
 from datetime import datetime, timedelta
 import os
 from unittest.mock import MagicMock
-from unittest.mock import Mock
 from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
+from autokitteh import get_value
+from autokitteh import set_value
+from autokitteh.store import _local_dev_store
+
 import pytest
 
 
@@ -26,6 +29,10 @@ from model import IncidentState
 from model import ScheduleRow
 
 
+# Far enough in the future to move claimed escalation timers out of the way.
+LATER = datetime(2100, 1, 1, tzinfo=ZoneInfo("UTC"))
+
+
 @pytest.fixture
 def fixed_time():
     """Return a fixed datetime for testing."""
@@ -169,7 +176,7 @@ class TestAssign:
         assert inc.comment == "manual assignment"
 
         mock_get_contact.assert_called_once_with("alice@example.com")
-        mock_notify.assert_called_once_with(sample_contact, sample_incident)
+        mock_notify.assert_not_called()  # Only after the incident is stored.
 
     @patch("incidents.store.get_contact_by_name")
     def test_assign_contact_not_found(
@@ -377,7 +384,7 @@ class TestHandleWebhookResponse:
     def test_notify_action(
         self, mock_get_contact, mock_notify, sample_incident, sample_contact
     ):
-        """Test notify action."""
+        """Test notify action, which pages only after the incident is stored."""
         inc_with_assignee = replace(sample_incident, assignee="alice@example.com")
         mock_get_contact.return_value = sample_contact
 
@@ -385,7 +392,7 @@ class TestHandleWebhookResponse:
         inc = incidents._handle_webhook_response(form, None, inc_with_assignee)
 
         mock_get_contact.assert_called_once_with("alice@example.com")
-        mock_notify.assert_called_once_with(sample_contact, inc_with_assignee)
+        mock_notify.assert_not_called()
         assert "notified assignee via webhook" in inc.comment
 
     def test_notify_action_no_assignee(self, sample_incident):
@@ -414,209 +421,405 @@ class TestHandleWebhookResponse:
         assert "unknown action 'unknown_action'" in inc.comment
 
 
-class TestRun:
-    """Tests for the run function."""
+_STATE_KEY = incidents._STATE_KEY_PREFIX + "test_unique_id_123"
+
+
+@pytest.fixture
+def ak_store():
+    """Use an empty local AutoKitteh store."""
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
+class TestAdvance:
+    """Tests for the advance function."""
 
-    @patch("incidents.subscribe")
-    @patch("incidents.next_event")
+    @patch("incidents._notify")
+    @patch("incidents.store.get_contact_by_name")
+    @patch("incidents.store.get_incident_by_unique_id")
     @patch("incidents.store.update_incident")
     @patch("incidents.store.get_schedule_row")
     @patch("incidents._auto_assign")
-    @patch("incidents._is_new_assignee_required")
     @patch("incidents._now")
-    def test_run_auto_assign_then_resolve(
+    def test_advance_assigns_and_sets_timer(
         self,
         mock_now,
-        mock_is_new_assignee,
         mock_auto_assign,
         mock_get_schedule,
         mock_update,
-        mock_next_event,
-        mock_subscribe,
+        mock_get_incident,
+        mock_get_contact,
+        mock_notify,
+        ak_store,
         sample_incident,
+        sample_contact,
         sample_schedule,
         fixed_time,
     ):
-        """Test run function with auto-assignment followed by resolution."""
-        # Setup
+        """Test that a new incident is assigned, paged, and due after the delay."""
         mock_now.return_value = fixed_time
-        mock_subscription = Mock()
-        mock_subscribe.return_value = mock_subscription
-
-        # First iteration: auto-assign
+        mock_get_contact.return_value = sample_contact
+        mock_get_incident.return_value = sample_incident
+        mock_get_schedule.return_value = sample_schedule
         assigned_inc = replace(
             sample_incident,
             state=IncidentState.ASSIGNED,
             assignee="alice@example.com",
             assigned_at=fixed_time,
         )
-
-        # Second iteration: resolve via webhook
-        resolved_inc = replace(assigned_inc, state=IncidentState.RESOLVED)
-
-        mock_is_new_assignee.side_effect = [True, False]
-        mock_get_schedule.return_value = sample_schedule
         mock_auto_assign.return_value = assigned_inc
 
-        webhook_data = Mock()
-        webhook_data.body.form = {"action": "resolve"}
-        webhook_data.get.return_value = {"email": "alice@example.com"}
-
-        mock_next_event.side_effect = [None, webhook_data]
+        assert incidents.advance(sample_incident) == assigned_inc
 
-        # Patch _handle_webhook_response to return resolved incident
-        with patch("incidents._handle_webhook_response", return_value=resolved_inc):
-            incidents.run(sample_incident)
-
-        # Verify subscription
-        mock_subscribe.assert_called_once()
-        assert "incident_dashboard_webhook" in mock_subscribe.call_args[0]
-        assert sample_incident.unique_id in mock_subscribe.call_args[1]["filter"]
+        mock_auto_assign.assert_called_once_with(
+            fixed_time, sample_incident, sample_schedule
+        )
+        mock_update.assert_called_once_with(assigned_inc)
+        mock_notify.assert_called_once_with(sample_contact, assigned_inc)
 
-        # Verify store updates
-        assert mock_update.call_count == 2
-        mock_update.assert_any_call(assigned_inc)
-        mock_update.assert_any_call(resolved_inc)
+        deadline = fixed_time + incidents.config.ESCALATION_DELAY
+        assert (
+            incidents.escalations.claim_due(deadline - timedelta(seconds=1), LATER)
+            == []
+        )
+        assert incidents.escalations.claim_due(deadline, LATER) == [
+            sample_incident.unique_id
+        ]
 
-    @patch("incidents.subscribe")
-    @patch("incidents.next_event")
+    @patch("incidents.store.get_incident_by_unique_id")
     @patch("incidents.store.update_incident")
     @patch("incidents.store.get_schedule_row")
-    @patch("incidents._auto_assign")
-    @patch("incidents._is_new_assignee_required")
     @patch("incidents._now")
-    def test_run_escalation_timeout(
+    def test_advance_pending_retries(
         self,
         mock_now,
-        mock_is_new_assignee,
-        mock_auto_assign,
         mock_get_schedule,
         mock_update,
-        mock_next_event,
-        mock_subscribe,
+        mock_get_incident,
+        ak_store,
         sample_incident,
-        sample_schedule,
         fixed_time,
+        monkeypatch,
     ):
-        """Test run function with escalation after timeout."""
+        """Test that an incident without an assignee is retried a minute later."""
+        monkeypatch.setattr("config.FAIL_ON_NO_ASSIGNEE", False)
         mock_now.return_value = fixed_time
-        mock_subscription = Mock()
-        mock_subscribe.return_value = mock_subscription
+        mock_get_schedule.return_value = None
+        mock_get_incident.return_value = sample_incident
+
+        inc = incidents.advance(sample_incident)
+
+        assert inc.state == IncidentState.PENDING
+        assert incidents.escalations.claim_due(
+            fixed_time + timedelta(minutes=1), LATER
+        ) == [sample_incident.unique_id]
 
-        # First iteration: assign to alice
-        assigned_alice = replace(
+    @patch("incidents.store.update_incident")
+    @patch("incidents._now")
+    def test_advance_not_due(
+        self, mock_now, mock_update, ak_store, sample_incident, fixed_time
+    ):
+        """Test that an assigned incident before its deadline is left alone."""
+        mock_now.return_value = fixed_time
+        inc = replace(
             sample_incident,
             state=IncidentState.ASSIGNED,
             assignee="alice@example.com",
-            assigned_at=fixed_time,
+            assigned_at=fixed_time - timedelta(minutes=1),
         )
 
-        # Second iteration: escalate to bob
-        assigned_bob = replace(
-            assigned_alice,
-            assignee="bob@example.com",
-        )
+        assert incidents.advance(inc) == inc
 
-        # Third iteration: resolve
-        resolved_inc = replace(assigned_bob, state=IncidentState.RESOLVED)
+        mock_update.assert_not_called()
+        deadline = inc.assigned_at + incidents.config.ESCALATION_DELAY
+        assert incidents.escalations.claim_due(deadline, LATER) == [inc.unique_id]
 
-        mock_is_new_assignee.side_effect = [True, True, False]
-        mock_get_schedule.return_value = sample_schedule
-        mock_auto_assign.side_effect = [assigned_alice, assigned_bob]
+    @patch("incidents.store.update_incident")
+    @patch("incidents._now")
+    def test_advance_inactive_cancels_timer(
+        self, mock_now, mock_update, ak_store, sample_incident, fixed_time
+    ):
+        """Test that an incident that is no longer active has no timer."""
+        mock_now.return_value = fixed_time
+        incidents.escalations.schedule(sample_incident.unique_id, fixed_time)
 
-        webhook_data = Mock()
-        webhook_data.body.form = {"action": "resolve"}
-        webhook_data.get.return_value = None
+        incidents.advance(replace(sample_incident, state=IncidentState.RESOLVED))
 
-        mock_next_event.side_effect = [None, None, webhook_data]
+        mock_update.assert_not_called()
+        assert incidents.escalations.claim_due(fixed_time, LATER) == []
 
-        with patch("incidents._handle_webhook_response", return_value=resolved_inc):
-            incidents.run(sample_incident)
+    @patch("incidents._notify")
+    @patch("incidents.store.get_incident_by_unique_id")
+    @patch("incidents.store.update_incident")
+    @patch("incidents.store.get_schedule_row")
+    @patch("incidents._auto_assign")
+    @patch("incidents._now")
+    def test_advance_concurrent_change(
+        self,
+        mock_now,
+        mock_auto_assign,
+        mock_get_schedule,
+        mock_update,
+        mock_get_incident,
+        mock_notify,
+        ak_store,
+        sample_incident,
+        fixed_time,
+    ):
+        """Test that an incident changed by another session isn't overwritten."""
+        mock_now.return_value = fixed_time
+        mock_auto_assign.return_value = replace(
+            sample_incident,
+            state=IncidentState.ASSIGNED,
+            assignee="alice@example.com",
+            assigned_at=fixed_time,
+        )
+        resolved = replace(sample_incident, state=IncidentState.RESOLVED)
+        mock_get_incident.return_value = resolved
+        set_value(_STATE_KEY, incidents._state(resolved))
+
+        assert incidents.advance(sample_incident) == resolved
 
-        # Verify both escalations occurred
-        assert mock_auto_assign.call_count == 2
-        assert mock_update.call_count == 3
+        mock_update.assert_not_called()
+        mock_notify.assert_not_called()
+        assert incidents.escalations.claim_due(LATER, LATER) == []
 
-    @patch("incidents.subscribe")
-    @patch("incidents.next_event")
+    @patch("incidents._notify")
+    @patch("incidents.store.get_contact_by_name")
     @patch("incidents.store.update_incident")
     @patch("incidents.store.get_schedule_row")
     @patch("incidents._auto_assign")
-    @patch("incidents._is_new_assignee_required")
     @patch("incidents._now")
-    def test_run_immediate_error(
+    def test_advance_update_error(
         self,
         mock_now,
-        mock_is_new_assignee,
         mock_auto_assign,
         mock_get_schedule,
         mock_update,
-        mock_next_event,
-        mock_subscribe,
+        mock_get_contact,
+        mock_notify,
+        ak_store,
         sample_incident,
+        sample_contact,
         fixed_time,
     ):
-        """Test run function when auto-assignment fails immediately."""
+        """Test that a failed update doesn't page, and can be retried."""
         mock_now.return_value = fixed_time
-        mock_subscription = Mock()
-        mock_subscribe.return_value = mock_subscription
-
-        error_inc = replace(
+        mock_get_contact.return_value = sample_contact
+        mock_auto_assign.return_value = replace(
             sample_incident,
-            state=IncidentState.ERROR,
-            comment="no schedule set",
+            state=IncidentState.ASSIGNED,
+            assignee="alice@example.com",
+            assigned_at=fixed_time,
         )
+        mock_update.side_effect = RuntimeError("APIError: [429]")
 
-        mock_is_new_assignee.return_value = True
-        mock_get_schedule.return_value = None
-        mock_auto_assign.return_value = error_inc
+        with pytest.raises(RuntimeError):
+            incidents.advance(sample_incident)
 
-        incidents.run(sample_incident)
+        mock_notify.assert_not_called()
+        assert get_value(_STATE_KEY) is None
 
-        # Should update once with error state and then exit
-        mock_update.assert_called_once_with(error_inc)
-        # next_event should not be called since state is not active
-        mock_next_event.assert_not_called()
+        mock_update.side_effect = None
+        incidents.advance(sample_incident)
+        mock_update.assert_called_with(mock_auto_assign.return_value)
+        mock_notify.assert_called_once_with(
+            sample_contact, mock_auto_assign.return_value
+        )
 
-    @patch("incidents.subscribe")
-    @patch("incidents.next_event")
-    @patch("incidents.store.update_incident")
-    @patch("incidents._is_new_assignee_required")
+
+class TestEscalateDue:
+    """Tests for the escalate_due function."""
+
+    @patch("incidents.advance")
+    @patch("incidents.store.get_incident_by_unique_id")
     @patch("incidents._now")
-    def test_run_webhook_only_no_assignment(
+    def test_escalate_due_advances_only_due(
         self,
         mock_now,
-        mock_is_new_assignee,
-        mock_update,
-        mock_next_event,
-        mock_subscribe,
+        mock_get_incident,
+        mock_advance,
+        ak_store,
         sample_incident,
         fixed_time,
     ):
-        """Test run function with webhook response without auto-assignment."""
+        """Test that only incidents with due timers are advanced."""
         mock_now.return_value = fixed_time
-        mock_subscription = Mock()
-        mock_subscribe.return_value = mock_subscription
+        mock_get_incident.return_value = sample_incident
+        incidents.escalations.schedule("due", fixed_time - timedelta(minutes=1))
+        incidents.escalations.schedule("later", fixed_time + timedelta(minutes=1))
 
-        # Incident is already assigned, no new assignee needed
-        assigned_inc = replace(
+        assert incidents.escalate_due() == 1
+
+        mock_get_incident.assert_called_once_with("due")
+        mock_advance.assert_called_once_with(sample_incident)
+
+        assert incidents.escalate_due() == 0
+        mock_advance.assert_called_once()
+
+    @patch("incidents.advance")
+    @patch("incidents.store.get_incident_by_unique_id")
+    @patch("incidents._now")
+    def test_escalate_due_error(
+        self,
+        mock_now,
+        mock_get_incident,
+        mock_advance,
+        ak_store,
+        sample_incident,
+        fixed_time,
+    ):
+        """Test that failing incidents are retried later, and others proceed."""
+        mock_now.return_value = fixed_time
+        mock_get_incident.side_effect = [
+            RuntimeError("APIError: [429]"),
+            sample_incident,
+            sample_incident,
+        ]
+        mock_advance.side_effect = [RuntimeError("Something went wrong"), None]
+        incidents.escalations.schedule("a", fixed_time - timedelta(minutes=3))
+        incidents.escalations.schedule("b", fixed_time - timedelta(minutes=2))
+        incidents.escalations.schedule("c", fixed_time - timedelta(minutes=1))
+
+        assert incidents.escalate_due() == 3
+
+        assert mock_advance.call_count == 2
+        retry_at = fixed_time + incidents._RETRY_DELAY
+        assert incidents.escalations.claim_due(retry_at, LATER) == ["a", "b", "c"]
+
+    @patch("incidents.advance")
+    @patch("incidents.store.get_incident_by_unique_id")
+    @patch("incidents._now")
+    def test_escalate_due_incident_not_found(
+        self, mock_now, mock_get_incident, mock_advance, ak_store, fixed_time
+    ):
+        """Test that timers of unknown incidents are dropped."""
+        mock_now.return_value = fixed_time
+        mock_get_incident.return_value = None
+        incidents.escalations.schedule("gone", fixed_time)
+
+        assert incidents.escalate_due() == 1
+
+        mock_advance.assert_not_called()
+        assert incidents.escalations.claim_due(LATER, LATER) == []
+
+
+class TestHandleAction:
+    """Tests for the handle_action function."""
+
+    @patch("incidents.advance")
+    @patch("incidents.store.update_incident")
+    @patch("incidents.store.get_incident_by_unique_id")
+    def test_handle_action(
+        self, mock_get_incident, mock_update, mock_advance, ak_store, sample_incident
+    ):
+        """Test that an action is stored and the escalation continues."""
+        inc = replace(sample_incident, state=IncidentState.ASSIGNED)
+        mock_get_incident.return_value = inc
+        mock_advance.side_effect = lambda inc: inc
+
+        result = incidents.handle_action({"action": "resolve"}, None, inc)
+
+        assert result.state == IncidentState.RESOLVED
+        mock_update.assert_called_once_with(result)
+        mock_advance.assert_called_once_with(result)
+
+    @patch("incidents._notify")
+    @patch("incidents.advance")
+    @patch("incidents.store.update_incident")
+    @patch("incidents.store.get_incident_by_unique_id")
+    def test_handle_action_concurrent_change(
+        self,
+        mock_get_incident,
+        mock_update,
+        mock_advance,
+        mock_notify,
+        ak_store,
+        sample_incident,
+    ):
+        """Test that an action on a stale incident doesn't overwrite the new one."""
+        inc = replace(sample_incident, state=IncidentState.ASSIGNED)
+        escalated = replace(inc, assignee="bob@example.com")
+        mock_get_incident.return_value = escalated
+        mock_advance.side_effect = lambda inc: inc
+        set_value(_STATE_KEY, incidents._state(escalated))
+
+        assert incidents.handle_action({"action": "notify"}, None, inc) == escalated
+
+        mock_update.assert_not_called()
+        mock_notify.assert_not_called()
+        mock_advance.assert_called_once_with(escalated)
+
+    @patch("incidents._notify")
+    @patch("incidents.advance")
+    @patch("incidents.store.update_incident")
+    @patch("incidents.store.get_contact_by_name")
+    def test_handle_notify_action(
+        self,
+        mock_get_contact,
+        mock_update,
+        mock_advance,
+        mock_notify,
+        ak_store,
+        sample_incident,
+        sample_contact,
+    ):
+        """Test that the assignee is paged again after the action is stored."""
+        inc = replace(
             sample_incident,
             state=IncidentState.ASSIGNED,
             assignee="alice@example.com",
         )
+        mock_get_contact.return_value = sample_contact
+        mock_advance.side_effect = lambda inc: inc
+        mock_update.side_effect = lambda _: mock_notify.assert_not_called()
 
-        resolved_inc = replace(assigned_inc, state=IncidentState.RESOLVED)
-
-        mock_is_new_assignee.return_value = False
+        result = incidents.handle_action({"action": "notify"}, None, inc)
 
-        webhook_data = Mock()
-        webhook_data.body.form = {"action": "resolve"}
-        webhook_data.get.return_value = None
+        mock_update.assert_called_once_with(result)
+        mock_notify.assert_called_once_with(sample_contact, result)
 
-        mock_next_event.return_value = webhook_data
+    @patch("incidents._notify")
+    @patch("incidents.store.get_contact_by_name")
+    @patch("incidents.store.get_incident_by_unique_id")
+    @patch("incidents.store.update_incident")
+    @patch("incidents.store.get_schedule_row")
+    @patch("incidents._auto_assign")
+    @patch("incidents._now")
+    def test_handle_escalate_action_reassigns(
+        self,
+        mock_now,
+        mock_auto_assign,
+        mock_get_schedule,
+        mock_update,
+        mock_get_incident,
+        mock_get_contact,
+        mock_notify,
+        ak_store,
+        sample_incident,
+        sample_schedule,
+        fixed_time,
+    ):
+        """Test that escalating assigns the next person right away."""
+        mock_now.return_value = fixed_time
+        mock_get_schedule.return_value = sample_schedule
+        inc = replace(
+            sample_incident,
+            state=IncidentState.ASSIGNED,
+            assignee="alice@example.com",
+            assigned_at=fixed_time,
+        )
+        assigned_bob = replace(inc, assignee="bob@example.com")
+        mock_auto_assign.return_value = assigned_bob
+        mock_get_incident.side_effect = lambda _: (
+            mock_update.call_args[0][0] if mock_update.called else inc
+        )
 
-        with patch("incidents._handle_webhook_response", return_value=resolved_inc):
-            incidents.run(assigned_inc)
+        result = incidents.handle_action({"action": "escalate"}, None, inc)
 
-        # Should only update once with resolved state
-        mock_update.assert_called_once_with(resolved_inc)
+        assert result == assigned_bob
+        assert mock_auto_assign.call_args[0][1].state == IncidentState.PENDING
+        assert mock_update.call_count == 2
+        mock_get_contact.assert_called_once_with("bob@example.com")
+        mock_notify.assert_called_once_with(mock_get_contact.return_value, result)
@@ -2,12 +2,15 @@
 
 from datetime import UTC  # noqa: I001
 from datetime import datetime
+from datetime import timedelta
+import random
 
 import pytest
 
 from model import Contact
 from model import Incident
 from model import IncidentState
+from model import Schedule
 from model import ScheduleRow
 
 
@@ -199,6 +202,67 @@ class TestScheduleRow:
             schedule.get_next_assignee("Charlie")
 
 
+class TestSchedule:
+    """Tests for the Schedule index."""
+
+    def _row(self, start: int, end: int, name: str) -> ScheduleRow:
+        t0 = datetime(2025, 1, 1, tzinfo=UTC)
+        return ScheduleRow(
+            start_time=t0 + timedelta(hours=start),
+            end_time=t0 + timedelta(hours=end),
+            assignees=[name],
+        )
+
+    def test_at(self):
+        """Test lookups inside, between, and at the bounds of rows."""
+        a = self._row(0, 10, "a")
+        b = self._row(10, 20, "b")
+        c = self._row(30, 40, "c")
+        schedule = Schedule([a, b, c])
+        t0 = a.start_time
+
+        assert schedule.at(t0 - timedelta(hours=1)) is None
+        assert schedule.at(t0) == a
+        assert schedule.at(t0 + timedelta(hours=5)) == a
+        # Bounds are inclusive, so the first row wins.
+        assert schedule.at(t0 + timedelta(hours=10)) == a
+        assert schedule.at(t0 + timedelta(hours=15)) == b
+        assert schedule.at(t0 + timedelta(hours=20)) == b
+        assert schedule.at(t0 + timedelta(hours=25)) is None
+        assert schedule.at(t0 + timedelta(hours=40)) == c
+        assert schedule.at(t0 + timedelta(hours=41)) is None
+
+    def test_at_overlapping_returns_first(self):
+        """Test that the first row wins when rows overlap."""
+        outer = self._row(0, 100, "outer")
+        inner = self._row(10, 20, "inner")
+
+        assert Schedule([outer, inner]).at(inner.start_time) == outer
+        assert Schedule([inner, outer]).at(inner.start_time) == inner
+        assert Schedule([inner, outer]).at(inner.end_time) == inner
+        assert Schedule([inner, outer]).at(outer.end_time) == outer
+
+    def test_at_empty(self):
+        """Test an empty schedule."""
+        assert Schedule([]).at(datetime.now(UTC)) is None
+
+    def test_at_matches_linear_scan(self):
+        """Test against the first matching row, for random schedules."""
+        rnd = random.Random(42)
+        for _ in range(50):
+            rows = []
+            for i in range(rnd.randint(1, 30)):
+                start = rnd.randint(0, 50)
+                rows.append(self._row(start, start + rnd.randint(-5, 20), str(i)))
+            schedule = Schedule(rows)
+
+            t0 = datetime(2025, 1, 1, tzinfo=UTC)
+            for half_hours in range(-2, 150):
+                t = t0 + timedelta(minutes=30 * half_hours)
+                expected = next((r for r in rows if r.match(t)), None)
+                assert schedule.at(t) is expected
+
+
 class TestIncidentState:
     """Tests for IncidentState enum."""
 
@@ -0,0 +1,157 @@
+"""Tests for the notification dispatcher."""
+
+from datetime import timedelta
+import threading
+import time
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+
+# Mock autokitteh dependencies before importing notifications
+with patch("autokitteh.get_webhook_url", return_value="http://test.webhook.url"):
+    import notifications
+
+from model import Contact
+
+
+@pytest.fixture
+def contact():
+    """Return a contact reachable through all channels."""
+    return Contact(name="alice", email="alice@example.com", phone="+1234567890")
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    """Replace the channel clients with mocks."""
+    twilio, gmail, slack = MagicMock(), MagicMock(), MagicMock()
+
+    twilio.messages.create.return_value.sid = "SM123"
+    users = gmail.users.return_value
+    users.getProfile.return_value.execute.return_value = {
+        "emailAddress": "leash@example.com"
+    }
+    users.messages.return_value.send.return_value.execute.return_value = {"id": "G1"}
+    slack.users_lookupByEmail.return_value = {"user": {"id": "U123"}}
+    slack.chat_postMessage.return_value = {"ts": "1.2"}
+
+    monkeypatch.setattr(notifications, "twilio", twilio)
+    monkeypatch.setattr(notifications, "gmail", gmail)
+    monkeypatch.setattr(notifications, "slack", slack)
+
+    notifications._gmail_sender.cache_clear()
+    notifications._slack_user_id.cache_clear()
+
+    return twilio, gmail, slack
+
+
+def _by_channel(results):
+    return {r.channel: r for r in results}
+
+
+def test_notify_all_channels(clients, contact):
+    """Test sending through every channel."""
+    twilio, _, slack = clients
+
+    results = _by_channel(notifications.notify(contact, "subject", "message"))
+
+    assert {c: r.detail for c, r in results.items()} == {
+        "twilio": "SM123",
+        "gmail": "G1",
+        "slack": "1.2",
+    }
+    assert all(r.sent for r in results.values())
+    twilio.messages.create.assert_called_once()
+    slack.chat_postMessage.assert_called_once_with(
+        channel="U123", text="*subject*\n\nmessage"
+    )
+
+
+def test_notify_channels_concurrently(clients, contact):
+    """Test that channels are sent concurrently, not one after another."""
+    twilio, _, slack = clients
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def wait(result):
+        def f(**kwargs):
+            barrier.wait()
+            return result
+
+        return f
+
+    twilio.messages.create.side_effect = wait(MagicMock(sid="SM1"))
+    slack.chat_postMessage.side_effect = wait({"ts": "1"})
+
+    results = _by_channel(notifications.notify(contact, "subject", "message"))
+
+    # Each of the two blocks until the other one is running as well.
+    assert results["twilio"].sent
+    assert results["slack"].sent
+
+
+def test_notify_timeout(clients, contact, monkeypatch):
+    """Test that a slow channel doesn't delay the result beyond the timeout."""
+    _, _, slack = clients
+    monkeypatch.setattr(notifications.config, "NOTIFY_TIMEOUT", timedelta(seconds=0.2))
+
+    done = threading.Event()
+    slack.chat_postMessage.side_effect = lambda **_: done.wait(5)
+
+    start = time.monotonic()
+    results = _by_channel(notifications.notify(contact, "subject", "message"))
+    done.set()
+
+    assert time.monotonic() - start < 1
+    assert results["slack"] == notifications.ChannelResult(
+        channel="slack",
+        sent=False,
+        detail="timed out",
+        seconds=results["slack"].seconds,
+    )
+    assert results["twilio"].sent
+    assert results["gmail"].sent
+
+
+def test_notify_channel_error(clients, contact):
+    """Test that a failing channel is reported without affecting the others."""
+    _, _, slack = clients
+    slack.users_lookupByEmail.side_effect = SlackApiError(
+        "error", response={"error": "users_not_found"}
+    )
+
+    results = _by_channel(notifications.notify(contact, "subject", "message"))
+
+    assert not results["slack"].sent
+    assert results["slack"].detail == "`users_not_found`"
+    assert results["gmail"].sent
+
+
+def test_notify_caches_lookups(clients, contact):
+    """Test that the Gmail profile and Slack user ID are looked up once."""
+    _, gmail, slack = clients
+
+    notifications.notify(contact, "subject", "message")
+    notifications.notify(contact, "subject", "message")
+
+    gmail.users.return_value.getProfile.assert_called_once_with(userId="me")
+    slack.users_lookupByEmail.assert_called_once_with(email="alice@example.com")
+    assert slack.chat_postMessage.call_count == 2
+
+
+def test_notify_no_channels(clients, capsys):
+    """Test notifying a contact without any contact details."""
+    assert notifications.notify(Contact(name="bob"), "subject", "message") == []
+
+    assert "WARN: no notification sent to bob." in capsys.readouterr().out
+
+
+def test_notify_uninitialized_connections(monkeypatch, contact):
+    """Test that uninitialized connections are skipped."""
+    monkeypatch.setattr(notifications, "twilio", None)
+    monkeypatch.setattr(notifications, "gmail", None)
+    monkeypatch.setattr(notifications, "slack", None)
+
+    assert notifications.notify(contact, "subject", "message") == []
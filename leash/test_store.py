@@ -1,35 +1,70 @@
-"""Tests for Google Sheets storage backend functionality."""
+"""Tests for the storage interface, against every storage backend."""
 
+import dataclasses
 from datetime import datetime, timedelta
-import os
-from unittest.mock import MagicMock
-from unittest.mock import Mock
 from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
-from gspread.exceptions import WorksheetNotFound
+from autokitteh.store import _local_dev_store
 
 import pytest
 
 
-# Set required environment variables before importing store
-os.environ["GOOGLE_SPREADSHEET_ID"] = "test_spreadsheet_id"
-
 # Mock autokitteh dependencies before importing store
-with (
-    patch("autokitteh.get_webhook_url", return_value="http://test.webhook.url"),
-    patch("autokitteh.google.gspread_client") as mock_gspread,
-):
-    mock_client = MagicMock()
-    mock_gspread.return_value = mock_client
+with patch("autokitteh.get_webhook_url", return_value="http://test.webhook.url"):
     import store
+    from store_gsheets import SheetsStore
+    from store_sqlite import SQLiteStore
 
+from leash_fakes import FakeSpreadsheet
 from model import Contact
 from model import Incident
 from model import IncidentState
 from model import ScheduleRow
 
 
+def _sheets_store(schedule: list[ScheduleRow], contacts: list[Contact]) -> store.Store:
+    spreadsheet = FakeSpreadsheet()
+
+    spreadsheet.add_worksheet("contacts").update(
+        [["name", "email", "phone"]] + [[c.name, c.email, c.phone] for c in contacts]
+    )
+
+    s = SheetsStore(spreadsheet)
+
+    ws = spreadsheet.worksheet("schedule")
+    for sched in schedule:
+        ws.append_row(sched.row)
+
+    return s
+
+
+def _sqlite_store(schedule: list[ScheduleRow], contacts: list[Contact]) -> store.Store:
+    s = SQLiteStore(":memory:")
+
+    for sched in schedule:
+        s.add_schedule_row(sched)
+
+    for c in contacts:
+        s.add_contact(c)
+
+    return s
+
+
+@pytest.fixture(params=[_sheets_store, _sqlite_store], ids=["gsheets", "sqlite"])
+def new_store(request):
+    """Return a function that creates a backend with a schedule and contacts."""
+    _local_dev_store.clear()
+    yield request.param
+    _local_dev_store.clear()
+
+
+@pytest.fixture
+def backend(new_store, sample_schedule, sample_contact):
+    """Return a backend with the sample schedule and contact."""
+    return new_store([sample_schedule], [sample_contact])
+
+
 @pytest.fixture
 def fixed_time():
     """Return a fixed datetime for testing."""
@@ -52,7 +87,7 @@ def sample_incident(fixed_time):
 def sample_contact():
     """Return a sample contact for testing."""
     return Contact(
-        name="alice@example.com",
+        name="alice",
         email="alice@example.com",
         phone="+1234567890",
     )
@@ -64,299 +99,177 @@ def sample_schedule(fixed_time):
     return ScheduleRow(
         start_time=fixed_time - timedelta(hours=1),
         end_time=fixed_time + timedelta(hours=23),
-        assignees=["alice@example.com", "bob@example.com"],
+        assignees=["alice", "bob"],
     )
 
 
-class TestGet:
-    """Tests for the get function."""
-
-    def test_get_existing_worksheet(self):
-        """Test getting an existing worksheet."""
-        mock_worksheet = Mock()
-        store._client.worksheet = Mock(return_value=mock_worksheet)
+class TestBackend:
+    """Tests for the backend selection."""
 
-        result = store.get("test_sheet")
+    @pytest.fixture(autouse=True)
+    def clear_backend(self):
+        """Make every test open its own backend."""
+        store.backend.cache_clear()
+        yield
+        store.backend.cache_clear()
 
-        assert result == mock_worksheet
-        store._client.worksheet.assert_called_once_with("test_sheet")
+    def test_sqlite(self, monkeypatch):
+        """Test selecting the SQLite backend."""
+        monkeypatch.setattr(store.config, "STORE_BACKEND", "sqlite")
+        monkeypatch.setattr(store.config, "SQLITE_DB_PATH", ":memory:")
 
-    def test_get_nonexistent_worksheet(self):
-        """Test getting a worksheet that doesn't exist."""
-        store._client.worksheet = Mock(side_effect=WorksheetNotFound("Not found"))
+        assert isinstance(store.backend(), SQLiteStore)
+        assert store.backend() is store.backend()
 
-        result = store.get("nonexistent_sheet")
+    def test_gsheets(self, monkeypatch):
+        """Test selecting the Google Sheets backend."""
+        monkeypatch.setattr(store.config, "STORE_BACKEND", "gsheets")
+        monkeypatch.setenv("GOOGLE_SPREADSHEET_ID", "test_spreadsheet_id")
+        spreadsheet = FakeSpreadsheet()
 
-        assert result is None
-        store._client.worksheet.assert_called_once_with("nonexistent_sheet")
+        with patch("store.gspread_client") as mock_gspread:
+            mock_gspread.return_value.open_by_key.return_value = spreadsheet
+            assert isinstance(store.backend(), SheetsStore)
 
+        mock_gspread.return_value.open_by_key.assert_called_once_with(
+            "test_spreadsheet_id"
+        )
 
-class TestNextIncidentId:
-    """Tests for the next_incident_id function."""
+    def test_gsheets_no_spreadsheet_id(self, monkeypatch):
+        """Test that the Google Sheets backend requires a spreadsheet ID."""
+        monkeypatch.setattr(store.config, "STORE_BACKEND", "gsheets")
+        monkeypatch.delenv("GOOGLE_SPREADSHEET_ID", raising=False)
 
-    def test_next_incident_id_with_value(self):
-        """Test getting next incident ID when value exists."""
-        mock_cell = Mock()
-        mock_cell.value = "42"
-        store._scratchpad.acell = Mock(return_value=mock_cell)
+        with pytest.raises(RuntimeError, match="GOOGLE_SPREADSHEET_ID not set"):
+            store.backend()
 
-        result = store.next_incident_id()
+    def test_unknown(self, monkeypatch):
+        """Test an unknown backend."""
+        monkeypatch.setattr(store.config, "STORE_BACKEND", "csv")
 
-        assert result == "42"
-        store._scratchpad.acell.assert_called_once_with("B1")
+        with pytest.raises(RuntimeError, match="unknown STORE_BACKEND: csv"):
+            store.backend()
 
-    def test_next_incident_id_default(self):
-        """Test getting next incident ID when no value exists."""
-        mock_cell = Mock()
-        mock_cell.value = None
-        store._scratchpad.acell = Mock(return_value=mock_cell)
+    def test_functions_use_backend(self, monkeypatch, backend, sample_incident):
+        """Test that the module functions go to the configured backend."""
+        monkeypatch.setattr(store, "backend", lambda: backend)
 
-        result = store.next_incident_id()
+        store.add_incident(sample_incident)
+        store.update_incident(sample_incident)
+        store.flush_incident_updates()
 
-        assert result == "1"
+        assert store.get_incident_by_unique_id("test_unique_id_xyz") is not None
 
+    def test_next_incident_id(self, monkeypatch, backend, sample_incident):
+        """Test that new IDs follow the highest stored one."""
+        monkeypatch.setattr(store, "backend", lambda: backend)
+        monkeypatch.setattr(store.incident_ids, "_block", iter(()))
 
-class TestAddIncident:
-    """Tests for the add_incident function."""
+        backend.add_incident(sample_incident)
 
-    def test_add_incident(self, sample_incident):
-        """Test adding an incident to the sheet."""
-        store._incidents.append_row = Mock()
+        assert store.next_incident_id() == "43"
+        assert store.next_incident_id() == "44"
 
-        store.add_incident(sample_incident)
 
-        store._incidents.append_row.assert_called_once()
-        call_args = store._incidents.append_row.call_args
-        assert call_args[0][0] == sample_incident.row
-        assert "value_input_option" in call_args[1]
+class TestIncidents:
+    """Tests for storing incidents."""
 
+    def test_highest_incident_id(self, backend, sample_incident):
+        """Test getting the highest stored incident ID."""
+        assert backend.highest_incident_id() == 0
 
-class TestGetIncidentByUniqueId:
-    """Tests for the get_incident_by_unique_id function."""
+        backend.add_incident(sample_incident)
+        backend.add_incident(
+            dataclasses.replace(sample_incident, id="7", unique_id="other_unique_id")
+        )
 
-    def test_get_incident_found(self, sample_incident):
-        """Test getting an incident that exists."""
-        mock_cell = Mock()
-        mock_cell.row = 2
-        store._incidents.find = Mock(return_value=mock_cell)
-        store._incidents.row_values = Mock(return_value=sample_incident.row)
+        assert backend.highest_incident_id() == 42
 
-        result = store.get_incident_by_unique_id("test_unique_id_xyz")
+    def test_add_and_get(self, backend, sample_incident):
+        """Test reading back an added incident."""
+        backend.add_incident(sample_incident)
 
-        assert result is not None
-        assert result.id == sample_incident.id
-        assert result.unique_id == sample_incident.unique_id
-        store._incidents.find.assert_called_once_with("test_unique_id_xyz", in_column=9)
+        assert backend.get_incident_by_unique_id("test_unique_id_xyz") == (
+            sample_incident
+        )
 
-    def test_get_incident_not_found(self):
+    def test_get_not_found(self, backend, sample_incident):
         """Test getting an incident that doesn't exist."""
-        store._incidents.find = Mock(return_value=None)
+        backend.add_incident(sample_incident)
 
-        result = store.get_incident_by_unique_id("nonexistent_id")
+        assert backend.get_incident_by_unique_id("nonexistent_id") is None
 
-        assert result is None
-        store._incidents.find.assert_called_once_with("nonexistent_id", in_column=9)
+    def test_update(self, backend, sample_incident, fixed_time):
+        """Test that updates are visible immediately, and after flushing."""
+        backend.add_incident(sample_incident)
 
+        inc = dataclasses.replace(
+            sample_incident,
+            state=IncidentState.ASSIGNED,
+            assignee="alice",
+            assigned_at=fixed_time + timedelta(minutes=5),
+            comment="auto-assigned",
+        )
+        backend.update_incident(inc)
 
-class TestUpdateIncident:
-    """Tests for the update_incident function."""
-
-    def test_update_incident_success(self, sample_incident):
-        """Test updating an existing incident."""
-        mock_cell = Mock()
-        mock_cell.row = 3
-        store._incidents.find = Mock(return_value=mock_cell)
-        store._incidents.update = Mock()
+        assert backend.get_incident_by_unique_id("test_unique_id_xyz") == inc
 
-        store.update_incident(sample_incident)
+        backend.flush_incident_updates()
 
-        store._incidents.find.assert_called_once_with(
-            str(sample_incident.id), in_column=1
-        )
-        store._incidents.update.assert_called_once()
-        call_args = store._incidents.update.call_args
-        assert call_args[0][0] == [sample_incident.row]
-        assert call_args[0][1] == "A3"
+        assert backend.get_incident_by_unique_id("test_unique_id_xyz") == inc
 
-    def test_update_incident_not_found(self, sample_incident):
+    def test_update_not_found(self, backend, sample_incident):
         """Test updating an incident that doesn't exist."""
-        store._incidents.find = Mock(return_value=None)
-
         with pytest.raises(ValueError, match="Incident with id 42 not found"):
-            store.update_incident(sample_incident)
+            backend.update_incident(sample_incident)
 
 
-class TestGetScheduleRow:
-    """Tests for the get_schedule_row function."""
+class TestSchedule:
+    """Tests for schedule lookups."""
 
-    def test_get_schedule_row_match(self, fixed_time, sample_schedule):
+    def test_match(self, backend, fixed_time, sample_schedule):
         """Test getting a schedule row that matches the time."""
-        store._schedule.get_all_values = Mock(
-            return_value=[
-                ScheduleRow.labels,
-                sample_schedule.row,
-            ]
-        )
-
-        result = store.get_schedule_row(fixed_time)
-
-        assert result is not None
-        assert result.start_time == sample_schedule.start_time
-        assert result.end_time == sample_schedule.end_time
-        assert result.assignees == sample_schedule.assignees
+        assert backend.get_schedule_row(fixed_time) == sample_schedule
 
-    def test_get_schedule_row_no_match(self, fixed_time, sample_schedule):
+    def test_no_match(self, backend, sample_schedule):
         """Test getting a schedule row when time doesn't match."""
-        # Create schedule that doesn't match the fixed_time
-        past_schedule = ScheduleRow(
-            start_time=fixed_time - timedelta(days=2),
-            end_time=fixed_time - timedelta(days=1),
-            assignees=["alice@example.com"],
-        )
-
-        store._schedule.get_all_values = Mock(
-            return_value=[
-                ScheduleRow.labels,
-                past_schedule.row,
-            ]
-        )
-
-        result = store.get_schedule_row(fixed_time)
+        assert backend.get_schedule_row(sample_schedule.end_time + timedelta(1)) is None
 
-        assert result is None
-
-    def test_get_schedule_row_multiple_matches_returns_first(self, fixed_time):
+    def test_multiple_matches_returns_first(self, new_store, fixed_time):
         """Test that when multiple schedules match, the first one is returned."""
         schedule1 = ScheduleRow(
             start_time=fixed_time - timedelta(hours=1),
             end_time=fixed_time + timedelta(hours=1),
-            assignees=["alice@example.com"],
+            assignees=["alice"],
         )
         schedule2 = ScheduleRow(
             start_time=fixed_time - timedelta(hours=2),
             end_time=fixed_time + timedelta(hours=2),
-            assignees=["bob@example.com"],
-        )
-
-        store._schedule.get_all_values = Mock(
-            return_value=[
-                ScheduleRow.labels,
-                schedule1.row,
-                schedule2.row,
-            ]
-        )
-
-        result = store.get_schedule_row(fixed_time)
-
-        assert result is not None
-        assert result.assignees == ["alice@example.com"]
-
-    def test_get_schedule_row_invalid_row(self, fixed_time, sample_schedule):
-        """Test getting a schedule row with an invalid row in the data."""
-        store._schedule.get_all_values = Mock(
-            return_value=[
-                ScheduleRow.labels,
-                ["invalid", "data"],  # Invalid row
-                sample_schedule.row,  # Valid row
-            ]
+            assignees=["bob"],
         )
 
-        result = store.get_schedule_row(fixed_time)
+        backend = new_store([schedule1, schedule2], [])
 
-        # Should skip invalid row and return the valid one
-        assert result is not None
-        assert result.assignees == sample_schedule.assignees
+        assert backend.get_schedule_row(fixed_time) == schedule1
+        assert backend.get_schedule_row(schedule2.end_time) == schedule2
 
-    def test_get_schedule_row_empty(self, fixed_time):
+    def test_empty(self, new_store, fixed_time):
         """Test getting a schedule row when no schedules exist."""
-        store._schedule.get_all_values = Mock(return_value=[ScheduleRow.labels])
-
-        result = store.get_schedule_row(fixed_time)
-
-        assert result is None
-
-
-class TestGetContactByName:
-    """Tests for the get_contact_by_name function."""
-
-    def test_get_contact_by_name_found(self, sample_contact):
-        """Test getting a contact that exists."""
-        mock_cell = Mock()
-        mock_cell.row = 2
-        store._contacts = Mock()
-        store._contacts.find = Mock(return_value=mock_cell)
-        store._contacts.row_values = Mock(
-            return_value=[
-                sample_contact.name,
-                sample_contact.email,
-                sample_contact.phone,
-            ]
-        )
-
-        result = store.get_contact_by_name("alice@example.com")
-
-        assert result is not None
-        assert result.name == sample_contact.name
-        assert result.email == sample_contact.email
-        assert result.phone == sample_contact.phone
-        store._contacts.find.assert_called_once_with("alice@example.com", in_column=1)
-
-    def test_get_contact_by_name_not_found(self):
-        """Test getting a contact that doesn't exist."""
-        store._contacts = Mock()
-        store._contacts.find = Mock(return_value=None)
-
-        result = store.get_contact_by_name("unknown@example.com")
-
-        assert result is None
-
-    def test_get_contact_by_name_no_contacts_sheet(self):
-        """Test getting a contact when contacts sheet doesn't exist."""
-        store._contacts = None
-
-        result = store.get_contact_by_name("alice@example.com")
-
-        assert result is None
-
-
-class TestGetContactByEmail:
-    """Tests for the get_contact_by_email function."""
-
-    def test_get_contact_by_email_found(self, sample_contact):
-        """Test getting a contact by email that exists."""
-        mock_cell = Mock()
-        mock_cell.row = 2
-        store._contacts = Mock()
-        store._contacts.find = Mock(return_value=mock_cell)
-        store._contacts.row_values = Mock(
-            return_value=[
-                sample_contact.name,
-                sample_contact.email,
-                sample_contact.phone,
-            ]
-        )
-
-        result = store.get_contact_by_email("alice@example.com")
-
-        assert result is not None
-        assert result.name == sample_contact.name
-        assert result.email == sample_contact.email
-        assert result.phone == sample_contact.phone
-        store._contacts.find.assert_called_once_with("alice@example.com", in_column=2)
-
-    def test_get_contact_by_email_not_found(self):
-        """Test getting a contact by email that doesn't exist."""
-        store._contacts = Mock()
-        store._contacts.find = Mock(return_value=None)
+        assert new_store([], []).get_schedule_row(fixed_time) is None
 
-        result = store.get_contact_by_email("unknown@example.com")
 
-        assert result is None
+class TestContacts:
+    """Tests for contact lookups."""
 
-    def test_get_contact_by_email_no_contacts_sheet(self):
-        """Test getting a contact by email when contacts sheet doesn't exist."""
-        store._contacts = None
+    def test_by_name(self, backend, sample_contact):
+        """Test getting a contact by name."""
+        assert backend.get_contact_by_name("alice") == sample_contact
 
-        result = store.get_contact_by_email("alice@example.com")
+    def test_by_email(self, backend, sample_contact):
+        """Test getting a contact by email."""
+        assert backend.get_contact_by_email("alice@example.com") == sample_contact
 
-        assert result is None
+    def test_not_found(self, backend):
+        """Test getting contacts that don't exist."""
+        assert backend.get_contact_by_name("unknown") is None
+        assert backend.get_contact_by_email("unknown@example.com") is None
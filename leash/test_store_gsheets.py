@@ -0,0 +1,538 @@
+"""Tests for the Google Sheets storage backend."""
+
+import dataclasses
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from unittest.mock import Mock
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from autokitteh.store import _local_dev_store
+from gspread.exceptions import WorksheetNotFound
+
+import pytest
+
+
+# Mock autokitteh dependencies before importing store_gsheets
+with patch("autokitteh.get_webhook_url", return_value="http://test.webhook.url"):
+    import store_gsheets
+
+from model import Contact
+from model import Incident
+from model import IncidentState
+from model import ScheduleRow
+
+
+@pytest.fixture
+def client():
+    """Return a mock spreadsheet with mock worksheets."""
+    worksheets = {}
+
+    def worksheet(name):
+        if name not in worksheets:
+            worksheets[name] = Mock()
+            worksheets[name].get_all_values = Mock(return_value=[])
+        return worksheets[name]
+
+    client = MagicMock()
+    client.worksheet = Mock(side_effect=worksheet)
+    client.get_lastUpdateTime = Mock(return_value="v1")
+    return client
+
+
+@pytest.fixture(autouse=True)
+def ak_store():
+    """Use an empty local AutoKitteh store in every test."""
+    _local_dev_store.clear()
+    yield
+    _local_dev_store.clear()
+
+
+@pytest.fixture
+def sheets(client):
+    """Return a Sheets backend over the mock spreadsheet."""
+    return store_gsheets.SheetsStore(client)
+
+
+@pytest.fixture
+def fixed_time():
+    """Return a fixed datetime for testing."""
+    return datetime(2024, 1, 15, 10, 0, 0, tzinfo=ZoneInfo("UTC"))
+
+
+@pytest.fixture
+def sample_incident(fixed_time):
+    """Return a sample incident for testing."""
+    return Incident(
+        id="42",
+        details="Test incident details",
+        state=IncidentState.PENDING,
+        started_at=fixed_time,
+        unique_id="test_unique_id_xyz",
+    )
+
+
+@pytest.fixture
+def sample_contact():
+    """Return a sample contact for testing."""
+    return Contact(
+        name="alice@example.com",
+        email="alice@example.com",
+        phone="+1234567890",
+    )
+
+
+@pytest.fixture
+def sample_schedule(fixed_time):
+    """Return a sample schedule for testing."""
+    return ScheduleRow(
+        start_time=fixed_time - timedelta(hours=1),
+        end_time=fixed_time + timedelta(hours=23),
+        assignees=["alice@example.com", "bob@example.com"],
+    )
+
+
+def _snapshot(rows, keys=None):
+    """Return a snapshot of a mock worksheet with the given values."""
+    worksheet = Mock()
+    worksheet.get_all_values = Mock(return_value=rows)
+    return store_gsheets._Snapshot(worksheet, keys=keys or {}, version=lambda: "v1")
+
+
+class TestGet:
+    """Tests for the get function."""
+
+    def test_get_existing_worksheet(self, sheets, client):
+        """Test getting an existing worksheet."""
+        mock_worksheet = Mock()
+        client.worksheet = Mock(return_value=mock_worksheet)
+
+        result = sheets.get("test_sheet")
+
+        assert result == mock_worksheet
+        client.worksheet.assert_called_once_with("test_sheet")
+
+    def test_get_nonexistent_worksheet(self, sheets, client):
+        """Test getting a worksheet that doesn't exist."""
+        client.worksheet = Mock(side_effect=WorksheetNotFound("Not found"))
+
+        result = sheets.get("nonexistent_sheet")
+
+        assert result is None
+        client.worksheet.assert_called_once_with("nonexistent_sheet")
+
+
+class TestHighestIncidentId:
+    """Tests for the highest_incident_id function."""
+
+    def test_skips_non_numeric_ids(self, sheets, client):
+        """Test that rows without a numeric ID, e.g. blank ones, are ignored."""
+        client.worksheet("incidents").get_all_values.return_value = [
+            Incident.labels,
+            ["3"],
+            [""],
+            ["oops"],
+            ["12"],
+        ]
+
+        assert sheets.highest_incident_id() == 12
+
+    def test_empty(self, sheets):
+        """Test that there is no highest ID when there are no incidents."""
+        assert sheets.highest_incident_id() == 0
+
+
+@pytest.fixture
+def incidents(client, sample_incident):
+    """Return the mock incidents worksheet, with the sample incident."""
+    worksheet = client.worksheet("incidents")
+    # Sheets returns all values as strings.
+    row = [str(v) for v in sample_incident.row]
+    worksheet.get_all_values.return_value = [Incident.labels, row]
+    return worksheet
+
+
+class TestAddIncident:
+    """Tests for the add_incident function."""
+
+    def test_add_incident(self, sheets, incidents, sample_incident):
+        """Test adding an incident to the sheet."""
+        incidents.append_row = Mock()
+
+        sheets.add_incident(sample_incident)
+
+        incidents.append_row.assert_called_once()
+        call_args = incidents.append_row.call_args
+        assert call_args[0][0] == sample_incident.row
+        assert "value_input_option" in call_args[1]
+
+    def test_add_incident_updates_snapshot(self, sheets, incidents, fixed_time):
+        """Test that an added incident is read back without fetching the sheet."""
+        sheets._incidents.refresh()
+        incidents.append_row = Mock(
+            return_value={"updates": {"updatedRange": "incidents!A5:I5"}}
+        )
+
+        inc = Incident(
+            id="43",
+            details="Another incident",
+            state=IncidentState.PENDING,
+            started_at=fixed_time,
+            unique_id="another_unique_id",
+        )
+        sheets.add_incident(inc)
+
+        result = sheets.get_incident_by_unique_id("another_unique_id")
+
+        assert result is not None
+        assert result.id == "43"
+        incidents.get_all_values.assert_called_once()
+
+
+class TestGetIncidentByUniqueId:
+    """Tests for the get_incident_by_unique_id function."""
+
+    def test_get_incident_found(self, sheets, incidents, sample_incident):
+        """Test getting an incident that exists."""
+        result = sheets.get_incident_by_unique_id("test_unique_id_xyz")
+
+        assert result is not None
+        assert result.id == sample_incident.id
+        assert result.unique_id == sample_incident.unique_id
+
+    def test_get_incident_not_found(self, sheets, incidents):
+        """Test getting an incident that doesn't exist."""
+        result = sheets.get_incident_by_unique_id("nonexistent_id")
+
+        assert result is None
+
+    def test_get_incident_cached(self, sheets, incidents):
+        """Test that repeated lookups are served from the snapshot."""
+        sheets.get_incident_by_unique_id("test_unique_id_xyz")
+        sheets.get_incident_by_unique_id("test_unique_id_xyz")
+
+        incidents.get_all_values.assert_called_once()
+
+    def test_get_incident_miss_unchanged(self, sheets, incidents):
+        """Test that a miss doesn't refetch an unchanged spreadsheet."""
+        sheets.get_incident_by_unique_id("nonexistent_id")
+        sheets.get_incident_by_unique_id("nonexistent_id")
+
+        incidents.get_all_values.assert_called_once()
+
+    def test_get_incident_miss_changed(self, sheets, client, incidents, fixed_time):
+        """Test that a miss refetches the snapshot if the spreadsheet changed."""
+        sheets.get_incident_by_unique_id("new_unique_id")
+
+        new = Incident(
+            id="43",
+            details="New incident",
+            state=IncidentState.PENDING,
+            started_at=fixed_time,
+            unique_id="new_unique_id",
+        )
+        incidents.get_all_values.return_value.append(new.row)
+        client.get_lastUpdateTime.return_value = "v2"
+
+        result = sheets.get_incident_by_unique_id("new_unique_id")
+
+        assert result is not None
+        assert result.id == "43"
+        assert incidents.get_all_values.call_count == 2
+
+    def test_get_incident_expired(self, sheets, client, incidents, monkeypatch):
+        """Test that an expired snapshot is refetched only if changed."""
+        monkeypatch.setattr(store_gsheets.config, "STORE_SNAPSHOT_TTL", timedelta(0))
+
+        sheets.get_incident_by_unique_id("test_unique_id_xyz")
+        sheets.get_incident_by_unique_id("test_unique_id_xyz")
+        assert incidents.get_all_values.call_count == 1
+
+        client.get_lastUpdateTime.return_value = "v2"
+        sheets.get_incident_by_unique_id("test_unique_id_xyz")
+        assert incidents.get_all_values.call_count == 2
+
+
+class TestUpdateIncident:
+    """Tests for the update_incident and flush_incident_updates functions."""
+
+    def test_update_incident_is_queued(self, sheets, incidents, sample_incident):
+        """Test that an update is visible before it is written to the sheet."""
+        inc = dataclasses.replace(sample_incident, state=IncidentState.IN_PROGRESS)
+        sheets.update_incident(inc)
+
+        incidents.batch_update.assert_not_called()
+
+        result = sheets.get_incident_by_unique_id("test_unique_id_xyz")
+        assert result.state == IncidentState.IN_PROGRESS
+
+    def test_update_incident_not_found(self, sheets, incidents, sample_incident):
+        """Test updating an incident that doesn't exist."""
+        incidents.get_all_values.return_value = [Incident.labels]
+
+        with pytest.raises(ValueError, match="Incident with id 42 not found"):
+            sheets.update_incident(sample_incident)
+
+        assert sheets.flush_incident_updates() == 0
+
+    def test_flush_coalesces_updates(
+        self, sheets, incidents, sample_incident, fixed_time
+    ):
+        """Test that updates are merged per incident and written in one batch."""
+        other = Incident(
+            id="43",
+            details="Another incident",
+            state=IncidentState.PENDING,
+            started_at=fixed_time,
+            unique_id="another_unique_id",
+        )
+        incidents.get_all_values.return_value.insert(1, [str(v) for v in other.row])
+
+        sheets.update_incident(
+            dataclasses.replace(sample_incident, state=IncidentState.ASSIGNED)
+        )
+        last = dataclasses.replace(sample_incident, state=IncidentState.RESOLVED)
+        sheets.update_incident(last)
+        sheets.update_incident(other)
+
+        assert sheets.flush_incident_updates() == 2
+
+        incidents.batch_update.assert_called_once()
+        assert sorted(incidents.batch_update.call_args[0][0], key=str) == [
+            {"range": "A2", "values": [other.row]},
+            {"range": "A3", "values": [last.row]},
+        ]
+
+        result = sheets.get_incident_by_unique_id("test_unique_id_xyz")
+        assert result.state == IncidentState.RESOLVED
+
+        assert sheets.flush_incident_updates() == 0
+        incidents.batch_update.assert_called_once()
+
+    def test_flush_failure_keeps_updates(self, sheets, incidents, sample_incident):
+        """Test that updates remain pending if the write fails."""
+        sheets.update_incident(sample_incident)
+        incidents.batch_update.side_effect = RuntimeError("quota exceeded")
+
+        with pytest.raises(RuntimeError):
+            sheets.flush_incident_updates()
+
+        incidents.batch_update.side_effect = None
+        assert sheets.flush_incident_updates() == 1
+
+    def test_flush_keeps_newer_updates(self, sheets, incidents, sample_incident):
+        """Test that an update queued during a flush is not lost."""
+        sheets.update_incident(sample_incident)
+        newer = dataclasses.replace(sample_incident, state=IncidentState.RESOLVED)
+
+        def batch_update(*args, **kwargs):
+            sheets.update_incident(newer)
+
+        incidents.batch_update.side_effect = batch_update
+
+        assert sheets.flush_incident_updates() == 1
+
+        incidents.batch_update.side_effect = None
+        assert sheets.flush_incident_updates() == 1
+        assert incidents.batch_update.call_args[0][0] == [
+            {"range": "A2", "values": [newer.row]}
+        ]
+
+
+class TestGetScheduleRow:
+    """Tests for the get_schedule_row function."""
+
+    def test_get_schedule_row_match(self, sheets, fixed_time, sample_schedule):
+        """Test getting a schedule row that matches the time."""
+        sheets._schedule = _snapshot(
+            [
+                ScheduleRow.labels,
+                sample_schedule.row,
+            ]
+        )
+
+        result = sheets.get_schedule_row(fixed_time)
+
+        assert result is not None
+        assert result.start_time == sample_schedule.start_time
+        assert result.end_time == sample_schedule.end_time
+        assert result.assignees == sample_schedule.assignees
+
+    def test_get_schedule_row_no_match(self, sheets, fixed_time, sample_schedule):
+        """Test getting a schedule row when time doesn't match."""
+        # Create schedule that doesn't match the fixed_time
+        past_schedule = ScheduleRow(
+            start_time=fixed_time - timedelta(days=2),
+            end_time=fixed_time - timedelta(days=1),
+            assignees=["alice@example.com"],
+        )
+
+        sheets._schedule = _snapshot(
+            [
+                ScheduleRow.labels,
+                past_schedule.row,
+            ]
+        )
+
+        result = sheets.get_schedule_row(fixed_time)
+
+        assert result is None
+
+    def test_get_schedule_row_multiple_matches_returns_first(self, sheets, fixed_time):
+        """Test that when multiple schedules match, the first one is returned."""
+        schedule1 = ScheduleRow(
+            start_time=fixed_time - timedelta(hours=1),
+            end_time=fixed_time + timedelta(hours=1),
+            assignees=["alice@example.com"],
+        )
+        schedule2 = ScheduleRow(
+            start_time=fixed_time - timedelta(hours=2),
+            end_time=fixed_time + timedelta(hours=2),
+            assignees=["bob@example.com"],
+        )
+
+        sheets._schedule = _snapshot(
+            [
+                ScheduleRow.labels,
+                schedule1.row,
+                schedule2.row,
+            ]
+        )
+
+        result = sheets.get_schedule_row(fixed_time)
+
+        assert result is not None
+        assert result.assignees == ["alice@example.com"]
+
+    def test_get_schedule_row_invalid_row(self, sheets, fixed_time, sample_schedule):
+        """Test getting a schedule row with an invalid row in the data."""
+        sheets._schedule = _snapshot(
+            [
+                ScheduleRow.labels,
+                ["invalid", "data"],  # Invalid row
+                sample_schedule.row,  # Valid row
+            ]
+        )
+
+        result = sheets.get_schedule_row(fixed_time)
+
+        # Should skip invalid row and return the valid one
+        assert result is not None
+        assert result.assignees == sample_schedule.assignees
+
+    def test_get_schedule_row_empty(self, sheets, fixed_time):
+        """Test getting a schedule row when no schedules exist."""
+        sheets._schedule = _snapshot([ScheduleRow.labels])
+
+        result = sheets.get_schedule_row(fixed_time)
+
+        assert result is None
+
+    def test_get_schedule_row_parses_once(
+        self, sheets, fixed_time, sample_schedule, capsys
+    ):
+        """Test that rows are parsed and reported again only after a change."""
+        sheets._schedule = _snapshot(
+            [
+                ScheduleRow.labels,
+                ["invalid", "data"],
+                sample_schedule.row,
+            ]
+        )
+
+        with patch.object(ScheduleRow, "from_row", wraps=ScheduleRow.from_row) as m:
+            sheets.get_schedule_row(fixed_time)
+            sheets.get_schedule_row(fixed_time + timedelta(hours=1))
+            assert m.call_count == 2
+
+            sheets._schedule.worksheet.get_all_values.return_value = [
+                ScheduleRow.labels,
+                sample_schedule.row,
+            ]
+            sheets._schedule.refresh()
+            assert sheets.get_schedule_row(fixed_time) is not None
+            assert m.call_count == 3
+
+        assert capsys.readouterr().out.count("Invalid schedule row") == 1
+
+
+class TestGetContactByName:
+    """Tests for the get_contact_by_name function."""
+
+    def test_get_contact_by_name_found(self, sheets, sample_contact):
+        """Test getting a contact that exists."""
+        sheets._contacts = _snapshot(
+            [
+                ["name", "email", "phone"],
+                [sample_contact.name, sample_contact.email, sample_contact.phone],
+            ],
+            keys={"name": 0, "email": 1},
+        )
+
+        result = sheets.get_contact_by_name("alice@example.com")
+
+        assert result is not None
+        assert result.name == sample_contact.name
+        assert result.email == sample_contact.email
+        assert result.phone == sample_contact.phone
+
+    def test_get_contact_by_name_not_found(self, sheets):
+        """Test getting a contact that doesn't exist."""
+        sheets._contacts = _snapshot(
+            [["name", "email", "phone"]], keys={"name": 0, "email": 1}
+        )
+
+        result = sheets.get_contact_by_name("unknown@example.com")
+
+        assert result is None
+
+    def test_get_contact_by_name_no_contacts_sheet(self, sheets):
+        """Test getting a contact when contacts sheet doesn't exist."""
+        sheets._contacts = store_gsheets._Snapshot(
+            None, keys={"name": 0, "email": 1}, version=lambda: None
+        )
+
+        result = sheets.get_contact_by_name("alice@example.com")
+
+        assert result is None
+
+
+class TestGetContactByEmail:
+    """Tests for the get_contact_by_email function."""
+
+    def test_get_contact_by_email_found(self, sheets, sample_contact):
+        """Test getting a contact by email that exists."""
+        sheets._contacts = _snapshot(
+            [
+                ["name", "email", "phone"],
+                [sample_contact.name, sample_contact.email, sample_contact.phone],
+            ],
+            keys={"name": 0, "email": 1},
+        )
+
+        result = sheets.get_contact_by_email("alice@example.com")
+
+        assert result is not None
+        assert result.name == sample_contact.name
+        assert result.email == sample_contact.email
+        assert result.phone == sample_contact.phone
+
+    def test_get_contact_by_email_not_found(self, sheets):
+        """Test getting a contact by email that doesn't exist."""
+        sheets._contacts = _snapshot(
+            [["name", "email", "phone"]], keys={"name": 0, "email": 1}
+        )
+
+        result = sheets.get_contact_by_email("unknown@example.com")
+
+        assert result is None
+
+    def test_get_contact_by_email_no_contacts_sheet(self, sheets):
+        """Test getting a contact by email when contacts sheet doesn't exist."""
+        sheets._contacts = store_gsheets._Snapshot(
+            None, keys={"name": 0, "email": 1}, version=lambda: None
+        )
+
+        result = sheets.get_contact_by_email("alice@example.com")
+
+        assert result is None
@@ -0,0 +1,54 @@
+"""Tests for the SQLite storage backend."""
+
+from unittest.mock import patch
+
+import pytest
+
+
+# Mock autokitteh dependencies before importing store_sqlite
+with patch("autokitteh.get_webhook_url", return_value="http://test.webhook.url"):
+    import store_sqlite
+
+from model import Contact
+
+
+@pytest.fixture
+def sqlite_store():
+    """Return a SQLite backend over an in-memory database."""
+    return store_sqlite.SQLiteStore(":memory:")
+
+
+def _plan(s: store_sqlite.SQLiteStore, query: str, *args) -> str:
+    rows = s._db.execute(f"EXPLAIN QUERY PLAN {query}", args).fetchall()
+    return " ".join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize(
+    ("query", "args", "index"),
+    [
+        ("SELECT * FROM incidents WHERE unique_id = ?", ("x",), "INDEX"),
+        ("SELECT * FROM incidents WHERE id = ?", (1,), "INTEGER PRIMARY KEY"),
+        (
+            "SELECT * FROM schedule WHERE end_time >= ? AND start_time <= ?",
+            (1.0, 1.0),
+            "schedule_end_start",
+        ),
+        ("SELECT * FROM contacts WHERE name = ?", ("x",), "contacts_name"),
+        ("SELECT * FROM contacts WHERE email = ?", ("x",), "contacts_email"),
+    ],
+)
+def test_lookups_use_indexes(sqlite_store, query, args, index):
+    """Test that lookups don't scan entire tables."""
+    plan = _plan(sqlite_store, query, *args)
+
+    assert index in plan
+    assert not plan.startswith("SCAN")
+
+
+def test_persistent(tmp_path):
+    """Test that data survives reopening the database."""
+    path = str(tmp_path / "leash.db")
+
+    store_sqlite.SQLiteStore(path).add_contact(Contact(name="alice"))
+
+    assert store_sqlite.SQLiteStore(path).get_contact_by_name("alice") is not None